@@ -1,18 +1,16 @@
-import pathlib
-from typing import Union
-
-import cattrs
-from omegaconf import OmegaConf
-
-from src.config.config import Config, BASE_DIR
-from src.utils.application_builder.api_installation import Director, DevelopmentApplicationBuilder
+from src.config.config import parse_config
 from src.utils.gunicorn_app import StandaloneApplication
 from src.utils.logging import LoggingConfig, configure_logging
+from src.utils.multiprocess_metrics import prepare_multiprocess_dir, mark_worker_dead
 
 
 def run_application() -> None:
-    config = _parse_config(BASE_DIR / "src" / "config" / "config.yaml")
+    config = parse_config()
     stdlib_logconfig_dict = configure_logging(LoggingConfig())
+    # metrics open their files when application is imported, so samples of previous run are removed before
+    prepare_multiprocess_dir()
+    from src.utils.application_builder.api_installation import Director, DevelopmentApplicationBuilder
+
     director = Director(DevelopmentApplicationBuilder(config=config))
     app = director.build_app()
     options = {
@@ -21,19 +19,12 @@ def run_application() -> None:
         "reload": True,
         "disable_existing_loggers": False,
         "preload_app": True,
-        "logconfig_dict": stdlib_logconfig_dict
+        "logconfig_dict": stdlib_logconfig_dict,
+        "child_exit": mark_worker_dead,
     }
     gunicorn_app = StandaloneApplication(app, options)
     gunicorn_app.run()
 
 
-def _parse_config(path_to_config: Union[str, pathlib.Path]) -> Config:
-    dictionary_config = OmegaConf.to_container(OmegaConf.merge(
-        OmegaConf.load(path_to_config),
-        OmegaConf.structured(Config)
-    ), resolve=True)
-    return cattrs.structure(dictionary_config, Config)
-
-
 if __name__ == "__main__":
     run_application()
@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 
 from .v1 import not_for_production
-from .v1.endpoints import oauth, users, products, basic, healthcheck
+from .v1.endpoints import oauth, users, products, basic, healthcheck, admin, orders, analytics
 
 
 def setup_routers() -> APIRouter:
@@ -9,8 +9,11 @@ def setup_routers() -> APIRouter:
     fundamental_api_router.include_router(users.api_router)
     fundamental_api_router.include_router(oauth.api_router)
     fundamental_api_router.include_router(products.api_router)
+    fundamental_api_router.include_router(orders.api_router)
+    fundamental_api_router.include_router(analytics.api_router)
     fundamental_api_router.include_router(not_for_production.api_router)
     fundamental_api_router.include_router(healthcheck.api_router)
+    fundamental_api_router.include_router(admin.api_router)
     return fundamental_api_router
 
 
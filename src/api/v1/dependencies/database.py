@@ -1,6 +1,30 @@
+class UnitOfWorkDependencyMarker:  # pragma: no cover
+    pass
+
+
 class UserRepositoryDependencyMarker:  # pragma: no cover
     pass
 
 
 class ProductRepositoryDependencyMarker:  # pragma: no cover
     pass
+
+
+class OrderRepositoryDependencyMarker:  # pragma: no cover
+    pass
+
+
+class SalesRepositoryDependencyMarker:  # pragma: no cover
+    pass
+
+
+class OutboxRepositoryDependencyMarker:  # pragma: no cover
+    pass
+
+
+class QueryStatisticsDependencyMarker:  # pragma: no cover
+    pass
+
+
+class UsersCountStrategyDependencyMarker:  # pragma: no cover
+    pass
@@ -10,5 +10,5 @@ class OAuthServiceDependencyMarker:
     pass
 
 
-class RPCDependencyMarker:
+class ProductAutocompleteDependencyMarker:
     pass
@@ -1,9 +1,14 @@
 import datetime
-from typing import Optional, List
+import uuid
+from typing import Dict, Optional, List
 
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, validator
 
 from src.services.database.models import SizeEnum
+from src.services.database.row_count import CountStrategy
+
+# lines of the same product are merged into one row, whose quantity is SMALLINT
+MAX_PRODUCT_QUANTITY = 1000
 
 
 class UserDTO(BaseModel):
@@ -29,6 +34,38 @@ class UserDTO(BaseModel):
         orm_mode = True
 
 
+class UserInfoDTO(BaseModel):
+    id: int
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    phone_number: Optional[str] = None
+    email: Optional[str] = None
+    balance: Optional[float] = None
+    username: str
+
+    class Config:
+        orm_mode = True
+
+
+class StatementStatisticsDTO(BaseModel):
+    fingerprint: str
+    calls: int
+    total_time: float
+    mean_time: float
+    max_time: float
+    p50: float
+    p95: float
+    p99: float
+
+    class Config:
+        orm_mode = True
+
+
+class UsersPageDTO(BaseModel):
+    items: List[UserInfoDTO]
+    next_cursor: Optional[str] = Field(None, description="Pass it as `cursor` to get the next page")
+
+
 class ProductDTO(BaseModel):
     id: Optional[int] = None
     name: str
@@ -36,6 +73,7 @@ class ProductDTO(BaseModel):
     size: SizeEnum
     description: str
     created_at: Optional[datetime.datetime] = None
+    stock: Optional[int] = Field(None, ge=0)
 
     class Config:
         orm_mode = True
@@ -51,13 +89,84 @@ class ProductDTO(BaseModel):
         self.Config.use_enum_values = False
 
 
+class ProductSearchResultDTO(ProductDTO):
+    rank: float = Field(..., description="Relevance of product, results are ordered by it")
+
+
+class ProductSearchPageDTO(BaseModel):
+    items: List[ProductSearchResultDTO]
+    next_cursor: Optional[str] = Field(None, description="Pass it as `cursor` to get the next page")
+
+
+class ProductSuggestionDTO(BaseModel):
+    id: int
+    name: str
+
+
+class OrderLineDTO(BaseModel):
+    product_id: int
+    quantity: int = Field(..., gt=0, le=MAX_PRODUCT_QUANTITY)
+
+
+class PlaceOrderDTO(BaseModel):
+    lines: List[OrderLineDTO] = Field(..., min_items=1, max_items=100)
+
+    @validator("lines")
+    def check_quantity_of_product(cls, lines: List[OrderLineDTO]) -> List[OrderLineDTO]:
+        quantities: Dict[int, int] = {}
+        for line in lines:
+            quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+            if quantities[line.product_id] > MAX_PRODUCT_QUANTITY:
+                raise ValueError(f"Total quantity of product {line.product_id} exceeds {MAX_PRODUCT_QUANTITY}")
+        return lines
+
+
+class OrderLineInfoDTO(BaseModel):
+    order_id: int
+    product_id: int
+    quantity: int
+    unit_price: Optional[float] = None
+    created_at: Optional[datetime.datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+class OrderDTO(BaseModel):
+    checkout_id: uuid.UUID
+    lines: List[OrderLineInfoDTO]
+
+
+class DailySalesDTO(BaseModel):
+    day: datetime.date
+    units: int
+    revenue: float
+
+    class Config:
+        orm_mode = True
+
+
+class ProductSalesDTO(BaseModel):
+    product_id: int
+    units: int
+    revenue: float
+
+    class Config:
+        orm_mode = True
+
+
 class DefaultResponse(BaseModel):
     error: str
     success: bool = False
 
 
+class OutOfStockResponse(DefaultResponse):
+    product_ids: List[int] = Field(..., description="Products, that are unknown or lack stock")
+
+
 class ObjectCountDTO(BaseModel):
     count: int = Field(..., example=44)
+    strategy: Optional[CountStrategy] = Field(None, description="How objects have been counted", example="counter")
 
 
 class SimpleResponse(BaseModel):
@@ -0,0 +1,25 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query, Security
+
+from src.api.v1.dependencies.database import QueryStatisticsDependencyMarker
+from src.api.v1.dependencies.services import SecurityGuardServiceDependencyMarker
+from src.api.v1.dto import StatementStatisticsDTO
+from src.services.database.query_stats import QueryStatistics
+from src.services.security.jwt_service import ADMIN_SCOPE
+from src.utils.server_timing import ServerTimingRoute
+
+api_router = APIRouter(
+    prefix="/admin",
+    dependencies=[Security(SecurityGuardServiceDependencyMarker, scopes=[ADMIN_SCOPE])],
+    route_class=ServerTimingRoute
+)
+
+
+@api_router.get("/query-stats", tags=["Admin"], response_model=List[StatementStatisticsDTO])
+async def get_query_statistics(
+        limit: int = Query(20, ge=1, le=1000),
+        query_statistics: QueryStatistics = Depends(QueryStatisticsDependencyMarker)
+):
+    """Statements, that have taken the most of total time, durations are in seconds"""
+    return query_statistics.top(limit)
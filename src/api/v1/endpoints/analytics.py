@@ -0,0 +1,71 @@
+import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Security
+
+from src.api.v1.dependencies.database import SalesRepositoryDependencyMarker
+from src.api.v1.dependencies.services import SecurityGuardServiceDependencyMarker
+from src.api.v1.dto import DailySalesDTO, DefaultResponse, ProductSalesDTO
+from src.resources import api_string_templates
+from src.services.database.query_budget import query_budget
+from src.services.database.repositories.sales_repository import SalesRepository
+from src.services.security.jwt_service import ADMIN_SCOPE
+from src.utils.responses import BadRequestJsonResponse
+from src.utils.server_timing import ServerTimingRoute
+
+api_router = APIRouter(
+    prefix="/analytics",
+    dependencies=[Security(SecurityGuardServiceDependencyMarker, scopes=[ADMIN_SCOPE])],
+    route_class=ServerTimingRoute
+)
+
+# rollups are read per day, so cost of request depends on length of period, not on count of orders
+MAX_SALES_PERIOD = datetime.timedelta(days=366)
+
+
+def _is_valid_period(date_from: datetime.date, date_to: datetime.date) -> bool:
+    return datetime.timedelta(0) < date_to - date_from <= MAX_SALES_PERIOD
+
+
+@api_router.get(
+    "/sales/daily",
+    response_model=List[DailySalesDTO],
+    responses={400: {"model": DefaultResponse}},
+    tags=["Analytics"],
+    name="analytics:daily_sales"
+)
+@query_budget(2)
+async def get_daily_sales(
+        date_from: datetime.date = Query(..., description="Inclusive first day in UTC"),
+        date_to: datetime.date = Query(..., description="Exclusive last day in UTC"),
+        product_id: Optional[int] = Query(None, description="Sales of this product only"),
+        sales_repository: SalesRepository = Depends(SalesRepositoryDependencyMarker),
+):
+    """
+    Units sold and revenue per day, sales of the current day are refreshed in background and lag a little
+    """
+    if not _is_valid_period(date_from, date_to):
+        return BadRequestJsonResponse(content=api_string_templates.INVALID_PERIOD)
+    return await sales_repository.get_daily_sales(date_from, date_to, product_id)
+
+
+@api_router.get(
+    "/sales/products",
+    response_model=List[ProductSalesDTO],
+    responses={400: {"model": DefaultResponse}},
+    tags=["Analytics"],
+    name="analytics:top_products"
+)
+@query_budget(2)
+async def get_top_products(
+        date_from: datetime.date = Query(..., description="Inclusive first day in UTC"),
+        date_to: datetime.date = Query(..., description="Exclusive last day in UTC"),
+        limit: int = Query(20, ge=1, le=1000),
+        sales_repository: SalesRepository = Depends(SalesRepositoryDependencyMarker),
+):
+    """
+    Products with the highest revenue within period
+    """
+    if not _is_valid_period(date_from, date_to):
+        return BadRequestJsonResponse(content=api_string_templates.INVALID_PERIOD)
+    return await sales_repository.get_top_products(date_from, date_to, limit)
@@ -3,8 +3,9 @@ from fastapi import APIRouter, Depends
 from src.api.v1.dependencies.database import UserRepositoryDependencyMarker
 from src.services.database.repositories.user_repository import UserRepository
 from src.api.v1.dto import TestResponse
+from src.utils.server_timing import ServerTimingRoute
 
-fundamental_api_router = APIRouter(prefix="/api/v1")
+fundamental_api_router = APIRouter(prefix="/api/v1", route_class=ServerTimingRoute)
 
 
 @fundamental_api_router.post("/test", tags=["Test"], response_model=TestResponse)
@@ -3,7 +3,9 @@ from __future__ import annotations
 from fastapi import APIRouter
 from fastapi.responses import ORJSONResponse
 
-api_router = APIRouter()
+from src.utils.server_timing import ServerTimingRoute
+
+api_router = APIRouter(route_class=ServerTimingRoute)
 
 
 @api_router.get("/healthcheck", response_class=ORJSONResponse, tags=["healthcheck"])
@@ -10,8 +10,9 @@ from src.api.v1.dependencies.services import ServiceAuthorizationDependencyMarke
 from src.services.security.jwt_service import JWTAuthenticationService
 from src.services.security.oauth import OAuthSecurityService
 from src.utils.exceptions import UserIsUnauthorized
+from src.utils.server_timing import ServerTimingRoute
 
-api_router = APIRouter()
+api_router = APIRouter(route_class=ServerTimingRoute)
 
 
 @api_router.post("/oauth", tags=["Oauth & Oauth2"], name="oauth:login")
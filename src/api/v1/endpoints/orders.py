@@ -0,0 +1,95 @@
+import datetime
+import uuid
+from typing import List
+
+from fastapi import APIRouter, Depends, Path, Query
+
+from src.api.v1.dependencies.database import OrderRepositoryDependencyMarker
+from src.api.v1.dependencies.services import SecurityGuardServiceDependencyMarker
+from src.api.v1.dto import DefaultResponse, OrderDTO, OrderLineInfoDTO, OutOfStockResponse, PlaceOrderDTO
+from src.resources import api_string_templates
+from src.services.database import InsufficientStock, User
+from src.services.database.query_budget import query_budget
+from src.services.database.repositories.order_repository import OrderRepository
+from src.utils.responses import BadRequestJsonResponse, ConflictJsonResponse, NotFoundJsonResponse
+from src.utils.server_timing import ServerTimingRoute
+
+api_router = APIRouter(dependencies=[Depends(SecurityGuardServiceDependencyMarker)], route_class=ServerTimingRoute)
+
+# orders are partitioned by month, so period is limited to keep the count of scanned partitions small
+MAX_ORDERS_PERIOD = datetime.timedelta(days=366)
+
+
+@api_router.post(
+    "/orders",
+    response_model=OrderDTO,
+    responses={409: {"model": OutOfStockResponse}},
+    status_code=201,
+    tags=["Orders"],
+    name="orders:place_order"
+)
+@query_budget(3)
+async def place_order(
+        order: PlaceOrderDTO,
+        user: User = Depends(SecurityGuardServiceDependencyMarker),
+        order_repository: OrderRepository = Depends(OrderRepositoryDependencyMarker),
+):
+    """
+    Reserve stock of all products and place order, nothing is reserved if any product lacks stock
+    """
+    try:
+        lines = await order_repository.place_order(
+            [(line.product_id, line.quantity) for line in order.lines], user_id=user.id
+        )
+    except InsufficientStock as ex:
+        return ConflictJsonResponse(
+            content={"error": api_string_templates.PRODUCTS_OUT_OF_STOCK, "success": False,
+                     "product_ids": ex.product_ids}
+        )
+    return {"checkout_id": lines[0].checkout_id, "lines": lines}
+
+
+@api_router.get(
+    "/orders/{checkout_id}",
+    response_model=OrderDTO,
+    responses={404: {"model": DefaultResponse}},
+    tags=["Orders"],
+    name="orders:get_order"
+)
+@query_budget(2)
+async def get_order(
+        checkout_id: uuid.UUID = Path(...),
+        user: User = Depends(SecurityGuardServiceDependencyMarker),
+        order_repository: OrderRepository = Depends(OrderRepositoryDependencyMarker),
+):
+    lines = await order_repository.get_order_lines(checkout_id, user_id=user.id)
+    if not lines:
+        return NotFoundJsonResponse(content=api_string_templates.OBJECT_NOT_FOUND)
+    return {"checkout_id": checkout_id, "lines": lines}
+
+
+@api_router.get(
+    "/orders",
+    response_model=List[OrderLineInfoDTO],
+    responses={400: {"model": DefaultResponse}},
+    tags=["Orders"],
+    name="orders:get_orders"
+)
+@query_budget(2)
+async def get_orders(
+        created_from: datetime.datetime = Query(..., description="Inclusive lower bound of period in UTC"),
+        created_to: datetime.datetime = Query(..., description="Exclusive upper bound of period in UTC"),
+        user: User = Depends(SecurityGuardServiceDependencyMarker),
+        order_repository: OrderRepository = Depends(OrderRepositoryDependencyMarker),
+):
+    """
+    Lines of orders of current user, that have been placed within period
+    """
+    # timestamps of orders are naive UTC
+    created_from, created_to = (
+        moment.astimezone(datetime.timezone.utc).replace(tzinfo=None) if moment.tzinfo is not None else moment
+        for moment in (created_from, created_to)
+    )
+    if not datetime.timedelta(0) < created_to - created_from <= MAX_ORDERS_PERIOD:
+        return BadRequestJsonResponse(content=api_string_templates.INVALID_PERIOD)
+    return await order_repository.get_user_order_lines(user.id, created_from, created_to)
@@ -1,13 +1,23 @@
-from fastapi import Header, Depends, APIRouter
+from typing import List, Optional
+
+from fastapi import Header, Depends, APIRouter, Query
 from fastapi.responses import Response
 
 from src.api.v1.dependencies.database import ProductRepositoryDependencyMarker
-from src.api.v1.dependencies.services import SecurityGuardServiceDependencyMarker
+from src.api.v1.dependencies.services import SecurityGuardServiceDependencyMarker, \
+    ProductAutocompleteDependencyMarker
+from src.resources import api_string_templates
+from src.services.database.autocomplete import ProductAutocomplete
+from src.services.database.query_budget import query_budget
 from src.services.database.repositories.product_repository import ProductRepository
-from src.api.v1.dto import ProductDTO, DefaultResponse
+from src.api.v1.dto import ProductDTO, DefaultResponse, ProductSearchPageDTO, ProductSuggestionDTO
 from src.utils.endpoints_specs import ProductBodySpec
+from src.utils.fieldsets import parse_fieldset, InvalidFieldset
+from src.utils.pagination import decode_ranked_cursor, encode_ranked_cursor, InvalidCursor
+from src.utils.responses import BadRequestJsonResponse, TrustedJsonResponse
+from src.utils.server_timing import ServerTimingRoute
 
-api_router = APIRouter(dependencies=[Depends(SecurityGuardServiceDependencyMarker)])
+api_router = APIRouter(dependencies=[Depends(SecurityGuardServiceDependencyMarker)], route_class=ServerTimingRoute)
 
 
 # noinspection PyUnusedLocal
@@ -18,6 +28,7 @@ api_router = APIRouter(dependencies=[Depends(SecurityGuardServiceDependencyMarke
     status_code=201,
     name="products:create_product"
 )
+@query_budget(2)
 async def create_product(
         product: ProductDTO = ProductBodySpec.item,
         user_agent: str = Header(..., title="User-Agent"),
@@ -33,3 +44,61 @@ async def create_product(
     """
     await product_crud.add_product(**product.dict(exclude_unset=True, exclude_none=True))
     return Response(status_code=201, headers={"User-Agent": user_agent})
+
+
+@api_router.get(
+    "/products/search",
+    response_model=ProductSearchPageDTO,
+    responses={400: {"model": DefaultResponse}},
+    tags=["Product"],
+    name="products:search_products"
+)
+@query_budget(2)
+async def search_products(
+        q: str = Query(..., min_length=1, max_length=200, description="Words of name or description",
+                       example="light laptop"),
+        limit: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = Query(None, description="`next_cursor` of the previous page"),
+        fields: Optional[str] = Query(
+            None, description="Comma separated fields to return, `id` is always returned", example="id,name"
+        ),
+        product_repository: ProductRepository = Depends(ProductRepositoryDependencyMarker),
+):
+    """
+    Products ranked by relevance to query, misspelled or incomplete words of name match as well
+    """
+    try:
+        after = decode_ranked_cursor(cursor) if cursor is not None else None
+    except InvalidCursor:
+        return BadRequestJsonResponse(content=api_string_templates.INVALID_CURSOR)
+    try:
+        # id is required to make cursor of the next page
+        fieldset = parse_fieldset(fields, ProductDTO, required=("id",))
+    except InvalidFieldset:
+        return BadRequestJsonResponse(content=api_string_templates.INVALID_FIELDSET)
+
+    products = await product_repository.search_products(q, fieldset, after=after, limit=limit)
+    next_cursor = encode_ranked_cursor(products[-1].rank, products[-1].id) if len(products) == limit else None
+    return TrustedJsonResponse({"items": products, "next_cursor": next_cursor})
+
+
+@api_router.get(
+    "/products/autocomplete",
+    response_model=List[ProductSuggestionDTO],
+    tags=["Product"],
+    name="products:autocomplete_products"
+)
+# only authentication may query database, if user isn't cached
+@query_budget(1)
+async def autocomplete_products(
+        prefix: str = Query(..., min_length=1, max_length=100, example="mech"),
+        limit: int = Query(10, ge=1, le=50),
+        autocomplete: ProductAutocomplete = Depends(ProductAutocompleteDependencyMarker),
+):
+    """
+    Names of the most popular products, that start with prefix. They're served from memory,
+    so products added by other workers appear within a few seconds
+    """
+    return TrustedJsonResponse(
+        [{"id": product_id, "name": name} for product_id, name in autocomplete.complete(prefix, limit)]
+    )
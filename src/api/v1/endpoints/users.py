@@ -1,67 +1,115 @@
-from typing import List
+from typing import Optional
 
-from aio_pika.patterns import RPC
-from fastapi import Path, HTTPException, Depends, APIRouter
-from pydantic import ValidationError
+from fastapi import Path, HTTPException, Depends, APIRouter, Query
 from sqlalchemy.exc import IntegrityError, DatabaseError
-from starlette.background import BackgroundTasks
 
-from src.api.v1.dependencies.database import UserRepositoryDependencyMarker
-from src.api.v1.dependencies.services import SecurityGuardServiceDependencyMarker, RPCDependencyMarker
-from src.api.v1.dto import ObjectCountDTO, SimpleResponse, UserDTO, DefaultResponse
+from src.api.v1.dependencies.database import UserRepositoryDependencyMarker, UnitOfWorkDependencyMarker, \
+    OutboxRepositoryDependencyMarker, UsersCountStrategyDependencyMarker
+from src.api.v1.dependencies.services import SecurityGuardServiceDependencyMarker
+from src.api.v1.dto import ObjectCountDTO, SimpleResponse, UserDTO, DefaultResponse, UserInfoDTO, UsersPageDTO
 from src.resources import api_string_templates
+from src.services.amqp.mailing import MAILING_QUEUE
+from src.services.database.query_budget import query_budget
+from src.services.database.repositories.outbox_repository import OutboxRepository
 from src.services.database.repositories.user_repository import UserRepository
+from src.services.database.row_count import CountStrategy
+from src.services.database.unit_of_work import UnitOfWork
 from src.utils.endpoints_specs import UserBodySpec
-from src.utils.responses import NotFoundJsonResponse, BadRequestJsonResponse
+from src.utils.fieldsets import parse_fieldset, InvalidFieldset
+from src.utils.pagination import decode_cursor, encode_cursor, InvalidCursor
+from src.utils.responses import NotFoundJsonResponse, BadRequestJsonResponse, StreamFormat, \
+    make_streaming_response, TrustedJsonResponse
+from src.utils.server_timing import ServerTimingRoute
 
-api_router = APIRouter(dependencies=[Depends(SecurityGuardServiceDependencyMarker)])
+api_router = APIRouter(dependencies=[Depends(SecurityGuardServiceDependencyMarker)], route_class=ServerTimingRoute)
+
+FIELDS_DESCRIPTION = "Comma separated fields to return, all fields by default"
 
 
 # noinspection PyUnusedLocal
-@api_router.get("/users/{user_id}/info", response_model=UserDTO, tags=["Users"],
+@api_router.get("/users/{user_id}/info", response_model=UserInfoDTO, tags=["Users"],
+                responses={400: {"model": DefaultResponse}, 404: {"model": DefaultResponse}},
                 name="users:get_user_info")
+@query_budget(2)
 async def get_user_info(
         user_id: int,
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION, example="id,username"),
         user_repository: UserRepository = Depends(UserRepositoryDependencyMarker)
 ):
-    user = await user_repository.get_user_by_id(user_id)
     try:
-        return UserDTO.from_orm(user)
-    except ValidationError:
+        fieldset = parse_fieldset(fields, UserInfoDTO)
+    except InvalidFieldset:
+        return BadRequestJsonResponse(content=api_string_templates.INVALID_FIELDSET)
+
+    user = await user_repository.get_user_record_by_id(user_id, fieldset)
+    if user is None:
         return NotFoundJsonResponse(content=api_string_templates.USER_DOES_NOT_EXIST_ERROR)
+    return TrustedJsonResponse(user)
 
 
 # noinspection PyUnusedLocal
 @api_router.get(
     "/users/all",
-    response_model=List[UserDTO],
+    response_model=UsersPageDTO,
     responses={400: {"model": DefaultResponse}},
     tags=["Users"],
     name="users:get_all_users"
 )
-async def get_all_users(user_repository: UserRepository = Depends(UserRepositoryDependencyMarker)):
-    return await user_repository.get_all_users()
+@query_budget(2)
+async def get_all_users(
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: Optional[str] = Query(None, description="`next_cursor` of the previous page"),
+        stream: Optional[StreamFormat] = Query(
+            None, description="Stream all users starting from `cursor` instead of returning a single page"
+        ),
+        fields: Optional[str] = Query(
+            None, description=f"{FIELDS_DESCRIPTION}, `id` is always returned", example="id,username"
+        ),
+        user_repository: UserRepository = Depends(UserRepositoryDependencyMarker)
+):
+    try:
+        after_id = decode_cursor(cursor) if cursor is not None else None
+    except InvalidCursor:
+        return BadRequestJsonResponse(content=api_string_templates.INVALID_CURSOR)
+    try:
+        # id is required to make cursor of the next page
+        fieldset = parse_fieldset(fields, UserInfoDTO, required=("id",))
+    except InvalidFieldset:
+        return BadRequestJsonResponse(content=api_string_templates.INVALID_FIELDSET)
+
+    if stream is not None:
+        return make_streaming_response(
+            user_repository.stream_users(after_id=after_id, fields=fieldset),
+            fields=fieldset,
+            stream_format=stream
+        )
+
+    users = await user_repository.get_user_records_page(fieldset, after_id=after_id, limit=limit)
+    next_cursor = encode_cursor(users[-1].id) if len(users) == limit else None
+    return TrustedJsonResponse({"items": users, "next_cursor": next_cursor})
 
 
 @api_router.put(
     "/users/create", responses={400: {"model": DefaultResponse}}, tags=["Users"],
     name="users:create_user"
 )
+@query_budget(3)
 async def create_user(
-        background_tasks: BackgroundTasks,
         user: UserDTO = UserBodySpec.item,
         user_repository: UserRepository = Depends(UserRepositoryDependencyMarker),
-        rpc: RPC = Depends(RPCDependencyMarker),
+        outbox_repository: OutboxRepository = Depends(OutboxRepositoryDependencyMarker),
+        uow: UnitOfWork = Depends(UnitOfWorkDependencyMarker),
 ):
     """*Create a new user in database"""
     payload = user.dict(exclude_unset=True)
     try:
-        await user_repository.add_user(**payload)
+        # email is sent by outbox relay only if user has been committed
+        async with uow.transaction():
+            await user_repository.add_user(**payload)
+            await outbox_repository.add_message(MAILING_QUEUE, {"email": user.email})
     except IntegrityError:
         return BadRequestJsonResponse(content=api_string_templates.USERNAME_TAKEN)
 
-    background_tasks.add_task(rpc.call, method_name="send_email")
-
     return {"success": True}
 
 
@@ -74,10 +122,17 @@ async def create_user(
     summary="Return count of users in database",
     name="users:get_users_count"
 )
+@query_budget(2)
 async def get_users_count(
+        strategy: Optional[CountStrategy] = Query(
+            None, description="`counter` and `scan` are exact, `estimate` is approximate, `cached` may be stale. "
+                              "Configured strategy is used by default"
+        ),
+        default_strategy: CountStrategy = Depends(UsersCountStrategyDependencyMarker),
         user_repository: UserRepository = Depends(UserRepositoryDependencyMarker),
 ):
-    return {"count": await user_repository.get_users_count()}
+    count, used_strategy = await user_repository.get_users_count(strategy or default_strategy)
+    return {"count": count, "strategy": used_strategy}
 
 
 # noinspection PyUnusedLocal
@@ -89,6 +144,7 @@ async def get_users_count(
     response_model=SimpleResponse,
     name="users:delete_user"
 )
+@query_budget(2)
 async def delete_user(
         user_id: int = Path(...),
         user_repository: UserRepository = Depends(UserRepositoryDependencyMarker),
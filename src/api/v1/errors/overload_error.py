@@ -0,0 +1,14 @@
+from starlette import status
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from src.resources import api_string_templates
+from src.utils.exceptions import PasswordHashingOverloaded
+
+
+async def password_hashing_overload_handler(_: Request, exc: PasswordHashingOverloaded) -> JSONResponse:
+    return JSONResponse(
+        {"errors": [api_string_templates.SERVICE_IS_OVERLOADED]},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "1"},
+    )
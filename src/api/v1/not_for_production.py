@@ -1,29 +1,45 @@
-from typing import Optional, Union
+from typing import Optional
 
 from fastapi import APIRouter, Depends, Query, Path
 from starlette import status
 from starlette.responses import JSONResponse
 
-from src.api.v1.dto import ProductDTO
+from src.resources import api_string_templates
+
+from src.api.v1.dto import ProductDTO, DefaultResponse
 from src.api.v1.dependencies.database import ProductRepositoryDependencyMarker
 from src.api.v1.dependencies.services import SecurityGuardServiceDependencyMarker
-from src.services.database.models.product import Product as _DB_Product
+from src.services.database.query_budget import query_budget
 from src.services.database.repositories.product_repository import ProductRepository
-from src.utils.responses import get_pydantic_model_or_return_raw_response
+from src.utils.fieldsets import parse_fieldset, InvalidFieldset
+from src.utils.responses import NotFoundJsonResponse, TrustedJsonResponse, BadRequestJsonResponse
+from src.utils.server_timing import ServerTimingRoute
 
-api_router = APIRouter(dependencies=[Depends(SecurityGuardServiceDependencyMarker)])
+api_router = APIRouter(dependencies=[Depends(SecurityGuardServiceDependencyMarker)],
+                       route_class=ServerTimingRoute)
 
 
 @api_router.get(
     "/products/get/{product_id}",
-    responses={200: {"model": ProductDTO}}
+    responses={200: {"model": ProductDTO}, 400: {"model": DefaultResponse}, 404: {"model": DefaultResponse}}
 )
+@query_budget(2)
 async def get_product_by_id(
         product_id: int = Path(...),
+        fields: Optional[str] = Query(
+            None, description="Comma separated fields to return, all fields by default", example="id,name,unit_price"
+        ),
         product_repository: ProductRepository = Depends(ProductRepositoryDependencyMarker),
-) -> Union[JSONResponse, ProductDTO]:
-    product: _DB_Product = await product_repository.get_product_by_id(product_id)
-    return get_pydantic_model_or_return_raw_response(ProductDTO, product)
+) -> JSONResponse:
+    try:
+        fieldset = parse_fieldset(fields, ProductDTO)
+    except InvalidFieldset:
+        return BadRequestJsonResponse(content=api_string_templates.INVALID_FIELDSET)
+
+    product = await product_repository.get_product_record_by_id(product_id, fieldset)
+    if product is None:
+        return NotFoundJsonResponse(content=api_string_templates.OBJECT_NOT_FOUND)
+    return TrustedJsonResponse(product)
 
 
 @api_router.get("/test_api/{user_id}/items/{item_id}", status_code=status.HTTP_200_OK,
@@ -1 +1 @@
-from .config import Config
\ No newline at end of file
+from .config import Config, parse_config
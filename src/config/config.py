@@ -1,10 +1,11 @@
 import pathlib
 import secrets
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Union, Optional
 
+import cattrs
 from attr import Factory
 from attrs import define, field
-from omegaconf import MISSING
+from omegaconf import MISSING, OmegaConf
 from pydantic import PostgresDsn
 
 BASE_DIR = pathlib.Path(__file__).resolve().parent.parent.parent
@@ -37,6 +38,67 @@ class DatabaseSettings:
     password: str = MISSING
     host: str = MISSING
     db_name: str = MISSING
+    # commit transaction left open by a request if it has finished successfully
+    commit_on_success: bool = False
+
+    # read-through cache of users, that are looked up by security guard on each request
+    user_cache_size: int = 10_000
+    user_cache_ttl_seconds: float = 30.0
+    user_cache_negative_ttl_seconds: float = 5.0
+
+    # statistics of statements grouped by fingerprint, statements above threshold are logged
+    query_stats_window_size: int = 1000
+    query_stats_max_statements: int = 1000
+    slow_query_threshold_seconds: float = 0.5
+    # fraction of slow selects, that are re-executed with `EXPLAIN (ANALYZE, BUFFERS)` in background
+    # on a separate connection, each of them loads database once more for the whole query time
+    slow_query_explain_sample_rate: float = 0.0
+
+    # count statements per request and report routes, that exceed their budget or repeat a statement(N+1)
+    query_budget_enabled: bool = True
+    default_query_budget: Optional[int] = None
+    repeated_statement_threshold: int = 5
+    # raise instead of logging, it's meant for tests
+    query_budget_strict: bool = False
+
+    # full uris(`postgresql+asyncpg://...`) of read replicas, reads are routed to them
+    replica_uris: List[str] = field(factory=list)
+    # `round_robin` or `least_connections`
+    replica_selection_strategy: str = "round_robin"
+    # replica lagging more than this is skipped until it catches up
+    replica_max_lag_seconds: float = 5.0
+    replica_lag_check_interval_seconds: float = 2.0
+    # reads of repositories outside of transaction skip BEGIN/COMMIT round trips
+    autocommit_reads: bool = True
+
+    # `counter`, `estimate`, `cached` or `scan`, it's used unless client asks for another one
+    users_count_strategy: str = "counter"
+    users_count_refresh_interval_seconds: float = 30.0
+    # cached count is used only if it has been refreshed within this period
+    users_count_max_staleness_seconds: float = 120.0
+
+    # orders are partitioned by month, partitions of upcoming months are created in advance
+    orders_partitions_premake_months: int = 3
+    # partitions of months older than this are removed instead of deleting rows, None keeps orders forever
+    orders_retention_months: Optional[int] = None
+    # expired partitions are only detached, e.g. to be archived, if it's false
+    orders_drop_expired_partitions: bool = True
+    orders_partitions_maintenance_interval_seconds: float = 3600.0
+
+    # orders are rolled up into daily sales of products, it's the staleness of sales of the current day
+    sales_rollup_interval_seconds: float = 60.0
+    # order, that is committed later than this after its creation, is counted only by reconciliation
+    sales_rollup_settle_delay_seconds: float = 600.0
+    # count of recent days, that are reconciled with orders once a day has become final
+    sales_reconcile_days: int = 7
+
+    # names of products are kept in memory of every worker, so autocomplete doesn't query database
+    autocomplete_refresh_interval_seconds: float = 5.0
+    # products updated within this period before watermark are polled again, since they may be committed late
+    autocomplete_watermark_overlap_seconds: float = 60.0
+    # full rebuild drops deleted products and refreshes popularity, i.e. units sold within popularity period
+    autocomplete_rebuild_interval_seconds: float = 3600.0
+    autocomplete_popularity_days: int = 30
 
     connection_uri: str = field(default="")
 
@@ -59,6 +121,14 @@ class SecuritySettings:
     jwt_secret_key: str = secrets.token_urlsafe(32)
     # 60 minutes * 24 hours * 8 days = 8 days
     jwt_access_token_expire_in_minutes: int = 60 * 24 * 8
+    # decoded tokens are cached until they expire, but not longer than ttl
+    jwt_cache_size: int = 10_000
+    jwt_cache_ttl_seconds: float = 300.0
+
+    # argon2 hashing is offloaded to a pool, excess operations are rejected with 503
+    password_hashing_workers: int = 4
+    password_hashing_max_queue_size: int = 64
+    password_hashing_use_processes: bool = False
 
 
 @define
@@ -71,6 +141,10 @@ class ServerSettings:
     is_in_prod: bool = MISSING
     templates_dir: str = (BASE_DIR / "src" / "templates")
     api_path_prefix: str = "/api/v1"
+    # expose durations of auth, queries, password hashing and serialization in `Server-Timing` header
+    server_timing_enabled: bool = True
+    # collect prometheus metrics of requests, they're exposed by `/metrics`
+    metrics_enabled: bool = True
 
     host: str = MISSING
     port: int = MISSING
@@ -96,6 +170,19 @@ class ServerSettings:
 class RabbitMQSettings:
     uri: str = MISSING
 
+    # outbox relay publishes messages, that were written within transactions of requests
+    outbox_batch_size: int = 100
+    outbox_poll_interval_seconds: float = 1.0
+
+
+@define
+class MailingWorkerSettings:
+    prefetch_count: int = 32
+    concurrency: int = 8
+    # jobs of the same recipient received within this window are handled once
+    coalesce_window_seconds: float = 0.05
+    report_interval_seconds: float = 30.0
+
 
 @define
 class ExternalAPISettings:
@@ -110,3 +197,12 @@ class Config:
     server: ServerSettings = ServerSettings()
     external_api: ExternalAPISettings = ExternalAPISettings()
     rabbitmq: RabbitMQSettings = RabbitMQSettings()
+    mailing_worker: MailingWorkerSettings = MailingWorkerSettings()
+
+
+def parse_config(path_to_config: Union[str, pathlib.Path] = BASE_DIR / "src" / "config" / "config.yaml") -> Config:
+    dictionary_config = OmegaConf.to_container(OmegaConf.merge(
+        OmegaConf.load(path_to_config),
+        OmegaConf.structured(Config)
+    ), resolve=True)
+    return cattrs.structure(dictionary_config, Config)
@@ -3,16 +3,26 @@ from typing import Callable, Coroutine, Any
 from fastapi import FastAPI
 
 
-# noinspection PyUnusedLocal
 def create_on_startup_handler(app: FastAPI) -> Callable[..., Coroutine[Any, Any, None]]:
     async def on_startup() -> None:
-        ...
+        await app.state.db_components.start()
+        await app.state.users_count_cache.start()
+        await app.state.orders_partitions.start()
+        await app.state.sales_rollup_job.start()
+        await app.state.product_autocomplete.start()
+        await app.state.outbox_relay.start()
 
     return on_startup
 
 
 def create_on_shutdown_handler(app: FastAPI) -> Callable[..., Coroutine[Any, Any, None]]:
     async def on_shutdown() -> None:
-        await app.state.db_components.engine.dispose()
+        await app.state.outbox_relay.close()
+        await app.state.users_count_cache.close()
+        await app.state.orders_partitions.close()
+        await app.state.sales_rollup_job.close()
+        await app.state.product_autocomplete.close()
+        await app.state.db_components.dispose()
+        app.state.password_hasher.shutdown()
 
     return on_shutdown
@@ -0,0 +1,41 @@
+import time
+
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from src.utils.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_PROGRESS
+from src.utils.request_context import get_route_template
+
+
+class PrometheusMiddleware:
+    """
+    Pure ASGI middleware, that collects latency and count of in-flight requests per route.
+    Route is labeled with its path template, so that cardinality of labels doesn't depend on path parameters.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = get_route_template(scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION.labels(method, route, status_code).observe(time.perf_counter() - started_at)
+            in_progress.dec()
+
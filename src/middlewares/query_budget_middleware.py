@@ -0,0 +1,69 @@
+import logging
+from typing import List, Optional
+
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+from src.services.database.query_budget import (
+    RequestQueryLog,
+    start_request_query_log,
+    publish_request_query_log,
+    get_query_budget
+)
+from src.utils.exceptions import QueryBudgetExceeded
+from src.utils.metrics import DB_QUERIES_PER_REQUEST, DB_TIME_PER_REQUEST
+from src.utils.request_context import get_route_template
+
+logger = logging.getLogger("sqlalchemy.query_budget")
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts statements issued by each request and checks them against budget of route.
+    Budget is declared by `query_budget` decorator of endpoint or falls back to `default_budget`.
+    Statement, that is repeated at least `repeated_statement_threshold` times within a request, is reported
+    as a probable N+1 problem. Violations are logged or raised as :class:`QueryBudgetExceeded` in strict mode,
+    e.g. in tests.
+    """
+
+    def __init__(self, app: ASGIApp, default_budget: Optional[int] = None, repeated_statement_threshold: int = 5,
+                 strict: bool = False) -> None:
+        self.app = app
+        self._default_budget = default_budget
+        self._repeated_statement_threshold = repeated_statement_threshold
+        self._strict = strict
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        query_log = start_request_query_log()
+        try:
+            await self.app(scope, receive, send)
+        except BaseException:
+            # statements of failed request are accounted as well, but its error mustn't be replaced
+            self._check_query_log(scope, query_log, strict=False)
+            raise
+        self._check_query_log(scope, query_log, strict=self._strict)
+
+    def _check_query_log(self, scope: Scope, query_log: RequestQueryLog, strict: bool) -> None:
+        query_log.route = get_route_template(scope)
+        DB_QUERIES_PER_REQUEST.labels(query_log.route).observe(query_log.count)
+        DB_TIME_PER_REQUEST.labels(query_log.route).observe(query_log.total_time)
+        publish_request_query_log(query_log)
+
+        # router has put matched endpoint to the scope
+        budget = get_query_budget(scope.get("endpoint"))
+        if violations := self._find_violations(query_log, self._default_budget if budget is None else budget):
+            if strict:
+                raise QueryBudgetExceeded(query_log.route, violations)
+            for violation in violations:
+                logger.warning("Route %s has exceeded query budget: %s", query_log.route, violation)
+
+    def _find_violations(self, query_log: RequestQueryLog, budget: Optional[int]) -> List[str]:
+        violations = []
+        if budget is not None and query_log.count > budget:
+            violations.append(f"{query_log.count} statements issued, budget is {budget}")
+        for fingerprint, count in query_log.get_repeated_statements(self._repeated_statement_threshold).items():
+            violations.append(f"statement is repeated {count} times, probable N+1: {fingerprint}")
+        return violations
@@ -0,0 +1,15 @@
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+from src.utils.request_context import bind_request_scope
+
+
+class RequestContextMiddleware:
+    """Binds scope of HTTP request to the context, so that its route can be resolved anywhere down the stack"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            bind_request_scope(scope)
+        await self.app(scope, receive, send)
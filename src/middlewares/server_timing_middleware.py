@@ -0,0 +1,35 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from src.utils.server_timing import start_server_timings, SERIALIZATION_PHASE, TOTAL_PHASE
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware, that adds `Server-Timing` header with durations of request phases.
+    Unlike `BaseHTTPMiddleware` it doesn't spawn a task and doesn't proxy the body of response through a stream.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        timings = start_server_timings()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_started_at = time.perf_counter()
+                if timings.endpoint_completed_at is not None:
+                    timings.add(SERIALIZATION_PHASE, response_started_at - timings.endpoint_completed_at)
+                timings.add(TOTAL_PHASE, response_started_at - started_at)
+                MutableHeaders(scope=message).append("Server-Timing", timings.to_header())
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
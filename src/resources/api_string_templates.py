@@ -10,7 +10,14 @@ MALFORMED_PAYLOAD = "could not validate credentials"
 AUTHENTICATION_REQUIRED = "authentication required"
 
 OBJECT_NOT_FOUND = "object was not found"
+PRODUCTS_OUT_OF_STOCK = "some products are unknown or out of stock"
 
 SCOPES_MISSING = "corresponding scopes to execute this operation are missing"
 TOKEN_IS_INCORRECT = "Input bearer token is incorrect"
 TOKEN_IS_MISSING = "Bearer token is missing"
+
+INVALID_CURSOR = "pagination cursor is malformed"
+INVALID_FIELDSET = "fields are unknown or empty"
+INVALID_PERIOD = "period has to be non-empty and not longer than a year"
+
+SERVICE_IS_OVERLOADED = "service is overloaded, try again later"
@@ -1,7 +1,8 @@
 import asyncio
 
-
-async def send_email():
-    await asyncio.sleep(5)  # TODO replace with real implementation
+# durable queue, that is declared and consumed by mailing worker(`python -m src.worker`)
+MAILING_QUEUE = "mailing"
 
 
+async def send_email(email: str) -> None:
+    await asyncio.sleep(5)  # TODO replace with real implementation
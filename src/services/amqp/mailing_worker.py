@@ -0,0 +1,163 @@
+import asyncio
+import contextlib
+import dataclasses
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import orjson
+from aio_pika import connect_robust, Connection, IncomingMessage
+
+logger = logging.getLogger("amqp.mailing_worker")
+
+MailingHandler = Callable[..., Awaitable[None]]
+
+
+@dataclasses.dataclass
+class MailingMetrics:
+    processed_jobs: int = 0
+    failed_jobs: int = 0
+    coalesced_messages: int = 0
+    latency_seconds_total: float = 0.0
+    latency_seconds_max: float = 0.0
+
+    def observe(self, jobs: int, latency: float) -> None:
+        self.processed_jobs += jobs
+        self.latency_seconds_total += latency * jobs
+        self.latency_seconds_max = max(self.latency_seconds_max, latency)
+
+
+class MailingWorker:
+    """
+    Consumes mailing jobs outside of API process.
+    Count of unacknowledged messages is bounded by `prefetch_count` and count of concurrently running handlers
+    by `concurrency`. Messages received within `coalesce_window` for the same recipient are handled once.
+    Message is acknowledged only after handler has succeeded.
+    """
+
+    def __init__(self, uri: str, queue_name: str, handler: MailingHandler, prefetch_count: int = 32,
+                 concurrency: int = 8, coalesce_window: float = 0.05, report_interval: float = 30.0,
+                 **connect_kw: Any) -> None:
+        """
+
+        :param uri: uri of RabbitMQ
+        :param queue_name: durable queue, that contains jobs
+        :param handler: coroutine function, that accepts payload of job as keyword arguments
+        :param prefetch_count: count of messages delivered to worker before they're acknowledged
+        :param concurrency: count of handlers running concurrently
+        :param coalesce_window: time to wait for other jobs of the same recipient
+        :param report_interval: interval of logging throughput and latency
+        """
+        self._uri = uri
+        self._queue_name = queue_name
+        self._handler = handler
+        self._prefetch_count = prefetch_count
+        self._coalesce_window = coalesce_window
+        self._report_interval = report_interval
+        self._connect_kw = connect_kw
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._incoming: "asyncio.Queue[IncomingMessage]" = asyncio.Queue()
+        self._in_flight: Set["asyncio.Task[None]"] = set()
+        self._connection: Optional[Connection] = None
+        self._stopped = asyncio.Event()
+        self.metrics = MailingMetrics()
+
+    async def run(self) -> None:
+        self._connection = await connect_robust(self._uri, **self._connect_kw)
+        channel = await self._connection.channel()
+        await channel.set_qos(prefetch_count=self._prefetch_count)
+        queue = await channel.declare_queue(self._queue_name, durable=True)
+        consumer_tag = await queue.consume(self._incoming.put)
+        dispatcher = asyncio.create_task(self._dispatch())
+        reporter = asyncio.create_task(self._report())
+        logger.info("Mailing worker is consuming %r", self._queue_name)
+        try:
+            await self._stopped.wait()
+        finally:
+            await queue.cancel(consumer_tag)
+            for task in (dispatcher, reporter):
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+            # unacknowledged messages, that are still in buffer, will be redelivered by broker
+            if self._in_flight:
+                await asyncio.wait(self._in_flight)
+            await self._connection.close()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._incoming.get()]
+            deadline = loop.time() + self._coalesce_window
+            while len(batch) < self._prefetch_count and (timeout := deadline - loop.time()) > 0:
+                try:
+                    batch.append(await asyncio.wait_for(self._incoming.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            for recipient, messages in self._group_by_recipient(batch).items():
+                await self._semaphore.acquire()
+                task = asyncio.create_task(self._handle(recipient, messages))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+
+    def _group_by_recipient(self, messages: List[IncomingMessage]) -> Dict[str, List[IncomingMessage]]:
+        groups: Dict[str, List[IncomingMessage]] = {}
+        for message in messages:
+            try:
+                recipient = orjson.loads(message.body)["email"]
+            except (orjson.JSONDecodeError, KeyError, TypeError):
+                logger.error("Malformed mailing job is rejected: %r", message.body)
+                message.reject(requeue=False)
+                continue
+            groups.setdefault(recipient, []).append(message)
+        return groups
+
+    async def _handle(self, recipient: str, messages: List[IncomingMessage]) -> None:
+        try:
+            await self._handler(email=recipient)
+        except Exception:  # noqa
+            self.metrics.failed_jobs += len(messages)
+            logger.exception("Failed to send email to %s", recipient)
+            for message in messages:
+                # message, that has already failed once, is dropped(or dead-lettered) to avoid endless redelivery
+                await message.nack(requeue=not message.redelivered)
+            return
+        finally:
+            self._semaphore.release()
+
+        for message in messages:
+            await message.ack()
+        self.metrics.coalesced_messages += len(messages) - 1
+        self.metrics.observe(len(messages), latency=self._get_latency(messages[0]))
+
+    @staticmethod
+    def _get_latency(message: IncomingMessage) -> float:
+        """Time since job was published, if publisher has set timestamp"""
+        if message.timestamp is None:
+            return 0.0
+        published_at = message.timestamp
+        if published_at.tzinfo is None:
+            published_at = published_at.replace(tzinfo=timezone.utc)
+        return max((datetime.now(timezone.utc) - published_at).total_seconds(), 0.0)
+
+    async def _report(self) -> None:
+        reported_jobs, reported_at = 0, time.monotonic()
+        while True:
+            await asyncio.sleep(self._report_interval)
+            now, processed_jobs = time.monotonic(), self.metrics.processed_jobs
+            average_latency = self.metrics.latency_seconds_total / processed_jobs if processed_jobs else 0.0
+            logger.info(
+                "Mailing throughput: %.2f jobs/s, average latency: %.3fs, max latency: %.3fs, "
+                "failed jobs: %s, coalesced messages: %s",
+                (processed_jobs - reported_jobs) / (now - reported_at),
+                average_latency,
+                self.metrics.latency_seconds_max,
+                self.metrics.failed_jobs,
+                self.metrics.coalesced_messages,
+            )
+            reported_jobs, reported_at = processed_jobs, now
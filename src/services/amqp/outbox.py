@@ -0,0 +1,117 @@
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, Optional, cast
+
+import orjson
+from aio_pika import connect_robust, Connection, Channel, Message, DeliveryMode
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.services.database.models import OutboxMessage
+from src.services.database.repositories.outbox_repository import OutboxRepository
+from src.utils.metrics import AMQP_PUBLISH_DURATION
+
+logger = logging.getLogger("amqp.outbox")
+
+
+class OutboxRelay:
+    """
+    Drains outbox table in batches and publishes messages with publisher confirms.
+    Message is deleted from outbox only after broker has confirmed it,
+    so it's delivered at least once even if the process dies.
+    """
+
+    def __init__(self, session_pool: sessionmaker, uri: str, batch_size: int = 100,
+                 poll_interval: float = 1.0, **connect_kw: Any) -> None:
+        """
+
+        :param session_pool: sessionmaker, that produces `AsyncSession`
+        :param uri: uri of RabbitMQ
+        :param batch_size: count of messages published per transaction
+        :param poll_interval: delay between polls, when outbox has been drained
+        """
+        self._session_pool = session_pool
+        self._uri = uri
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._connect_kw = connect_kw
+        self._connection: Optional[Connection] = None
+        self._channel: Optional[Channel] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._connection is not None:
+            with contextlib.suppress(Exception):
+                await self._connection.close()
+        self._connection, self._channel = None, None
+
+    async def relay_batch(self) -> int:
+        """Publish one batch of messages, return count of published ones"""
+        channel = await self._get_channel()
+        async with cast(AsyncSession, self._session_pool()) as session:
+            async with session.begin():
+                repository = OutboxRepository(session)
+                messages = await repository.lock_batch(self._batch_size)
+                if not messages:
+                    return 0
+
+                # all messages of a batch are published at once and confirmations are awaited together
+                confirmations = await asyncio.gather(
+                    *(self._publish(channel, message) for message in messages),
+                    return_exceptions=True
+                )
+                published_ids = []
+                for message, confirmation in zip(messages, confirmations):
+                    if isinstance(confirmation, BaseException):
+                        logger.warning("Failed to publish outbox message %s: %r", message.id, confirmation)
+                    else:
+                        published_ids.append(message.id)
+                if published_ids:
+                    await repository.delete_messages(published_ids)
+
+        return len(published_ids)
+
+    @staticmethod
+    async def _publish(channel: Channel, message: OutboxMessage) -> None:
+        started_at = time.perf_counter()
+        await channel.default_exchange.publish(
+            Message(
+                orjson.dumps(message.payload),
+                content_type="application/json",
+                delivery_mode=DeliveryMode.PERSISTENT,
+                timestamp=time.time(),
+            ),
+            routing_key=message.routing_key,
+            mandatory=True,
+        )
+        AMQP_PUBLISH_DURATION.labels(message.routing_key).observe(time.perf_counter() - started_at)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                published_count = await self.relay_batch()
+            except Exception:  # noqa
+                logger.exception("Failed to relay outbox messages")
+                published_count = 0
+            # full batch means that outbox isn't drained yet, so the next one is relayed immediately
+            if published_count < self._batch_size:
+                await asyncio.sleep(self._poll_interval)
+
+    async def _get_channel(self) -> Channel:
+        if self._connection is None or self._connection.is_closed:
+            self._connection = await connect_robust(self._uri, **self._connect_kw)
+            self._channel = None
+        if self._channel is None or self._channel.is_closed:
+            # unroutable messages are returned by broker and raise `DeliveryError`, so they stay in outbox
+            self._channel = await self._connection.channel(publisher_confirms=True, on_return_raises=True)
+        return self._channel
@@ -1,12 +1,15 @@
 import asyncio
-from typing import Any, Optional, Callable, Dict, Hashable
+import contextlib
+import logging
+from typing import Any, Optional, Callable, Dict
 
 import orjson
-from aio_pika import connect_robust, Connection, Channel, DeliveryMode
+from aio_pika import connect_robust, Connection, Channel
 from aio_pika.patterns import RPC
-from aio_pika.pool import Pool
 from attr import define, field
 
+logger = logging.getLogger("amqp.rpc")
+
 
 class JsonRPC(RPC):
     SERIALIZER = orjson
@@ -15,6 +18,9 @@ class JsonRPC(RPC):
     def serialize(self, data: Any) -> bytes:
         return self.SERIALIZER.dumps(data, default=repr)
 
+    def deserialize(self, data: bytes) -> Any:
+        return self.SERIALIZER.loads(data)
+
     def serialize_exception(self, exception: Exception) -> bytes:
         return self.serialize(
             {
@@ -35,33 +41,99 @@ class Consumer:
     kwargs: Dict[str, Any] = field(factory=dict)
 
 
+class RPCUnavailable(Exception):
+    pass
+
+
 class RabbitMQService:
+    """
+    Long-lived RPC client, it's started once per application and shared by all requests.
+    Queues are declared and consumers are registered only on (re)connection,
+    connection is health-checked in background and re-established if it's lost.
+    """
 
-    def __init__(self, uri: str, *consumers: Consumer, **connect_kw: Any):
+    def __init__(self, uri: str, *consumers: Consumer, health_check_interval: float = 5.0, **connect_kw: Any):
         self._uri = uri
         self._connect_kw = connect_kw
-        self._connection_pool: Pool[Connection] = Pool(self._get_connection, max_size=15)
-        self._channel_pool: Pool[Channel] = Pool(self._get_channel, max_size=10)
-        self._rpc: Optional[RPC] = None
         self._consumers = consumers
+        self._health_check_interval = health_check_interval
+        self._connection: Optional[Connection] = None
+        self._channel: Optional[Channel] = None
+        self._rpc: Optional[RPC] = None
+        self._health_check_task: Optional[asyncio.Task] = None
+
+    @property
+    def rpc(self) -> RPC:
+        if self._rpc is None or not self.is_healthy:
+            raise RPCUnavailable()
+        return self._rpc
+
+    @property
+    def is_healthy(self) -> bool:
+        return (
+                self._connection is not None and not self._connection.is_closed and
+                self._channel is not None and not self._channel.is_closed
+        )
 
-    async def _get_channel(self) -> Channel:
-        async with self._connection_pool.acquire() as connection:
-            return await connection.channel()
-
-    async def _get_connection(self) -> Connection:
-        return await connect_robust(self._uri, **self._connect_kw)
+    async def start(self) -> None:
+        """Connect to broker, if it isn't available, connection is retried in background"""
+        try:
+            await self._connect()
+        except Exception:  # noqa
+            logger.exception("Failed to connect to RabbitMQ, retrying in background")
+        self._health_check_task = asyncio.create_task(self._keep_connection_healthy())
+
+    async def close(self) -> None:
+        if self._health_check_task is not None:
+            self._health_check_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._health_check_task
+            self._health_check_task = None
+        await self._disconnect()
+
+    async def _connect(self) -> None:
+        connection = await connect_robust(self._uri, **self._connect_kw)
+        try:
+            channel = await connection.channel()
+            rpc = await JsonRPC.create(channel)
+            for consumer in self._consumers:
+                await rpc.register(consumer.name, consumer.callback, **consumer.kwargs)
+        except BaseException:
+            # robust connection would keep reconnecting in background, so it's closed before the next attempt
+            with contextlib.suppress(Exception):
+                await connection.close()
+            raise
+        self._connection, self._channel, self._rpc = connection, channel, rpc
+
+    async def _disconnect(self) -> None:
+        rpc, connection = self._rpc, self._connection
+        self._connection, self._channel, self._rpc = None, None, None
+        with contextlib.suppress(Exception):
+            if rpc is not None:
+                await rpc.close()
+            if connection is not None:
+                await connection.close()
+
+    async def _keep_connection_healthy(self) -> None:
+        while True:
+            await asyncio.sleep(self._health_check_interval)
+            if self.is_healthy:
+                continue
+            logger.warning("Connection to RabbitMQ is lost, reconnecting")
+            await self._disconnect()
+            try:
+                await self._connect()
+            except Exception:  # noqa
+                logger.exception("Failed to reconnect to RabbitMQ")
 
     async def __aenter__(self) -> RPC:
-        async with self._connection_pool.acquire():
-            async with self._channel_pool.acquire() as channel:
-                rpc = JsonRPC(channel)
-                await rpc.initialize()
-                self._rpc = rpc
-
-                for consumer in self._consumers:
-                    await self._rpc.register(consumer.name, consumer.callback, **consumer.kwargs)
-
-                return self._rpc
-
-    async def __aexit__(self, exc_type, exc_val, exc_tb): pass
+        await self.start()
+        try:
+            return self.rpc
+        except RPCUnavailable:
+            # `__aexit__` isn't called, if `__aenter__` has failed, so reconnection is stopped here
+            await self.close()
+            raise
+
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        await self.close()
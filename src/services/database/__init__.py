@@ -1,4 +1,4 @@
-from .exceptions import DatabaseError
-from .models import User, Product, Order
+from .exceptions import DatabaseError, InsufficientStock
+from .models import User, Product, Order, OutboxMessage
 
-__all__ = ("DatabaseError", "User", "Product", "Order")
+__all__ = ("DatabaseError", "InsufficientStock", "User", "Product", "Order", "OutboxMessage")
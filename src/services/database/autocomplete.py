@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+import datetime
+import logging
+import time
+from typing import Any, Callable, List, Optional, Sequence, cast
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.services.database.repositories.product_repository import ProductRepository
+from src.services.database.repositories.sales_repository import SalesRepository
+from src.utils.prefix_index import Completion, PrefixIndex
+
+logger = logging.getLogger("sqlalchemy.autocomplete")
+
+
+def _advance(watermark: Optional[datetime.datetime], rows: Sequence[Any]) -> Optional[datetime.datetime]:
+    """The latest `updated_at` of rows, that are (id, name, updated_at), or of watermark"""
+    latest = max(updated_at for _, _, updated_at in rows)
+    return latest if watermark is None or latest > watermark else watermark
+
+
+class ProductAutocomplete:
+    """
+    Prefix index of names of products, that is kept in memory of every worker, so suggestions are served
+    without querying database. It's built on start, then products, whose `updated_at` is past watermark,
+    are polled and applied incrementally. Every worker polls on its own, so suggestions of all of them
+    converge within `refresh_interval`. Index is rebuilt periodically, so deleted products disappear
+    and popularity, i.e. units sold recently, is refreshed
+    """
+
+    def __init__(self, session_pool: sessionmaker, refresh_interval: float = 5.0, watermark_overlap: float = 60.0,
+                 rebuild_interval: float = 3600.0, popularity_days: int = 30, chunk_size: int = 10_000,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+
+        :param session_pool: sessionmaker, that produces `AsyncSession`
+        :param refresh_interval: interval between polls of changed products
+        :param watermark_overlap: products updated within this period before watermark are polled again,
+                                  since `updated_at` is the start of transaction, that may have been committed later
+        :param rebuild_interval: interval between full rebuilds of index
+        :param popularity_days: popularity of product is count of units sold within this count of days
+        :param chunk_size: count of products fetched per round trip
+        """
+        self._session_pool = session_pool
+        self._refresh_interval = refresh_interval
+        self._watermark_overlap = datetime.timedelta(seconds=watermark_overlap)
+        self._rebuild_interval = rebuild_interval
+        self._popularity_days = popularity_days
+        self._chunk_size = chunk_size
+        self._clock = clock
+        self.index = PrefixIndex()
+        self._watermark: Optional[datetime.datetime] = None
+        self._rebuilt_at: Optional[float] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def complete(self, prefix: str, limit: int) -> List[Completion]:
+        return self.index.complete(prefix, limit)
+
+    def notify_changed(self) -> None:
+        """Poll changes now instead of waiting for the next refresh, e.g. after product has been added"""
+        if self._changed is not None:
+            self._changed.set()
+
+    async def rebuild(self) -> None:
+        started_at = self._clock()
+        async with cast(AsyncSession, self._session_pool()) as session:
+            today = datetime.datetime.utcnow().date()
+            popularity = await SalesRepository(session).get_units_by_product(
+                today - datetime.timedelta(days=self._popularity_days), today + datetime.timedelta(days=1)
+            )
+            names: List[Completion] = []
+            watermark = None
+            async for rows in ProductRepository(session).stream_names(chunk_size=self._chunk_size):
+                names.extend((product_id, name) for product_id, name, _ in rows)
+                watermark = _advance(watermark, rows)
+        # sorting of all names is offloaded, so requests are served meanwhile from the previous index,
+        # which is replaced at once
+        self.index = await asyncio.get_running_loop().run_in_executor(None, PrefixIndex, names, popularity)
+        self._watermark, self._rebuilt_at = watermark, started_at
+
+    async def refresh(self) -> int:
+        """Apply products, that have been changed since watermark, return count of changed names"""
+        changed = 0
+        async with cast(AsyncSession, self._session_pool()) as session:
+            updated_after = self._watermark - self._watermark_overlap if self._watermark is not None else None
+            stream = ProductRepository(session).stream_names(updated_after, chunk_size=self._chunk_size)
+            async for rows in stream:
+                changed += self.index.upsert_many((product_id, name) for product_id, name, _ in rows)
+                self._watermark = _advance(self._watermark, rows)
+        return changed
+
+    async def start(self) -> None:
+        self._changed = asyncio.Event()
+        try:
+            await self.rebuild()
+        except Exception:  # noqa
+            # suggestions are empty until the next attempt, it mustn't prevent application from starting
+            logger.exception("Failed to build autocomplete index of products")
+        self._task = asyncio.create_task(self._keep_refreshing())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _keep_refreshing(self) -> None:
+        changed = cast(asyncio.Event, self._changed)
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(changed.wait(), timeout=self._refresh_interval)
+            changed.clear()
+            try:
+                if self._rebuilt_at is None or self._clock() - self._rebuilt_at >= self._rebuild_interval:
+                    await self.rebuild()
+                else:
+                    await self.refresh()
+            except Exception:  # noqa
+                logger.exception("Failed to refresh autocomplete index of products")
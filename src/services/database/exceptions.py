@@ -1,6 +1,15 @@
+from typing import Sequence
+
+
 class DatabaseError(Exception):
     def __init__(self, orig: Exception):
         self.orig = orig
 
     def __str__(self) -> str:
         return f"<Exception {self} message={self.orig}>. Original exception traceback:" + self.orig.__str__()
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids: Sequence[int]):
+        self.product_ids = list(product_ids)
+        super(InsufficientStock, self).__init__(f"Products are unknown or out of stock: {self.product_ids}")
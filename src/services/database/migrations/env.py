@@ -7,15 +7,14 @@ from alembic import context
 from sqlalchemy import engine_from_config, pool
 from sqlalchemy.ext.asyncio import AsyncEngine
 
-from src.__main__ import _parse_config
-from src.config.config import BASE_DIR
+from src.config.config import parse_config
 from src.services.database.models.base import Base
 
 target_metadata = Base.metadata
 
 config = context.config  # type: ignore
 fileConfig(config.config_file_name)
-application_settings = _parse_config(BASE_DIR / "src" / "config" / "config.yaml")
+application_settings = parse_config()
 config.set_main_option("sqlalchemy.url", application_settings.database.connection_uri)
 
 
@@ -0,0 +1,30 @@
+"""outbox messages
+
+Revision ID: 3f9c2d7a1b6e
+Revises: 799986945827
+Create Date: 2026-10-18 12:04:31.512334
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = '3f9c2d7a1b6e'
+down_revision = '799986945827'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox_messages',
+                    sa.Column('id', sa.BigInteger(), sa.Identity(always=True), nullable=False),
+                    sa.Column('routing_key', sa.VARCHAR(length=255), nullable=False),
+                    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), server_default='{}',
+                              nullable=False),
+                    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+
+
+def downgrade():
+    op.drop_table('outbox_messages')
@@ -0,0 +1,40 @@
+"""updated_at of products maintained by trigger
+
+Revision ID: 5d2a8c1e7b39
+Revises: 0b9e4f6a2c71
+Create Date: 2026-10-19 00:41:27.550183
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = '5d2a8c1e7b39'
+down_revision = '0b9e4f6a2c71'
+branch_labels = None
+depends_on = None
+
+SET_UPDATED_AT_FUNCTION = """
+CREATE FUNCTION set_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade():
+    op.add_column('products', sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'),
+                                        nullable=False))
+    op.create_index(op.f('ix_products_updated_at'), 'products', ['updated_at'], unique=False)
+    op.execute(SET_UPDATED_AT_FUNCTION)
+    # writes, that bypass repositories, bump it as well
+    op.execute('CREATE TRIGGER products_set_updated_at BEFORE UPDATE ON products '
+               'FOR EACH ROW EXECUTE FUNCTION set_updated_at()')
+
+
+def downgrade():
+    op.execute('DROP TRIGGER products_set_updated_at ON products')
+    op.execute('DROP FUNCTION set_updated_at()')
+    op.drop_index(op.f('ix_products_updated_at'), table_name='products')
+    op.drop_column('products', 'updated_at')
@@ -0,0 +1,22 @@
+"""admin flag of users
+
+Revision ID: 9a4e1c6b8d35
+Revises: 5d2a8c1e7b39
+Create Date: 2026-10-19 03:12:08.417265
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = '9a4e1c6b8d35'
+down_revision = '5d2a8c1e7b39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('is_admin', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    op.drop_column('users', 'is_admin')
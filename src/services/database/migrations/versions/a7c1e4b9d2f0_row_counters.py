@@ -0,0 +1,61 @@
+"""row counters maintained by triggers
+
+Revision ID: a7c1e4b9d2f0
+Revises: 3f9c2d7a1b6e
+Create Date: 2026-10-18 18:21:07.104389
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'a7c1e4b9d2f0'
+down_revision = '3f9c2d7a1b6e'
+branch_labels = None
+depends_on = None
+
+COUNTED_TABLES = ("users",)
+
+# statement-level triggers with transition tables update counter once per statement instead of once per row
+COUNT_ROWS_FUNCTION = """
+CREATE FUNCTION count_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE row_counters SET row_count = row_count + (SELECT count(*) FROM new_rows)
+        WHERE table_name = TG_TABLE_NAME;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE row_counters SET row_count = row_count - (SELECT count(*) FROM old_rows)
+        WHERE table_name = TG_TABLE_NAME;
+    ELSE
+        UPDATE row_counters SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade():
+    op.create_table('row_counters',
+                    sa.Column('table_name', sa.VARCHAR(length=63), nullable=False),
+                    sa.Column('row_count', sa.BigInteger(), server_default='0', nullable=False),
+                    sa.PrimaryKeyConstraint('table_name')
+                    )
+    op.execute(COUNT_ROWS_FUNCTION)
+    for table in COUNTED_TABLES:
+        # writes are blocked until migration commits, so no row is missed between seeding and triggers
+        op.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+        op.execute(f"INSERT INTO row_counters (table_name, row_count) SELECT '{table}', count(*) FROM {table}")
+        op.execute(f"CREATE TRIGGER {table}_count_insert AFTER INSERT ON {table} "
+                   f"REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION count_rows()")
+        op.execute(f"CREATE TRIGGER {table}_count_delete AFTER DELETE ON {table} "
+                   f"REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION count_rows()")
+        op.execute(f"CREATE TRIGGER {table}_count_truncate AFTER TRUNCATE ON {table} "
+                   f"FOR EACH STATEMENT EXECUTE FUNCTION count_rows()")
+
+
+def downgrade():
+    for table in COUNTED_TABLES:
+        for operation in ("insert", "delete", "truncate"):
+            op.execute(f"DROP TRIGGER {table}_count_{operation} ON {table}")
+    op.execute("DROP FUNCTION count_rows()")
+    op.drop_table('row_counters')
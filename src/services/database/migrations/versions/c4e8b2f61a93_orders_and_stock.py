@@ -0,0 +1,37 @@
+"""stock of products and lines of orders
+
+Revision ID: c4e8b2f61a93
+Revises: a7c1e4b9d2f0
+Create Date: 2026-10-18 19:02:45.671203
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = 'c4e8b2f61a93'
+down_revision = 'a7c1e4b9d2f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('products', sa.Column('stock', sa.Integer(), server_default='0', nullable=False))
+    op.create_check_constraint('products_stock_check', 'products', 'stock >= 0')
+    op.alter_column('orders', 'product_id', type_=sa.Integer(), existing_type=sa.SmallInteger())
+    op.add_column('orders', sa.Column('checkout_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.add_column('orders', sa.Column('user_id', sa.BigInteger(), nullable=True))
+    op.add_column('orders', sa.Column('unit_price', sa.Numeric(precision=8), nullable=True))
+    op.create_foreign_key('orders_user_id_fkey', 'orders', 'users', ['user_id'], ['id'], ondelete='SET NULL')
+    op.create_index(op.f('ix_orders_checkout_id'), 'orders', ['checkout_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_orders_checkout_id'), table_name='orders')
+    op.drop_constraint('orders_user_id_fkey', 'orders', type_='foreignkey')
+    op.drop_column('orders', 'unit_price')
+    op.drop_column('orders', 'user_id')
+    op.drop_column('orders', 'checkout_id')
+    op.alter_column('orders', 'product_id', type_=sa.SmallInteger(), existing_type=sa.Integer())
+    op.drop_constraint('products_stock_check', 'products', type_='check')
+    op.drop_column('products', 'stock')
@@ -0,0 +1,111 @@
+"""partition orders by month of created_at
+
+Revision ID: e5a3d9c7f2b4
+Revises: c4e8b2f61a93
+Create Date: 2026-10-18 21:14:09.318562
+
+"""
+import datetime
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = 'e5a3d9c7f2b4'
+down_revision = 'c4e8b2f61a93'
+branch_labels = None
+depends_on = None
+
+# partitions of upcoming months are created in advance, later ones are created by `MonthlyPartitionManager`
+PREMAKE_MONTHS = 3
+COLUMNS = "order_id, checkout_id, user_id, product_id, quantity, unit_price, created_at"
+
+
+def _add_months(month: datetime.datetime, months: int) -> datetime.datetime:
+    year, month_index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return datetime.datetime(year, month_index + 1, 1)
+
+
+def upgrade():
+    # partitioned table can't be made of existing one, so rows are moved to a new table
+    op.rename_table('orders', 'orders_unpartitioned')
+    op.execute('ALTER TABLE orders_unpartitioned RENAME CONSTRAINT orders_pkey TO orders_unpartitioned_pkey')
+    op.execute('ALTER INDEX ix_orders_checkout_id RENAME TO ix_orders_unpartitioned_checkout_id')
+
+    # partitioned tables don't support identity columns before PostgreSQL 17, so id is generated by sequence
+    op.create_table('orders',
+                    sa.Column('order_id', sa.BigInteger(), nullable=False),
+                    sa.Column('checkout_id', postgresql.UUID(as_uuid=True), nullable=True),
+                    sa.Column('user_id', sa.BigInteger(), nullable=True),
+                    sa.Column('product_id', sa.Integer(), nullable=True),
+                    sa.Column('quantity', sa.SmallInteger(), server_default='1', nullable=True),
+                    sa.Column('unit_price', sa.Numeric(precision=8), nullable=True),
+                    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+                    sa.ForeignKeyConstraint(['product_id'], ['products.id'], onupdate='CASCADE',
+                                            ondelete='CASCADE'),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='orders_user_id_fkey',
+                                            ondelete='SET NULL'),
+                    # key of partitioned table has to include partition key
+                    sa.PrimaryKeyConstraint('order_id', 'created_at', name='orders_pkey'),
+                    postgresql_partition_by='RANGE (created_at)'
+                    )
+    op.create_index(op.f('ix_orders_checkout_id'), 'orders', ['checkout_id'], unique=False)
+
+    # there is no default partition: rows out of range are rejected instead of being piled up in it,
+    # since default partition is scanned every time a partition is created
+    bind = op.get_bind()
+    oldest, now = bind.execute(sa.text(
+        "SELECT coalesce(min(created_at), now()::timestamp), now()::timestamp FROM orders_unpartitioned"
+    )).one()
+    month = datetime.datetime(oldest.year, oldest.month, 1)
+    last_month = _add_months(datetime.datetime(now.year, now.month, 1), PREMAKE_MONTHS)
+    while month <= last_month:
+        next_month = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE orders_y{month.year:04d}m{month.month:02d} PARTITION OF orders "
+            f"FOR VALUES FROM ('{month.isoformat(sep=' ')}') TO ('{next_month.isoformat(sep=' ')}')"
+        )
+        month = next_month
+
+    op.execute(
+        f"INSERT INTO orders ({COLUMNS}) "
+        f"SELECT {COLUMNS.replace('created_at', 'coalesce(created_at, now())')} FROM orders_unpartitioned"
+    )
+    op.drop_table('orders_unpartitioned')
+
+    op.execute('CREATE SEQUENCE orders_order_id_seq AS BIGINT OWNED BY orders.order_id')
+    op.execute("SELECT setval('orders_order_id_seq', coalesce(max(order_id), 0) + 1, false) FROM orders")
+    op.alter_column('orders', 'order_id', server_default=sa.text("nextval('orders_order_id_seq')"))
+
+
+def downgrade():
+    op.rename_table('orders', 'orders_partitioned')
+    op.execute('ALTER TABLE orders_partitioned RENAME CONSTRAINT orders_pkey TO orders_partitioned_pkey')
+    op.execute('ALTER INDEX ix_orders_checkout_id RENAME TO ix_orders_partitioned_checkout_id')
+    op.alter_column('orders_partitioned', 'order_id', server_default=None)
+    op.execute('DROP SEQUENCE orders_order_id_seq')
+
+    op.create_table('orders',
+                    sa.Column('order_id', sa.Integer(), sa.Identity(always=True, cache=5), nullable=False),
+                    sa.Column('product_id', sa.Integer(), nullable=True),
+                    sa.Column('quantity', sa.SmallInteger(), server_default='1', nullable=True),
+                    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+                    sa.Column('checkout_id', postgresql.UUID(as_uuid=True), nullable=True),
+                    sa.Column('user_id', sa.BigInteger(), nullable=True),
+                    sa.Column('unit_price', sa.Numeric(precision=8), nullable=True),
+                    sa.ForeignKeyConstraint(['product_id'], ['products.id'], onupdate='CASCADE',
+                                            ondelete='CASCADE'),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='orders_user_id_fkey',
+                                            ondelete='SET NULL'),
+                    sa.PrimaryKeyConstraint('order_id', name='orders_pkey')
+                    )
+    op.create_index(op.f('ix_orders_checkout_id'), 'orders', ['checkout_id'], unique=False)
+    op.execute(
+        f"INSERT INTO orders ({COLUMNS}) OVERRIDING SYSTEM VALUE SELECT {COLUMNS} FROM orders_partitioned"
+    )
+    # partitions are dropped along with partitioned table
+    op.drop_table('orders_partitioned')
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('orders', 'order_id'), coalesce(max(order_id), 0) + 1, false) "
+        "FROM orders"
+    )
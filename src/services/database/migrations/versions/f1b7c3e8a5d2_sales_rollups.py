@@ -0,0 +1,47 @@
+"""daily sales rollups
+
+Revision ID: f1b7c3e8a5d2
+Revises: e5a3d9c7f2b4
+Create Date: 2026-10-18 22:37:51.904127
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'f1b7c3e8a5d2'
+down_revision = 'e5a3d9c7f2b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sales_rollups',
+                    sa.Column('day', sa.Date(), nullable=False),
+                    sa.Column('product_id', sa.Integer(), nullable=False),
+                    sa.Column('units', sa.BigInteger(), server_default='0', nullable=False),
+                    sa.Column('revenue', sa.Numeric(precision=18), server_default='0', nullable=False),
+                    sa.Column('order_lines', sa.BigInteger(), server_default='0', nullable=False),
+                    sa.PrimaryKeyConstraint('day', 'product_id')
+                    )
+    op.create_table('rollup_watermarks',
+                    sa.Column('rollup_name', sa.VARCHAR(length=63), nullable=False),
+                    sa.Column('rolled_up_to', sa.DateTime(), nullable=False),
+                    sa.PrimaryKeyConstraint('rollup_name')
+                    )
+    # existing orders are rolled up at once, the current day is recomputed by the first run of rollup job
+    op.execute(
+        "INSERT INTO sales_rollups (day, product_id, units, revenue, order_lines) "
+        "SELECT CAST(date_trunc('day', orders.created_at) AS DATE), orders.product_id, sum(orders.quantity), "
+        "sum(orders.quantity * coalesce(orders.unit_price, products.unit_price)), count(*) "
+        "FROM orders JOIN products ON products.id = orders.product_id "
+        "GROUP BY 1, 2"
+    )
+    op.execute(
+        "INSERT INTO rollup_watermarks (rollup_name, rolled_up_to) "
+        "VALUES ('sales', date_trunc('day', now())::timestamp)"
+    )
+
+
+def downgrade():
+    op.drop_table('rollup_watermarks')
+    op.drop_table('sales_rollups')
@@ -1,5 +1,9 @@
 from .order import Order
+from .outbox import OutboxMessage
 from .product import SizeEnum, Product
+from .row_counter import RowCounter
+from .sales_rollup import RollupWatermark, SalesRollup
 from .user import User
 
-__all__ = ("SizeEnum", "User", "Order", "Product")
+__all__ = ("SizeEnum", "User", "Order", "Product", "OutboxMessage", "RowCounter", "SalesRollup",
+           "RollupWatermark")
@@ -1,13 +1,13 @@
 import logging
 import time
-from typing import Optional, cast, Type, Dict, Any
+from typing import Optional, cast, Type, Dict, Any, Sequence
 from sqlalchemy import inspect, event
 from sqlalchemy.dialects.postgresql.asyncpg import (
     AsyncAdapt_asyncpg_cursor,
     PGExecutionContext_asyncpg,
 )
 from sqlalchemy.engine import URL
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncConnection
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncConnection, AsyncEngine
 from sqlalchemy.future import Connection
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.decl_api import (
@@ -18,6 +18,13 @@ from sqlalchemy.orm.decl_api import (
 )
 from sqlalchemy.util import ImmutableProperties
 
+from src.services.database.query_budget import record_query
+from src.services.database.query_stats import QueryStatistics
+from src.services.database.replicas import ReplicaSet, Replica, RoutingSession, ReplicaSelectionStrategy
+from src.services.database.unit_of_work import on_pool_checkout
+from src.utils.metrics import DB_QUERY_DURATION, create_pool_usage_listener
+from src.utils.server_timing import record_timing, DB_PHASE
+
 logger = logging.getLogger("sqlalchemy.execution")
 
 mapper_registry = registry()
@@ -80,27 +87,88 @@ def after_execute(
         parameters: tuple,
         context: PGExecutionContext_asyncpg,
         executemany: bool,
-):
+) -> float:
     total = time.monotonic() - conn.info["query_start_time"].pop(-1)
+    record_timing(DB_PHASE, total)
+    DB_QUERY_DURATION.observe(total)
     # sqlalchemy bug, executed twice `#4181` issue number
     logger.debug("Query Complete!")
     logger.debug("Total Time: %s", total)
+    return total
 
 
 class DatabaseComponents:
-    def __init__(self, connection_uri: str, **engine_kwargs) -> None:
+    def __init__(self, connection_uri: str, query_statistics: Optional[QueryStatistics] = None,
+                 replica_uris: Sequence[str] = (),
+                 replica_selection_strategy: ReplicaSelectionStrategy = ReplicaSelectionStrategy.ROUND_ROBIN,
+                 replica_max_lag: float = 5.0, replica_lag_check_interval: float = 2.0,
+                 autocommit_reads: bool = True, **engine_kwargs) -> None:
+        """
+
+        :param connection_uri: uri of primary
+        :param replica_uris: uris of read replicas, reads of session are sent to one of them
+        :param replica_selection_strategy: how replica is chosen for a session
+        :param replica_max_lag: replica lagging more than this count of seconds is skipped
+        :param replica_lag_check_interval: interval of checking lag of replicas
+        :param autocommit_reads: execute reads of repositories outside of transaction in autocommit mode
+        """
         self.__engine_kwargs = engine_kwargs or {}
+        self.query_statistics = query_statistics
         self.engine = create_async_engine(url=connection_uri, **self.__engine_kwargs)
+        self.replica_set = ReplicaSet(
+            [
+                Replica(f"replica-{index}", create_async_engine(url=replica_uri, **self.__engine_kwargs))
+                for index, replica_uri in enumerate(replica_uris)
+            ],
+            strategy=replica_selection_strategy,
+            max_lag=replica_max_lag,
+            lag_check_interval=replica_lag_check_interval
+        )
         self.sessionmaker = sessionmaker(  # NOQA
-            self.engine, class_=AsyncSession, expire_on_commit=False, autoflush=False
+            self.engine, class_=AsyncSession, expire_on_commit=False, autoflush=False,
+            sync_session_class=RoutingSession,
+            replica_set=self.replica_set if self.replica_set.replicas else None,
+            autocommit_reads=autocommit_reads
         )
         self.setup_db_events()
 
     def setup_db_events(self) -> None:
+        self._setup_engine_events(self.engine, name="primary")
+        for replica in self.replica_set.replicas:
+            self._setup_engine_events(replica.engine, name=replica.name)
+
+    def _setup_engine_events(self, engine: AsyncEngine, name: str) -> None:
         event.listen(
-            self.engine.sync_engine, "before_cursor_execute", before_execute_handler
+            engine.sync_engine, "before_cursor_execute", before_execute_handler
         )
-        event.listen(self.engine.sync_engine, "after_cursor_execute", after_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        pool = engine.sync_engine.pool
+        event.listen(pool, "checkout", on_pool_checkout)
+        # e.g. `NullPool` doesn't track checked out connections
+        if hasattr(pool, "checkedout") and hasattr(pool, "overflow"):
+            pool_usage_listener = create_pool_usage_listener(pool, name)
+            event.listen(pool, "checkout", pool_usage_listener)
+            event.listen(pool, "checkin", pool_usage_listener)
+
+    async def start(self) -> None:
+        await self.replica_set.start()
+        if self.query_statistics is not None:
+            await self.query_statistics.start()
+
+    async def dispose(self) -> None:
+        if self.query_statistics is not None:
+            await self.query_statistics.close()
+        await self.replica_set.close()
+        for replica in self.replica_set.replicas:
+            await replica.engine.dispose()
+        await self.engine.dispose()
+
+    def _after_cursor_execute(self, conn: Connection, cursor: AsyncAdapt_asyncpg_cursor, statement: str,
+                              parameters: tuple, context: PGExecutionContext_asyncpg, executemany: bool) -> None:
+        total = after_execute(conn, cursor, statement, parameters, context, executemany)
+        record_query(statement, total)
+        if self.query_statistics is not None:
+            self.query_statistics.observe(conn, cursor, statement, parameters, context, executemany, total)
 
     async def recreate(self) -> None:
         async with self.engine.begin() as conn:
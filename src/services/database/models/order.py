@@ -1,16 +1,25 @@
 import sqlalchemy as sa
-from sqlalchemy import Identity
+from sqlalchemy.dialects.postgresql import UUID
 
 from src.services.database.models.base import Base
 
 
 class Order(Base):
-    """Таблица заказов"""
+    """Таблица заказов, каждая строка - позиция заказа, позиции одного заказа имеют общий checkout_id"""
 
-    order_id = sa.Column(sa.Integer, Identity(always=True, cache=5), primary_key=True)
+    # monthly partitions are created and dropped by `MonthlyPartitionManager`,
+    # so key of partitioned table has to include created_at
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    # partitioned tables don't support identity columns, so id is generated by sequence
+    order_id = sa.Column(sa.BigInteger, sa.Sequence("orders_order_id_seq"), primary_key=True)
+    checkout_id = sa.Column(UUID(as_uuid=True), nullable=True, index=True)
+    user_id = sa.Column(sa.BigInteger, sa.ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     product_id = sa.Column(
-        sa.SmallInteger,
+        sa.Integer,
         sa.ForeignKey("products.id", ondelete="CASCADE", onupdate="CASCADE"),
     )
     quantity = sa.Column(sa.SmallInteger, server_default="1")
-    created_at = sa.Column(sa.DateTime(), server_default=sa.func.now())  # type: ignore
+    # price at the moment of checkout, price of product may change later
+    unit_price = sa.Column(sa.Numeric(precision=8), nullable=True)
+    created_at = sa.Column(sa.DateTime(), primary_key=True, server_default=sa.func.now())  # type: ignore
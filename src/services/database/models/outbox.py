@@ -0,0 +1,16 @@
+import sqlalchemy as sa
+from sqlalchemy import Identity
+from sqlalchemy.dialects.postgresql import JSONB
+
+from src.services.database.models.base import Base
+
+
+class OutboxMessage(Base):
+    """Сообщения, которые будут опубликованы в брокер после коммита транзакции"""
+
+    __tablename__ = "outbox_messages"
+
+    id = sa.Column(sa.BigInteger, Identity(always=True), primary_key=True)
+    routing_key = sa.Column(sa.VARCHAR(255), nullable=False)
+    payload = sa.Column(JSONB, nullable=False, server_default="{}")
+    created_at = sa.Column(sa.DateTime(), server_default=sa.func.now())  # type: ignore
@@ -2,6 +2,8 @@ import enum
 
 import sqlalchemy as sa
 from sqlalchemy import Identity
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 
 from src.services.database.models.base import Base
 
@@ -13,12 +15,32 @@ class SizeEnum(enum.Enum):
     VERY_LARGE = "XXL"
 
 
+# matches in name rank above matches in description
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
 class Product(Base):
     """Таблица продуктов"""
 
+    __table_args__ = (
+        sa.Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        # fuzzy matches of name, e.g. misspelled or incomplete words, require pg_trgm extension
+        sa.Index("ix_products_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
+
     id = sa.Column(sa.Integer, Identity(always=True, cache=5), primary_key=True)
     name = sa.Column(sa.VARCHAR(255), unique=True, index=True)
     unit_price = sa.Column(sa.Numeric(precision=8), server_default="1")
     size = sa.Column(sa.Enum(SizeEnum))
     description = sa.Column(sa.Text, default=None, nullable=True)
     created_at = sa.Column(sa.DateTime(), server_default=sa.func.now())  # type: ignore
+    # units available for ordering, they're reserved by conditional update, so stock never goes below zero
+    stock = sa.Column(sa.Integer, sa.CheckConstraint("stock >= 0", name="products_stock_check"), nullable=False,
+                      server_default="0")
+    # it's set by trigger on every update, products changed since watermark are polled by autocomplete index
+    updated_at = sa.Column(sa.DateTime(), server_default=sa.func.now(), nullable=False, index=True)  # type: ignore
+    # it's used only by search, so it isn't loaded with product
+    search_vector = deferred(sa.Column(TSVECTOR, sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)))
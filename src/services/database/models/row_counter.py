@@ -0,0 +1,14 @@
+import sqlalchemy as sa
+
+from src.services.database.models.base import Base
+
+
+class RowCounter(Base):
+    """Точное количество строк таблиц, поддерживается триггерами"""
+
+    __tablename__ = "row_counters"
+
+    # inserts and deletes of a counted table update its counter row, so they're serialized on it until commit
+
+    table_name = sa.Column(sa.VARCHAR(63), primary_key=True)
+    row_count = sa.Column(sa.BigInteger, nullable=False, server_default="0")
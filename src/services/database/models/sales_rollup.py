@@ -0,0 +1,26 @@
+import sqlalchemy as sa
+
+from src.services.database.models.base import Base
+
+
+class SalesRollup(Base):
+    """Продажи товаров по дням, пересчитываются фоновой задачей из таблицы заказов"""
+
+    __tablename__ = "sales_rollups"
+
+    # day in UTC, orders are bucketed by created_at
+    day = sa.Column(sa.Date, primary_key=True)
+    # there is no foreign key, so history of sales outlives partitions of orders, that have been dropped
+    product_id = sa.Column(sa.Integer, primary_key=True)
+    units = sa.Column(sa.BigInteger, nullable=False, server_default="0")
+    revenue = sa.Column(sa.Numeric(precision=18), nullable=False, server_default="0")
+    order_lines = sa.Column(sa.BigInteger, nullable=False, server_default="0")
+
+
+class RollupWatermark(Base):
+    """Момент, до которого агрегаты окончательны и больше не пересчитываются"""
+
+    __tablename__ = "rollup_watermarks"
+
+    rollup_name = sa.Column(sa.VARCHAR(63), primary_key=True)
+    rolled_up_to = sa.Column(sa.DateTime(), nullable=False)
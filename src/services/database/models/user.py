@@ -13,3 +13,5 @@ class User(Base):
     password_hash = sa.Column(VARCHAR(100), unique=False)
     balance = sa.Column(sa.DECIMAL, server_default="0")
     username = sa.Column(sa.VARCHAR(70), nullable=False, unique=True, index=True)
+    # only admins are granted "admin" scope, scopes requested by client aren't trusted
+    is_admin = sa.Column(sa.Boolean, nullable=False, server_default=sa.false())
@@ -0,0 +1,172 @@
+import asyncio
+import contextlib
+import datetime
+import logging
+import re
+import zlib
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger("sqlalchemy.partitions")
+
+
+def month_start(moment: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime.datetime, months: int) -> datetime.datetime:
+    year, month_index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return datetime.datetime(year, month_index + 1, 1)
+
+
+class MonthlyPartition:
+    __slots__ = ("table_name", "start")
+
+    def __init__(self, table_name: str, start: datetime.datetime) -> None:
+        self.table_name = table_name
+        self.start = month_start(start)
+
+    @property
+    def end(self) -> datetime.datetime:
+        return add_months(self.start, 1)
+
+    @property
+    def name(self) -> str:
+        return f"{self.table_name}_y{self.start.year:04d}m{self.start.month:02d}"
+
+    @classmethod
+    def from_name(cls, table_name: str, name: str) -> Optional["MonthlyPartition"]:
+        """Partition named by `name`, or None if it isn't a monthly partition of table, e.g. default one"""
+        match = re.fullmatch(rf"{re.escape(table_name)}_y(\d{{4}})m(\d{{2}})", name)
+        if match is None or not 1 <= int(match.group(2)) <= 12:
+            return None
+        return cls(table_name, datetime.datetime(int(match.group(1)), int(match.group(2)), 1))
+
+    def create_sql(self) -> str:
+        return (
+            f'CREATE TABLE IF NOT EXISTS "{self.name}" PARTITION OF "{self.table_name}" '
+            f"FOR VALUES FROM ('{self.start.isoformat(sep=' ')}') TO ('{self.end.isoformat(sep=' ')}')"
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, MonthlyPartition) and (self.table_name, self.start) == (other.table_name, other.start)
+
+    def __hash__(self) -> int:
+        return hash((self.table_name, self.start))
+
+    def __repr__(self) -> str:
+        return f"MonthlyPartition({self.name})"
+
+
+class MonthlyPartitionManager:
+    """
+    Keeps table, that is partitioned by range of timestamp column, split into monthly partitions:
+    partitions of `premake_months` upcoming months are created in advance, so inserts never miss a partition,
+    and partitions, that are older than `retention_months`, are detached and dropped,
+    which is instant and leaves no dead tuples unlike bulk DELETE.
+    Every worker may run maintenance, advisory lock lets only one of them do it at a time
+    """
+
+    def __init__(self, engine: AsyncEngine, table_name: str, premake_months: int = 3,
+                 retention_months: Optional[int] = None, drop_expired: bool = True,
+                 maintenance_interval: float = 3600.0, lock_timeout: float = 5.0,
+                 clock: Callable[[], datetime.datetime] = datetime.datetime.utcnow) -> None:
+        """
+
+        :param engine: engine of primary database
+        :param table_name: name of partitioned table
+        :param premake_months: count of months after the current one, that have partitions in advance
+        :param retention_months: count of months before the current one, that are kept, None keeps all of them
+        :param drop_expired: expired partitions are only detached, if it's false, e.g. to archive them
+        :param maintenance_interval: interval between maintenances
+        :param lock_timeout: DDL gives up instead of queueing behind long transactions and blocking table
+        """
+        self._engine = engine
+        self._table_name = table_name
+        self._premake_months = premake_months
+        self._retention_months = retention_months
+        self._drop_expired = drop_expired
+        self._maintenance_interval = maintenance_interval
+        self._lock_timeout = lock_timeout
+        self._clock = clock
+        self._lock_key = zlib.crc32(f"partitions:{table_name}".encode())
+        self._task: Optional[asyncio.Task] = None
+
+    def plan(self, existing: Sequence[MonthlyPartition]) -> Tuple[List[MonthlyPartition], List[MonthlyPartition]]:
+        """Partitions, that have to be created, and expired ones, that have to be removed"""
+        current_month = month_start(self._clock())
+        missing = [
+            partition
+            for partition in (
+                MonthlyPartition(self._table_name, add_months(current_month, offset))
+                for offset in range(self._premake_months + 1)
+            )
+            if partition not in existing
+        ]
+        if self._retention_months is None:
+            return missing, []
+        retained_since = add_months(current_month, -self._retention_months)
+        expired = sorted(
+            (partition for partition in existing if partition.end <= retained_since),
+            key=lambda partition: partition.start
+        )
+        return missing, expired
+
+    async def maintain(self) -> Tuple[List[str], List[str]]:
+        """
+        Create missing partitions and remove expired ones
+
+        :return: names of created and removed partitions, both are empty if another worker holds the lock
+        """
+        async with self._engine.begin() as conn:
+            acquired = (await conn.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": self._lock_key}
+            )).scalar()
+            if not acquired:
+                return [], []
+            await conn.execute(text(f"SET LOCAL lock_timeout = '{int(self._lock_timeout * 1000)}ms'"))
+            missing, expired = self.plan(await self._get_partitions(conn))
+            for partition in missing:
+                await conn.execute(text(partition.create_sql()))
+            for partition in expired:
+                await conn.execute(text(f'ALTER TABLE "{self._table_name}" DETACH PARTITION "{partition.name}"'))
+                if self._drop_expired:
+                    await conn.execute(text(f'DROP TABLE "{partition.name}"'))
+        return [partition.name for partition in missing], [partition.name for partition in expired]
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._keep_maintaining())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _get_partitions(self, conn: AsyncConnection) -> List[MonthlyPartition]:
+        names = (await conn.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = CAST(:table_name AS regclass)"
+            ),
+            {"table_name": self._table_name}
+        )).scalars().all()
+        return [
+            partition
+            for partition in (MonthlyPartition.from_name(self._table_name, name) for name in names)
+            if partition is not None
+        ]
+
+    async def _keep_maintaining(self) -> None:
+        while True:
+            try:
+                created, removed = await self.maintain()
+                if created or removed:
+                    logger.info("Partitions of %s created: %s, removed: %s", self._table_name, created, removed)
+            except Exception:  # noqa
+                logger.exception("Failed to maintain partitions of %s", self._table_name)
+            await asyncio.sleep(self._maintenance_interval)
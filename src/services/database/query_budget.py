@@ -0,0 +1,90 @@
+import collections
+import contextlib
+import contextvars
+from typing import Any, Callable, Counter, Dict, Iterator, List, Optional, TypeVar
+
+from src.services.database.query_stats import fingerprint_statement
+
+Endpoint = TypeVar("Endpoint", bound=Callable[..., Any])
+
+QUERY_BUDGET_ATTRIBUTE = "__query_budget__"
+
+
+def query_budget(max_queries: int) -> Callable[[Endpoint], Endpoint]:
+    """
+    Declare count of statements, that endpoint is allowed to issue per request.
+    Decorator must be applied before endpoint is registered, i.e. below the route decorator
+    """
+
+    def decorator(endpoint: Endpoint) -> Endpoint:
+        setattr(endpoint, QUERY_BUDGET_ATTRIBUTE, max_queries)
+        return endpoint
+
+    return decorator
+
+
+def get_query_budget(endpoint: Any) -> Optional[int]:
+    return getattr(endpoint, QUERY_BUDGET_ATTRIBUTE, None)
+
+
+class RequestQueryLog:
+    """Statements issued within one request"""
+
+    __slots__ = ("route", "count", "total_time", "_statements")
+
+    def __init__(self) -> None:
+        self.route: Optional[str] = None
+        self.count = 0
+        self.total_time = 0.0
+        self._statements: Counter[str] = collections.Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self._statements[statement] += 1
+
+    def get_repeated_statements(self, threshold: int) -> Dict[str, int]:
+        """Fingerprints executed at least `threshold` times, it's a typical symptom of N+1 problem"""
+        fingerprints: Counter[str] = collections.Counter()
+        for statement, count in self._statements.items():
+            fingerprints[fingerprint_statement(statement)] += count
+        return {fingerprint: count for fingerprint, count in fingerprints.items() if count >= threshold}
+
+
+_request_query_log: contextvars.ContextVar[Optional[RequestQueryLog]] = contextvars.ContextVar(
+    "request_query_log", default=None
+)
+_observers: List[Callable[[RequestQueryLog], None]] = []
+
+
+def start_request_query_log() -> RequestQueryLog:
+    query_log = RequestQueryLog()
+    _request_query_log.set(query_log)
+    return query_log
+
+
+def record_query(statement: str, duration: float) -> None:
+    if (query_log := _request_query_log.get()) is not None:
+        query_log.record(statement, duration)
+
+
+def publish_request_query_log(query_log: RequestQueryLog) -> None:
+    for observer in _observers:
+        observer(query_log)
+
+
+@contextlib.contextmanager
+def capture_request_queries() -> Iterator[List[RequestQueryLog]]:
+    """
+    Collect query logs of requests finished within the block, e.g. to assert count of queries in tests:
+
+        with capture_request_queries() as query_logs:
+            await client.get("/api/v1/users/1/info")
+        assert query_logs[-1].count == 1
+    """
+    captured: List[RequestQueryLog] = []
+    _observers.append(captured.append)
+    try:
+        yield captured
+    finally:
+        _observers.remove(captured.append)
@@ -0,0 +1,189 @@
+import asyncio
+import collections
+import contextlib
+import dataclasses
+import functools
+import logging
+import random
+import re
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.utils.request_context import get_current_route
+
+logger = logging.getLogger("sqlalchemy.slow_query")
+
+ExplainJob = Tuple[Engine, str, Any]
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMERIC_LITERAL = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_BIND_PARAMETER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+\b|\?")
+_PARAMETER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_PARAMETER_LISTS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint_statement(statement: str) -> str:
+    """
+    Normalize statement, so that executions, that differ only by parameters, literals,
+    length of `IN` lists or count of rows in multi-values `INSERT`, share one fingerprint
+    """
+    fingerprint = _STRING_LITERAL.sub("?", statement)
+    fingerprint = _BIND_PARAMETER.sub("?", fingerprint)
+    fingerprint = _NUMERIC_LITERAL.sub("?", fingerprint)
+    fingerprint = _PARAMETER_LIST.sub("(...)", fingerprint)
+    fingerprint = _REPEATED_PARAMETER_LISTS.sub("(...)", fingerprint)
+    return _WHITESPACE.sub(" ", fingerprint).strip()
+
+
+def _percentile(sorted_durations: Sequence[float], quantile: float) -> float:
+    if not sorted_durations:
+        return 0.0
+    index = min(int(round(quantile * (len(sorted_durations) - 1))), len(sorted_durations) - 1)
+    return sorted_durations[index]
+
+
+@dataclasses.dataclass(frozen=True)
+class StatementSummary:
+    fingerprint: str
+    calls: int
+    total_time: float
+    mean_time: float
+    max_time: float
+    p50: float
+    p95: float
+    p99: float
+
+
+class StatementStatistics:
+    __slots__ = ("calls", "total_time", "max_time", "_recent_durations")
+
+    def __init__(self, window_size: int) -> None:
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self._recent_durations: Deque[float] = collections.deque(maxlen=window_size)
+
+    def observe(self, duration: float) -> None:
+        self.calls += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self._recent_durations.append(duration)
+
+    def summarize(self, fingerprint: str) -> StatementSummary:
+        # percentiles are computed over the rolling window of the latest executions
+        durations = sorted(self._recent_durations)
+        return StatementSummary(
+            fingerprint=fingerprint,
+            calls=self.calls,
+            total_time=self.total_time,
+            mean_time=self.total_time / self.calls,
+            max_time=self.max_time,
+            p50=_percentile(durations, 0.50),
+            p95=_percentile(durations, 0.95),
+            p99=_percentile(durations, 0.99),
+        )
+
+
+class QueryStatistics:
+    """
+    Statistics of executed statements grouped by fingerprint.
+    Statements slower than `slow_query_threshold` are logged with the route, that has issued them,
+    `EXPLAIN (ANALYZE, BUFFERS)` of a sampled fraction of slow `SELECT` statements is logged as well.
+    Statements are explained in background on a separate connection, so the request, that has issued them,
+    isn't slowed down, but explained statement doesn't see uncommitted writes of its transaction.
+    """
+
+    def __init__(self, window_size: int = 1000, max_statements: int = 1000,
+                 slow_query_threshold: float = 0.5, explain_sample_rate: float = 0.0,
+                 max_pending_explains: int = 16) -> None:
+        """
+
+        :param window_size: count of the latest executions of a statement, that percentiles are computed over
+        :param max_statements: count of tracked fingerprints, the one with the least total time is evicted
+        :param slow_query_threshold: duration in seconds, above which statement is logged
+        :param explain_sample_rate: fraction of slow `SELECT` statements, that are re-executed with
+                                    `EXPLAIN (ANALYZE, BUFFERS)`, 0 disables it
+        :param max_pending_explains: count of statements waiting to be explained, others aren't explained
+        """
+        self._window_size = window_size
+        self._max_statements = max_statements
+        self._slow_query_threshold = slow_query_threshold
+        self._explain_sample_rate = explain_sample_rate
+        self._statements: Dict[str, StatementStatistics] = {}
+        self._explain_queue: "asyncio.Queue[ExplainJob]" = asyncio.Queue(maxsize=max_pending_explains)
+        self._explain_task: Optional["asyncio.Task[None]"] = None
+
+    async def start(self) -> None:
+        if self._explain_sample_rate and self._explain_task is None:
+            self._explain_task = asyncio.create_task(self._explain_pending_statements())
+
+    async def close(self) -> None:
+        if self._explain_task is not None:
+            self._explain_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._explain_task
+            self._explain_task = None
+
+    # noinspection PyUnusedLocal
+    def observe(self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                executemany: bool, duration: float) -> None:
+        fingerprint = fingerprint_statement(statement)
+        if (statistics := self._statements.get(fingerprint)) is None:
+            if len(self._statements) >= self._max_statements:
+                self._evict_least_expensive()
+            statistics = self._statements[fingerprint] = StatementStatistics(self._window_size)
+        statistics.observe(duration)
+
+        if duration >= self._slow_query_threshold:
+            logger.warning("Slow query %.3fs issued by route %s: %s", duration, get_current_route(), statement)
+            if self._should_explain(statement, context, executemany):
+                try:
+                    self._explain_queue.put_nowait((conn.engine, statement, parameters))
+                except asyncio.QueueFull:
+                    logger.debug("Too many slow queries are waiting to be explained, skipping: %s", statement)
+
+    def top(self, limit: int = 20) -> List[StatementSummary]:
+        """Statements, that have taken the most of total time"""
+        most_expensive = sorted(self._statements.items(), key=lambda item: item[1].total_time, reverse=True)
+        return [statistics.summarize(fingerprint) for fingerprint, statistics in most_expensive[:limit]]
+
+    def reset(self) -> None:
+        self._statements.clear()
+
+    def _evict_least_expensive(self) -> None:
+        fingerprint = min(self._statements, key=lambda key: self._statements[key].total_time)
+        del self._statements[fingerprint]
+
+    def _should_explain(self, statement: str, context: Any, executemany: bool) -> bool:
+        if self._explain_task is None or executemany:
+            return False
+        # statement is executed once more, so only reads are explained, server-side cursor
+        # is still open on the connection, while results are streamed
+        if not statement.lstrip()[:6].upper() == "SELECT" or context.execution_options.get("stream_results"):
+            return False
+        return random.random() < self._explain_sample_rate
+
+    async def _explain_pending_statements(self) -> None:
+        while True:
+            engine, statement, parameters = await self._explain_queue.get()
+            try:
+                async with AsyncEngine(engine).connect() as conn:
+                    plan = await conn.run_sync(self._explain, statement, parameters)
+                logger.warning("Plan of slow query: %s\n%s", statement, plan)
+            except Exception:  # noqa
+                logger.exception("Failed to explain slow query: %s", statement)
+
+    @staticmethod
+    def _explain(conn: Any, statement: str, parameters: Any) -> str:
+        # raw DBAPI cursor doesn't emit engine events, so explained statement isn't observed again,
+        # transaction, if any, is rolled back, when connection is returned to pool
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+            return "\n".join(row[0] for row in cursor.fetchall())
+        finally:
+            cursor.close()
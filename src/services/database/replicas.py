@@ -0,0 +1,182 @@
+import asyncio
+import contextlib
+import enum
+import itertools
+import logging
+import weakref
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("sqlalchemy.replicas")
+
+# statement with this execution option or bind argument is executed by primary,
+# e.g. if stale data is unacceptable
+USE_PRIMARY = "use_primary"
+
+# read with this bind argument is executed on connection in autocommit mode, if session allows it
+READ_ONLY = "read_only"
+
+# autocommit variants share pool and events with original engines
+_autocommit_engines: "weakref.WeakKeyDictionary[Engine, Engine]" = weakref.WeakKeyDictionary()
+
+# replica, that has replayed everything it has received, isn't lagging even if primary is idle
+REPLICATION_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaSelectionStrategy(str, enum.Enum):
+    ROUND_ROBIN = "round_robin"
+    LEAST_CONNECTIONS = "least_connections"
+
+
+class Replica:
+    __slots__ = ("name", "engine", "is_healthy", "lag")
+
+    def __init__(self, name: str, engine: AsyncEngine) -> None:
+        self.name = name
+        self.engine = engine
+        # replica isn't used until the first lag check has passed
+        self.is_healthy = False
+        self.lag: Optional[float] = None
+
+    @property
+    def checked_out_connections(self) -> int:
+        pool = self.engine.sync_engine.pool
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+
+class ReplicaSet:
+    """
+    Chooses replica for reads and periodically checks replication lag,
+    replica lagging more than `max_lag` or failing the check is skipped until it catches up
+    """
+
+    def __init__(self, replicas: Sequence[Replica],
+                 strategy: ReplicaSelectionStrategy = ReplicaSelectionStrategy.ROUND_ROBIN,
+                 max_lag: float = 5.0, lag_check_interval: float = 2.0) -> None:
+        self.replicas = list(replicas)
+        self._strategy = strategy
+        self._max_lag = max_lag
+        self._lag_check_interval = lag_check_interval
+        self._round_robin = itertools.cycle(self.replicas)
+        self._task: Optional[asyncio.Task] = None
+
+    def choose(self) -> Optional[Replica]:
+        """Healthy replica or None, if reads have to fall back to primary"""
+        healthy_replicas = [replica for replica in self.replicas if replica.is_healthy]
+        if not healthy_replicas:
+            return None
+        if self._strategy is ReplicaSelectionStrategy.LEAST_CONNECTIONS:
+            return min(healthy_replicas, key=lambda replica: replica.checked_out_connections)
+        for replica in self._round_robin:
+            if replica.is_healthy:
+                return replica
+        return None  # pragma: no cover
+
+    async def start(self) -> None:
+        if self.replicas:
+            await self.check_lag()
+            self._task = asyncio.create_task(self._keep_checking_lag())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def check_lag(self) -> None:
+        await asyncio.gather(*(self._check_replica_lag(replica) for replica in self.replicas))
+
+    async def _check_replica_lag(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as connection:
+                lag = float((await connection.execute(REPLICATION_LAG_QUERY)).scalar() or 0)
+        except Exception as ex:  # noqa
+            if replica.is_healthy:
+                logger.warning("Replica %s is skipped, lag check has failed: %r", replica.name, ex)
+            replica.is_healthy, replica.lag = False, None
+            return
+
+        is_healthy = lag <= self._max_lag
+        if is_healthy != replica.is_healthy:
+            logger.warning("Replica %s is %s, lag is %.3fs", replica.name, "used" if is_healthy else "skipped", lag)
+        replica.is_healthy, replica.lag = is_healthy, lag
+
+    async def _keep_checking_lag(self) -> None:
+        while True:
+            await asyncio.sleep(self._lag_check_interval)
+            await self.check_lag()
+
+
+def get_autocommit_engine(engine: Engine) -> Engine:
+    """
+    Engine, that checks out connections from the same pool in autocommit mode,
+    asyncpg sends neither BEGIN nor COMMIT for them and switching the mode costs no round trip
+    """
+    if (autocommit_engine := _autocommit_engines.get(engine)) is None:
+        autocommit_engine = _autocommit_engines[engine] = engine.execution_options(isolation_level="AUTOCOMMIT")
+    return autocommit_engine
+
+
+class RoutingSession(Session):
+    """
+    Sends reads to a replica and everything else to primary.
+    After the first write session sticks to primary, so request reads its own writes.
+    Session chooses one replica and keeps using it, so it doesn't hold connections to several replicas.
+    If `autocommit_reads` is set, reads outside of transaction may be executed in autocommit mode
+    """
+
+    def __init__(self, *args: Any, replica_set: Optional[ReplicaSet] = None, autocommit_reads: bool = False,
+                 **kwargs: Any) -> None:
+        super(RoutingSession, self).__init__(*args, **kwargs)
+        self.autocommit_reads = autocommit_reads
+        self._replica_set = replica_set
+        self._replica: Optional[Replica] = None
+        self._has_written = False
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, use_primary: bool = False, read_only: bool = False,
+                 **kwargs: Any) -> Engine:
+        engine = self._route(super(RoutingSession, self).get_bind(mapper, clause, **kwargs), clause, use_primary)
+        if read_only and self.autocommit_reads:
+            return get_autocommit_engine(engine)
+        return engine
+
+    @property
+    def has_written(self) -> bool:
+        """Session has issued a write, so its reads must see the primary, e.g. not results read by others"""
+        return self._has_written
+
+    def _route(self, primary: Engine, clause: Any, use_primary: bool) -> Engine:
+        if not self._is_read(clause):
+            self._has_written = True
+            return primary
+        if self._replica_set is None or self._has_written:
+            return primary
+        if use_primary or clause.get_execution_options().get(USE_PRIMARY, False):
+            return primary
+
+        if self._replica is None:
+            self._replica = self._replica_set.choose()
+        if self._replica is None:
+            return primary
+        return self._replica.engine.sync_engine
+
+    @staticmethod
+    def _is_read(clause: Any) -> bool:
+        # flush calls `get_bind` without statement, lambda statements aren't `Executable`, but proxy its attributes
+        if clause is None or not getattr(clause, "is_select", False):
+            return False
+        # rows are locked to be modified
+        return getattr(clause, "_for_update_arg", None) is None
+
+    def close(self) -> None:
+        super(RoutingSession, self).close()
+        self._replica, self._has_written = None, False
+
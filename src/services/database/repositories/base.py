@@ -1,20 +1,54 @@
 from __future__ import annotations
 
+import asyncio
 import contextlib
+import enum
 import typing
 from abc import ABC
 from typing import cast
 
-from sqlalchemy import lambda_stmt, select, update, exists, delete, func
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import lambda_stmt, select, update, exists, delete, func, inspect, bindparam, any_, table, column
+from sqlalchemy.dialects.postgresql import insert, ARRAY
+from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import AsyncSessionTransaction, AsyncSession
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.sql import Executable
 
+from src.services.database.models import RowCounter
 from src.services.database.models.base import ASTERISK
+from src.services.database.repositories.projection import Record, make_record_class
+from src.services.database.repositories.singleflight import SingleFlight
+from src.services.database.replicas import USE_PRIMARY, READ_ONLY
 
 Model = typing.TypeVar("Model")
 TransactionContext = typing.AsyncContextManager[AsyncSessionTransaction]
+Row = typing.Mapping[str, typing.Any]
+
+# PostgreSQL protocol limits count of bind parameters per statement
+MAX_BIND_PARAMETERS = 32767
+
+# key of `Session.info`, lock serializes batched reads of several loaders, that share one session
+SESSION_LOCK = "repository_lock"
+
+PG_CLASS = table("pg_class", column("oid"), column("reltuples"))
+
+
+class BulkInsertStrategy(enum.Enum):
+    MULTI_VALUES = "multi_values"
+    EXECUTEMANY = "executemany"
+    COPY = "copy"
+
+
+def _group_rows_by_keys(
+        rows: typing.Sequence[Row]
+) -> typing.Iterator[typing.Tuple[typing.List[int], typing.List[Row]]]:
+    """Multi-row statements require the same set of columns, so rows are grouped by their keys"""
+    groups: typing.Dict[typing.Tuple[str, ...], typing.Tuple[typing.List[int], typing.List[Row]]] = {}
+    for index, row in enumerate(rows):
+        indexes, group = groups.setdefault(tuple(sorted(row)), ([], []))
+        indexes.append(index)
+        group.append(row)
+    return iter(groups.values())
 
 
 class BaseRepository(ABC, typing.Generic[Model]):
@@ -26,6 +60,15 @@ class BaseRepository(ABC, typing.Generic[Model]):
     # You have to define this variable in child classes
     model: typing.ClassVar[typing.Type[Model]]
 
+    # bulk inserts up to this size are sent as a single multi-VALUES statement
+    bulk_multi_values_threshold: typing.ClassVar[int] = 500
+    # bulk inserts starting from this size are loaded with COPY
+    bulk_copy_threshold: typing.ClassVar[int] = 10_000
+    # lookups by id issued within this window are batched, 0 batches lookups of one event loop tick
+    loader_batch_window: typing.ClassVar[float] = 0.0
+    # identical reads of all repositories, that are in flight at the same time, share one query, None disables it
+    single_flight: typing.ClassVar[typing.Optional[SingleFlight]] = SingleFlight()
+
     def __init__(self, session_or_pool: typing.Union[sessionmaker, AsyncSession]) -> None:
         """
 
@@ -45,6 +88,30 @@ class BaseRepository(ABC, typing.Generic[Model]):
         else:
             yield  # type: ignore
 
+    async def _execute_read(self, stmt: typing.Any, *, use_primary: bool = False) -> Result:
+        """
+        Execute read statement. Outside of transaction it's executed in autocommit mode, if session allows it,
+        so that neither BEGIN nor COMMIT round trip is paid. Within transaction it sees uncommitted writes as usual
+
+        :param stmt: select statement
+        :param use_primary: read from primary even if there are replicas, e.g. if stale data is unacceptable
+        :return: buffered result, it can be consumed after connection has been returned to pool
+        """
+        bind_arguments = {USE_PRIMARY: True} if use_primary else {}
+        if self._session.in_transaction() or not getattr(self._session.sync_session, "autocommit_reads", False):
+            async with self._transaction:
+                return await self._session.execute(stmt, bind_arguments=bind_arguments)
+
+        bind_arguments[READ_ONLY] = True
+        try:
+            result = await self._session.execute(stmt, bind_arguments=bind_arguments)
+        except BaseException:
+            await self._session.rollback()
+            raise
+        # connection is in autocommit mode, so this only returns it to pool without a round trip
+        await self._session.commit()
+        return result
+
     @staticmethod
     def proxy_bulk_save(session: Session, *instances) -> None:
         return session.bulk_save_objects(*instances)
@@ -65,6 +132,118 @@ class BaseRepository(ABC, typing.Generic[Model]):
             result = (await self._session.execute(insert_stmt)).mappings().first()
         return self._convert_to_model(typing.cast(typing.Dict[str, typing.Any], result))
 
+    async def _insert_many(self, rows: typing.Sequence[Row], *,
+                           return_ids: bool = False) -> typing.Optional[typing.List[typing.Any]]:
+        """
+        Add many rows into database, strategy(multi-VALUES, executemany or COPY) is chosen by size of batch.
+        COPY bypasses SQLAlchemy, so Python-side defaults of columns (`default=`) aren't applied to large batches,
+        only server defaults are, columns with Python-side defaults have to be set in every row
+
+        :param rows: values of rows to insert
+        :param return_ids: return generated primary keys in the same order as rows
+        :return:
+        """
+        return await self._bulk_insert(rows, return_ids=return_ids)
+
+    async def _upsert_many(self, rows: typing.Sequence[Row], *,
+                           conflict_columns: typing.Sequence[str],
+                           update_columns: typing.Optional[typing.Sequence[str]] = None,
+                           return_ids: bool = False) -> typing.Optional[typing.List[typing.Any]]:
+        """
+        Add many rows into database or update existing ones (INSERT ... ON CONFLICT)
+
+        :param rows: values of rows to insert
+        :param conflict_columns: columns of unique index, that detects conflict
+        :param update_columns: columns to update on conflict, all columns of row except conflicting ones by default.
+                               If there is nothing to update, conflicting rows are skipped
+        :param return_ids: return primary keys of inserted or updated rows in the same order as rows
+        :return:
+        """
+        return await self._bulk_insert(
+            rows, return_ids=return_ids, conflict_columns=conflict_columns, update_columns=update_columns
+        )
+
+    async def _bulk_insert(self, rows: typing.Sequence[Row], *, return_ids: bool,
+                           conflict_columns: typing.Optional[typing.Sequence[str]] = None,
+                           update_columns: typing.Optional[typing.Sequence[str]] = None
+                           ) -> typing.Optional[typing.List[typing.Any]]:
+        ids: typing.List[typing.Any] = [None] * len(rows)
+        async with self._transaction:
+            for indexes, group in _group_rows_by_keys(rows):
+                stmt = insert(self.model)
+                if conflict_columns is not None:
+                    columns_to_update = [
+                        column for column in (update_columns if update_columns is not None else group[0])
+                        if column not in conflict_columns
+                    ]
+                    if columns_to_update:
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=conflict_columns,
+                            set_={column: stmt.excluded[column] for column in columns_to_update}
+                        )
+                    elif return_ids:
+                        raise ValueError("Skipped rows have no id, so ids can't be returned if nothing is updated")
+                    else:
+                        stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+
+                strategy = self._choose_bulk_strategy(len(group), return_ids, upsert=conflict_columns is not None)
+                if strategy is BulkInsertStrategy.COPY:
+                    await self._copy_records(group)
+                elif strategy is BulkInsertStrategy.EXECUTEMANY:
+                    await self._session.execute(stmt, group)
+                else:
+                    group_ids = await self._insert_multi_values(stmt, group, return_ids)
+                    for index, generated_id in zip(indexes, group_ids):
+                        ids[index] = generated_id
+
+        return ids if return_ids else None
+
+    def _choose_bulk_strategy(self, row_count: int, return_ids: bool, upsert: bool) -> BulkInsertStrategy:
+        # executemany can't return anything and COPY can neither return nor resolve conflicts
+        if return_ids or row_count <= self.bulk_multi_values_threshold:
+            return BulkInsertStrategy.MULTI_VALUES
+        if upsert or row_count < self.bulk_copy_threshold:
+            return BulkInsertStrategy.EXECUTEMANY
+        return BulkInsertStrategy.COPY
+
+    async def _insert_multi_values(self, stmt: typing.Any, rows: typing.Sequence[Row],
+                                   return_ids: bool) -> typing.List[typing.Any]:
+        ids: typing.List[typing.Any] = []
+        if return_ids:
+            stmt = stmt.returning(self._primary_key)
+        batch_size = max(MAX_BIND_PARAMETERS // len(rows[0]), 1)
+        for offset in range(0, len(rows), batch_size):
+            result = await self._session.execute(stmt.values(list(rows[offset:offset + batch_size])))
+            if return_ids:
+                ids.extend(result.scalars().all())
+        return ids
+
+    async def _copy_records(self, rows: typing.Sequence[Row]) -> None:
+        """
+        Load rows with asyncpg `copy_records_to_table`, the fastest way to insert a lot of rows.
+        Python-side defaults of columns aren't applied, since values are sent as they are
+        """
+        table = inspect(self.model).local_table
+        columns = list(rows[0])
+        connection = await self._session.connection()
+        # COPY bypasses SQLAlchemy, so values have to be converted to database representation manually
+        processors = [table.c[column].type.bind_processor(connection.dialect) for column in columns]
+        records = [
+            tuple(
+                processor(row[column]) if processor is not None else row[column]
+                for column, processor in zip(columns, processors)
+            )
+            for row in rows
+        ]
+        raw_connection = await connection.get_raw_connection()
+        adapted_connection = raw_connection.dbapi_connection
+        if not adapted_connection._started:
+            # asyncpg adapter begins transaction lazily with the first statement, COPY must be a part of it
+            await adapted_connection._start_transaction()
+        await raw_connection.driver_connection.copy_records_to_table(
+            table.name, records=records, columns=columns, schema_name=table.schema
+        )
+
     async def _select_all(self, *clauses: typing.Any) -> typing.List[Model]:
         """
         Selecting data from table and filter by kwargs data
@@ -75,32 +254,134 @@ class BaseRepository(ABC, typing.Generic[Model]):
         query_model = self.model
         stmt = lambda_stmt(lambda: select(query_model))
         stmt += lambda s: s.where(*clauses)
-        async with self._transaction:
-            result = (
-                (await self._session.execute(typing.cast(Executable, stmt)))
-                    .scalars()
-                    .all()
-            )
+        result = (await self._execute_read(typing.cast(Executable, stmt))).scalars().all()
 
         return result
 
-    async def _select_one(self, *clauses: typing.Any) -> Model:
+    async def _select_page(self, *clauses: typing.Any, after: typing.Any = None,
+                           limit: int) -> typing.List[Model]:
+        """
+        Keyset pagination, select at most `limit` rows with primary key greater than `after`
+
+        :param clauses: where conditionals
+        :param after: primary key of the last row of previous page
+        :param limit: size of page
+        :return:
+        """
+        primary_key = self._primary_key
+        stmt = select(self.model).where(*clauses).order_by(primary_key).limit(limit)
+        if after is not None:
+            stmt = stmt.where(primary_key > after)
+        result = (await self._execute_read(stmt)).scalars().all()
+
+        return result
+
+    async def _stream(self, *clauses: typing.Any, after: typing.Any = None, chunk_size: int = 1000,
+                      fields: typing.Optional[typing.Sequence[str]] = None
+                      ) -> typing.AsyncIterator[typing.List[typing.Any]]:
+        """
+        Yield rows in chunks, that are read from server-side cursor,
+        so memory consumption doesn't depend on size of table
+
+        :param clauses: where conditionals
+        :param after: primary key to start after
+        :param chunk_size: count of rows fetched from cursor per round trip
+        :param fields: names of columns to select, then Core rows are yielded instead of models
+        :return:
+        """
+        primary_key = self._primary_key
+        if fields is not None:
+            table = inspect(self.model).local_table
+            stmt = select(*(table.c[field] for field in fields))
+        else:
+            stmt = select(self.model)
+        stmt = (
+            stmt
+                .where(*clauses)
+                .order_by(primary_key)
+                .execution_options(yield_per=chunk_size)
+        )
+        if after is not None:
+            stmt = stmt.where(primary_key > after)
+        async with self._transaction:
+            result = await self._session.stream(stmt)
+            rows = result if fields is not None else result.scalars()
+            async for partition in rows.partitions(chunk_size):
+                yield partition
+
+    async def _select_one(self, *clauses: typing.Any, use_primary: bool = False,
+                          flight_scope: typing.Hashable = None) -> Model:
         """
         Return scalar value
 
+        :param use_primary: read from primary even if there are replicas, e.g. if stale data is unacceptable
+        :param flight_scope: part of key of shared flight, reads with different scopes are never coalesced,
+                             e.g. generation of cache, that result is put into
         :return:
         """
         query_model = self.model
         stmt = lambda_stmt(lambda: select(query_model))
         stmt += lambda s: s.where(*clauses)
-        async with self._transaction:
-            result = (
-                (await self._session.execute(typing.cast(Executable, stmt)))
-                    .scalars()
-                    .first()
-            )
 
-        return typing.cast(Model, result)
+        async def execute() -> typing.Optional[Model]:
+            result = await self._execute_read(typing.cast(Executable, stmt), use_primary=use_primary)
+            return result.scalars().first()
+
+        # transaction may have uncommitted writes, which mustn't be seen by other sessions and vice versa,
+        # session, that has written, reads its own writes, but flight may have started before them
+        if (
+                self.single_flight is None
+                or self._session.in_transaction()
+                or getattr(self._session.sync_session, "has_written", False)
+        ):
+            return typing.cast(Model, await execute())
+        if (flight_key := self._make_flight_key(stmt, use_primary, flight_scope)) is None:
+            return typing.cast(Model, await execute())
+        return typing.cast(Model, await self.single_flight.do(flight_key, execute, share=self._copy_model))
+
+    async def _project(self, fields: typing.Sequence[str], *clauses: typing.Any, after: typing.Any = None,
+                       limit: typing.Optional[int] = None, use_primary: bool = False) -> typing.List[Record]:
+        """
+        Select only given columns with Core statement and return them as lightweight records,
+        so neither ORM objects are hydrated nor identity map is maintained
+
+        :param fields: names of columns, e.g. fields of DTO
+        :param clauses: where conditionals
+        :param after: primary key of the last row of previous page
+        :param limit: size of page, rows are ordered by primary key if it's set
+        :param use_primary: read from primary even if there are replicas, e.g. if stale data is unacceptable
+        :return:
+        """
+        table = inspect(self.model).local_table
+        stmt = select(*(table.c[field] for field in fields)).where(*clauses)
+        if after is not None:
+            stmt = stmt.where(table.c[self._primary_key.key] > after)
+        if limit is not None:
+            stmt = stmt.order_by(table.c[self._primary_key.key]).limit(limit)
+        result = await self._execute_read(stmt, use_primary=use_primary)
+        record_class = self._get_record_class(fields)
+        return [record_class(*row) for row in result]
+
+    def _get_record_class(self, fields: typing.Sequence[str]) -> typing.Type[Record]:
+        return make_record_class(f"{self.model.__name__}Record", tuple(fields))
+
+    async def _select_by_ids(self, ids: typing.Sequence[typing.Any],
+                             use_primary: bool = False) -> typing.Dict[typing.Any, Model]:
+        """
+        Select rows by primary keys with `WHERE id = ANY(:ids)`, which is a single prepared statement
+        regardless of count of ids, unlike `IN`
+
+        :param ids: primary keys
+        :param use_primary: read from primary even if there are replicas, e.g. if stale data is unacceptable
+        :return: found models by their primary keys
+        """
+        primary_key = self._primary_key
+        stmt = select(self.model).where(primary_key == any_(bindparam("ids", list(ids), type_=ARRAY(primary_key.type))))
+        # loaders of several repositories may dispatch batches concurrently, but session can't be used concurrently
+        lock = self._session.info.setdefault(SESSION_LOCK, asyncio.Lock())
+        async with lock:
+            models = (await self._execute_read(stmt, use_primary=use_primary)).scalars().all()
+        return {getattr(model, primary_key.key): model for model in models}
 
     async def _update(self, *clauses: typing.Any, **values: typing.Any) -> None:
         """
@@ -117,9 +398,8 @@ class BaseRepository(ABC, typing.Generic[Model]):
 
     async def _exists(self, *clauses: typing.Any) -> typing.Optional[bool]:
         """Check is user exists in database"""
-        async with self._transaction:
-            stmt = exists(select(self.model).where(*clauses)).select()
-            result = (await self._session.execute(stmt)).scalar()
+        stmt = exists(select(self.model).where(*clauses)).select()
+        result = (await self._execute_read(stmt)).scalar()
         return typing.cast(typing.Optional[bool], result)
 
     async def _delete(self, *clauses: typing.Any) -> typing.List[Model]:
@@ -129,9 +409,56 @@ class BaseRepository(ABC, typing.Generic[Model]):
         return list(map(self._convert_to_model, result))
 
     async def _count(self) -> int:
-        async with self._transaction:
-            count = (await self._session.execute(func.count(ASTERISK))).scalars().first()
+        """Exact count of rows, it's a full scan"""
+        count = (await self._execute_read(select(func.count()).select_from(self.model))).scalar()
         return cast(int, count)
 
+    async def _count_from_counter(self) -> typing.Optional[int]:
+        """Exact count of rows, that is maintained by triggers, None if table isn't counted"""
+        stmt = select(RowCounter.row_count).where(RowCounter.table_name == inspect(self.model).local_table.name)
+        return cast(typing.Optional[int], (await self._execute_read(stmt)).scalar())
+
+    async def _estimate_count(self) -> typing.Optional[int]:
+        """Approximate count of rows from statistics of planner, None if table has never been analyzed"""
+        stmt = select(PG_CLASS.c.reltuples).where(
+            PG_CLASS.c.oid == func.to_regclass(inspect(self.model).local_table.fullname)
+        )
+        estimate = (await self._execute_read(stmt)).scalar()
+        # it's -1 until table is vacuumed or analyzed for the first time
+        if estimate is None or estimate < 0:
+            return None
+        return int(estimate)
+
+    def _make_flight_key(self, stmt: typing.Any, use_primary: bool,
+                         scope: typing.Hashable = None) -> typing.Optional[typing.Hashable]:
+        """Fingerprint of statement is its cache key, that is computed by SQLAlchemy anyway, and bound values"""
+        cache_key = stmt._generate_cache_key()  # noqa
+        if cache_key is None:
+            return None
+        flight_key = (
+            self.model, use_primary, scope, cache_key.key, tuple(p.effective_value for p in cache_key.bindparams)
+        )
+        try:
+            hash(flight_key)
+        except TypeError:
+            return None
+        return flight_key
+
+    def _get_column_values(self, model: Model) -> typing.Dict[str, typing.Any]:
+        # deferred columns aren't loaded, so accessing them would emit a query
+        return {
+            column.key: getattr(model, column.key)
+            for column in inspect(self.model).column_attrs
+            if not column.deferred
+        }
+
+    def _copy_model(self, model: typing.Optional[Model]) -> typing.Optional[Model]:
+        """Transient copy of model, which is attached to session of another repository"""
+        return self.model(**self._get_column_values(model)) if model is not None else None  # type: ignore
+
+    @property
+    def _primary_key(self) -> typing.Any:
+        return inspect(self.model).primary_key[0]
+
     def _convert_to_model(self, kwargs) -> Model:
         return self.model(**kwargs)  # type: ignore
@@ -0,0 +1,97 @@
+import asyncio
+import typing
+
+Key = typing.TypeVar("Key", bound=typing.Hashable)
+Value = typing.TypeVar("Value")
+BatchLoadFunction = typing.Callable[[typing.List[Key]], typing.Awaitable[typing.Mapping[Key, Value]]]
+
+
+class BatchLoader(typing.Generic[Key, Value]):
+    """
+    Collects keys, that are requested within one event loop tick(or `batch_window`),
+    and resolves them with a single call of `batch_load`. Results, including missing keys,
+    are cached for the lifetime of loader, so loader is supposed to be created per request.
+    """
+
+    def __init__(self, batch_load: BatchLoadFunction, batch_window: float = 0.0,
+                 max_batch_size: int = 1000) -> None:
+        """
+
+        :param batch_load: coroutine function, that accepts list of unique keys and returns mapping of found values
+        :param batch_window: time to wait for other keys, 0 means until the end of current event loop tick
+        :param max_batch_size: keys above this count are loaded by several calls
+        """
+        self._batch_load = batch_load
+        self._batch_window = batch_window
+        self._max_batch_size = max_batch_size
+        self._cache: typing.Dict[Key, "asyncio.Future[typing.Optional[Value]]"] = {}
+        self._pending: typing.Dict[Key, "asyncio.Future[typing.Optional[Value]]"] = {}
+        self._batches: typing.Set["asyncio.Task[None]"] = set()
+
+    async def load(self, key: Key) -> typing.Optional[Value]:
+        if (future := self._cache.get(key)) is None:
+            future = self._cache[key] = self._pending[key] = asyncio.get_running_loop().create_future()
+            if len(self._pending) == 1:
+                self._schedule_dispatch()
+        # future is shared by every caller of the key, so cancellation of one of them mustn't cancel it
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: typing.Iterable[Key]) -> typing.List[typing.Optional[Value]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Key, value: typing.Optional[Value]) -> None:
+        if key not in self._cache:
+            future = self._cache[key] = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+
+    def clear(self, key: typing.Optional[Key] = None) -> None:
+        """Forget cached value of key or of all keys, e.g. after it has been modified"""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+    def _schedule_dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._batch_window > 0:
+            loop.call_later(self._batch_window, self._dispatch)
+        else:
+            loop.call_soon(self._dispatch)
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+        keys = list(pending)
+        for offset in range(0, len(keys), self._max_batch_size):
+            batch = {key: pending[key] for key in keys[offset:offset + self._max_batch_size]}
+            task = asyncio.create_task(self._load_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _load_batch(self, batch: typing.Dict[Key, "asyncio.Future[typing.Optional[Value]]"]) -> None:
+        try:
+            values = await self._batch_load(list(batch))
+        except asyncio.CancelledError:
+            self._fail(batch, None)
+            raise
+        except Exception as ex:
+            self._fail(batch, ex)
+            return
+
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(values.get(key))
+
+    def _fail(self, batch: typing.Dict[Key, "asyncio.Future[typing.Optional[Value]]"],
+              exception: typing.Optional[Exception]) -> None:
+        for key, future in batch.items():
+            # failed key is loaded again by the next caller
+            if self._cache.get(key) is future:
+                del self._cache[key]
+            if future.done():
+                continue
+            if exception is None:
+                future.cancel()
+            else:
+                future.set_exception(exception)
+                # mark exception as retrieved, all callers of the key may have been cancelled already
+                future.exception()
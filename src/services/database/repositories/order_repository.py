@@ -0,0 +1,104 @@
+import datetime
+import typing
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from src.services.database.exceptions import InsufficientStock
+from src.services.database.models import Order
+from src.services.database.repositories.base import BaseRepository, Model
+from src.services.database.repositories.product_repository import ProductRepository
+from src.utils.database_utils import manual_cast
+from src.utils.time_ordered_uuid import get_uuid_timestamp, make_time_ordered_uuid
+
+# checkout id holds the moment of checkout truncated to milliseconds
+_CHECKOUT_ID_PRECISION = datetime.timedelta(milliseconds=1)
+
+
+class OrderRepository(BaseRepository[Order]):
+    """
+    Orders are partitioned by month of `created_at`, so queries are bounded by it, wherever it's known,
+    and planner scans only partitions, that may hold matching lines
+    """
+
+    model = Order
+
+    async def place_order(self, lines: typing.Sequence[typing.Tuple[int, int]], *,
+                          user_id: typing.Optional[int] = None) -> typing.List[Model]:
+        """
+        Reserve stock of products and add lines of order, that share `checkout_id`, with a multi-row INSERT.
+        If any product lacks stock `InsufficientStock` is raised and nothing is reserved,
+        if it's called within outer transaction, caller has to roll it back
+
+        :param lines: pairs of product id and quantity, lines of the same product are merged
+        :param user_id: id of customer
+        :return: lines of order
+        """
+        quantities: typing.Dict[int, int] = {}
+        for product_id, quantity in lines:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        # checkout id is time ordered, so lines are looked up by it within partition of the checkout
+        created_at = datetime.datetime.utcnow()
+        checkout_id = make_time_ordered_uuid(created_at)
+
+        async with self._transaction:
+            unit_prices = await ProductRepository(self._session).reserve_stock(quantities)
+            if missing_product_ids := [product_id for product_id in quantities if product_id not in unit_prices]:
+                raise InsufficientStock(missing_product_ids)
+            stmt = (
+                insert(self.model)
+                    .values([
+                        {
+                            "checkout_id": checkout_id,
+                            "user_id": user_id,
+                            "product_id": product_id,
+                            "quantity": quantity,
+                            "unit_price": unit_prices[product_id],
+                            "created_at": created_at
+                        }
+                        for product_id, quantity in sorted(quantities.items())
+                    ])
+                    .returning(self.model)
+            )
+            result = (await self._session.execute(stmt)).mappings().all()
+        return [self._convert_to_model(row) for row in result]
+
+    async def get_order_lines(self, checkout_id: uuid.UUID,
+                              user_id: typing.Optional[int] = None) -> typing.List[Model]:
+        """
+
+        :param checkout_id: id of order
+        :param user_id: lines are returned only if order belongs to this customer
+        """
+        clauses = [self.model.checkout_id == checkout_id]
+        try:
+            placed_at = get_uuid_timestamp(checkout_id)
+        except ValueError:
+            # orders placed before checkout ids became time ordered are looked up by index of every partition
+            pass
+        else:
+            clauses.extend(self._created_between(placed_at, placed_at + _CHECKOUT_ID_PRECISION))
+        if user_id is not None:
+            clauses.append(self.model.user_id == user_id)
+        return manual_cast(await self._select_all(*clauses), typing.List[Model])
+
+    async def get_user_order_lines(self, user_id: int, created_from: datetime.datetime,
+                                   created_to: datetime.datetime) -> typing.List[Model]:
+        """
+        Lines of orders of customer, that have been placed within period
+
+        :param user_id: id of customer
+        :param created_from: inclusive lower bound of period
+        :param created_to: exclusive upper bound of period
+        """
+        stmt = (
+            select(self.model)
+                .where(self.model.user_id == user_id, *self._created_between(created_from, created_to))
+                .order_by(self.model.created_at, self.model.order_id)
+        )
+        return manual_cast((await self._execute_read(stmt)).scalars().all(), typing.List[Model])
+
+    def _created_between(self, created_from: datetime.datetime,
+                         created_to: datetime.datetime) -> typing.List[typing.Any]:
+        return [self.model.created_at >= created_from, self.model.created_at < created_to]
@@ -0,0 +1,31 @@
+import typing
+
+from sqlalchemy import select, delete
+
+from src.services.database.models import OutboxMessage
+from src.services.database.repositories.base import BaseRepository, Model
+from src.utils.database_utils import manual_cast
+
+
+class OutboxRepository(BaseRepository[OutboxMessage]):
+    model = OutboxMessage
+
+    async def add_message(self, routing_key: str, payload: typing.Dict[str, typing.Any]) -> Model:
+        """Call it within the same transaction as the write, that produces message"""
+        return manual_cast(await self._insert(routing_key=routing_key, payload=payload))
+
+    async def lock_batch(self, limit: int) -> typing.List[Model]:
+        """
+        Select the oldest messages and lock them till the end of transaction.
+        Rows locked by other relays are skipped, so relays can drain outbox concurrently
+
+        :param limit: size of batch
+        """
+        stmt = select(self.model).order_by(self.model.id).limit(limit).with_for_update(skip_locked=True)
+        async with self._transaction:
+            result = (await self._session.execute(stmt)).scalars().all()
+        return manual_cast(result, typing.List[Model])
+
+    async def delete_messages(self, message_ids: typing.Sequence[int]) -> None:
+        async with self._transaction:
+            await self._session.execute(delete(self.model).where(self.model.id.in_(message_ids)))
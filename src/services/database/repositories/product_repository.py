@@ -2,25 +2,172 @@ import typing
 from datetime import datetime
 from decimal import Decimal
 
+from sqlalchemy import select, update, any_, bindparam, func, Integer, String, and_, inspect, literal_column, or_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
 from src.services.database import Product
 from src.services.database.models import SizeEnum
 from src.services.database.repositories.base import BaseRepository, Model
+from src.services.database.repositories.loader import BatchLoader
+from src.services.database.repositories.projection import Record
 from src.utils.database_utils import manual_cast, filter_payload
 
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from src.services.database.autocomplete import ProductAutocomplete
+
+
+# text search configuration of `products.search_vector`
+SEARCH_CONFIG = "english"
+
 
 class ProductRepository(BaseRepository[Product]):
     model = Product
 
+    def __init__(self, session_or_pool: typing.Union[sessionmaker, AsyncSession],
+                 autocomplete: typing.Optional["ProductAutocomplete"] = None) -> None:
+        super().__init__(session_or_pool)
+        # in-memory index of names, that is told to poll changes of products
+        self._autocomplete = autocomplete
+        # concurrent lookups by id are batched and cached for the lifetime of repository, i.e. a request
+        self._loader: BatchLoader[int, Product] = BatchLoader(
+            self._select_by_ids, batch_window=self.loader_batch_window
+        )
+
     async def add_product(self, *,
                           name: str,
                           unit_price: typing.Union[float, Decimal],
                           size: SizeEnum,
                           product_id: typing.Optional[int] = None,
                           description: typing.Optional[str] = None,
-                          created_at: typing.Optional[datetime] = None
+                          created_at: typing.Optional[datetime] = None,
+                          stock: typing.Optional[int] = None
                           ) -> Model:
         payload = filter_payload(locals())
-        return manual_cast(await self._insert(**payload))
+        product = manual_cast(await self._insert(**payload))
+        self._notify_autocomplete()
+        return product
+
+    async def add_products(self, products: typing.Sequence[typing.Mapping[str, typing.Any]], *,
+                           update_existing: bool = False,
+                           return_ids: bool = False) -> typing.Optional[typing.List[int]]:
+        """
+        Bulk version of `add_product`
+
+        :param products: sequence of product payloads
+        :param update_existing: update products with the same name instead of failing with IntegrityError
+        :param return_ids: return ids of products in the same order
+        """
+        rows = [filter_payload(product) for product in products]
+        if update_existing:
+            # upserted products may have been loaded already
+            self._loader.clear()
+            ids = await self._upsert_many(rows, conflict_columns=("name",), return_ids=return_ids)
+        else:
+            ids = await self._insert_many(rows, return_ids=return_ids)
+        self._notify_autocomplete()
+        return ids
 
     async def get_product_by_id(self, product_id: int) -> Model:
-        return manual_cast(await self._select_one(self.model.id == product_id))
+        """Lookups, that are issued concurrently, are resolved by a single query"""
+        return manual_cast(await self._loader.load(product_id))
+
+    async def get_product_record_by_id(self, product_id: int,
+                                       fields: typing.Sequence[str]) -> typing.Optional[Record]:
+        """
+        Lightweight record of product with only given columns
+
+        :param product_id:
+        :param fields: names of columns, e.g. fields of DTO
+        """
+        records = await self._project(fields, self.model.id == product_id)
+        return records[0] if records else None
+
+    def stream_names(self, updated_after: typing.Optional[datetime] = None,
+                     chunk_size: int = 10_000) -> typing.AsyncIterator[typing.List[typing.Any]]:
+        """
+        Yield chunks of rows with id, name and updated_at of products
+
+        :param updated_after: only products, that have been updated after this moment, otherwise all of them
+        """
+        clauses = [self.model.updated_at > updated_after] if updated_after is not None else []
+        return self._stream(*clauses, chunk_size=chunk_size, fields=("id", "name", "updated_at"))
+
+    async def search_products(self, query: str, fields: typing.Sequence[str], *,
+                              after: typing.Optional[typing.Tuple[float, int]] = None,
+                              limit: int) -> typing.List[Record]:
+        """
+        Products, whose name or description match query by full-text search, or whose name matches it fuzzily,
+        e.g. incomplete or misspelled words. Both conditions are served by GIN indexes. Products are ordered
+        by rank and then by id, so page is continued after rank and id of the last product of previous one
+
+        :param query: text typed by user, web search syntax is supported, e.g. `"usb cable" -micro`
+        :param fields: names of columns
+        :param after: rank and id of the last product of previous page
+        :param limit: size of page
+        :return: records with given fields and `rank`
+        """
+        table = inspect(self.model).local_table
+        text_query = bindparam("query", query, type_=String)
+        ts_query = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'"), text_query)
+        rank = func.ts_rank_cd(table.c.search_vector, ts_query) + func.word_similarity(text_query, table.c.name)
+        rank_label = rank.label("rank")
+        stmt = (
+            select(*(table.c[field] for field in fields), rank_label)
+                .where(or_(table.c.search_vector.op("@@")(ts_query), text_query.op("<%")(table.c.name)))
+                .order_by(rank_label.desc(), table.c.id)
+                .limit(limit)
+        )
+        if after is not None:
+            last_rank, last_id = after
+            stmt = stmt.where(or_(rank < last_rank, and_(rank == last_rank, table.c.id > last_id)))
+        result = await self._execute_read(stmt)
+        record_class = self._get_record_class((*fields, "rank"))
+        return [record_class(*row) for row in result]
+
+    async def reserve_stock(self, quantities: typing.Mapping[int, int]) -> typing.Dict[int, Decimal]:
+        """
+        Decrease stock of products by a single conditional update, product is skipped if it lacks stock.
+        Rows are locked in order of ids before they're updated, so concurrent reservations of overlapping
+        products never deadlock and reservations of different products don't wait for each other.
+        Call it within transaction and roll it back if any product has been skipped
+
+        :param quantities: quantity to reserve by product id
+        :return: unit price by id of reserved product
+        """
+        table = self.model.__table__
+        product_ids = sorted(quantities)
+        ids_param = bindparam("product_ids", product_ids, type_=ARRAY(Integer))
+        locked = (
+            select(table.c.id)
+                .where(table.c.id == any_(ids_param))
+                .order_by(table.c.id)
+                # FOR NO KEY UPDATE doesn't conflict with FOR KEY SHARE, that is taken by foreign keys of orders
+                .with_for_update(key_share=True)
+                .cte("locked")
+                .prefix_with("MATERIALIZED")
+        )
+        requested = (
+            func.unnest(ids_param, bindparam("quantities", [quantities[i] for i in product_ids], type_=ARRAY(Integer)))
+                .table_valued("product_id", "quantity")
+                .render_derived(name="requested")
+        )
+        stmt = (
+            update(table)
+                .where(
+                    table.c.id == requested.c.product_id,
+                    table.c.id.in_(select(locked.c.id)),
+                    table.c.stock >= requested.c.quantity
+                )
+                .values(stock=table.c.stock - requested.c.quantity)
+                .returning(table.c.id, table.c.unit_price)
+        )
+        async with self._transaction:
+            result = (await self._session.execute(stmt)).all()
+        return {product_id: unit_price for product_id, unit_price in result}
+
+    def _notify_autocomplete(self) -> None:
+        # changes are polled from database, since transaction of the caller may be rolled back
+        if self._autocomplete is not None:
+            self._autocomplete.notify_changed()
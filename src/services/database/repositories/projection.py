@@ -0,0 +1,19 @@
+import dataclasses
+import functools
+import typing
+
+Record = typing.Any
+
+
+@functools.lru_cache(maxsize=256)
+def make_record_class(name: str, fields: typing.Tuple[str, ...]) -> typing.Type[Record]:
+    """
+    Lightweight record with `__slots__`, that holds projected columns of a row.
+    It's a dataclass, so orjson serializes it natively without intermediate dict
+
+    :param name: name of class, e.g. `UserRecord`
+    :param fields: names of columns in the order of selected columns
+    """
+    namespace = {"__slots__": fields, "__annotations__": {field: typing.Any for field in fields}}
+    return dataclasses.dataclass(type(name, (), namespace))
+
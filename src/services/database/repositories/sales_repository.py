@@ -0,0 +1,195 @@
+import datetime
+import typing
+import zlib
+
+from sqlalchemy import Date, and_, cast, delete, desc, func, literal_column, or_, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from src.services.database.models import Order, Product, RollupWatermark, SalesRollup
+from src.services.database.repositories.base import BaseRepository
+
+SALES_ROLLUP = "sales"
+# every worker runs rollup job, but only one of them rolls up at a time
+_ROLLUP_LOCK_KEY = zlib.crc32(b"rollups:sales")
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class SalesMismatch(typing.NamedTuple):
+    day: datetime.date
+    product_id: int
+    rolled_up_units: typing.Optional[int]
+    rolled_up_revenue: typing.Optional[typing.Any]
+    units: typing.Optional[int]
+    revenue: typing.Optional[typing.Any]
+
+
+def _day_start(day: datetime.date) -> datetime.datetime:
+    return datetime.datetime.combine(day, datetime.time())
+
+
+class SalesRepository(BaseRepository[SalesRollup]):
+    """
+    Daily sales of products, that are rolled up from orders incrementally: days since watermark are recomputed
+    from orders of those days only, so both rolling up and reading don't depend on total count of orders
+    """
+
+    model = SalesRollup
+
+    async def roll_up(self, now: datetime.datetime,
+                      settle_delay: datetime.timedelta) -> typing.Optional[datetime.datetime]:
+        """
+        Recompute rollups of days since watermark and advance watermark to the start of the day,
+        that has been ongoing `settle_delay` ago. Rollups of days before watermark are final,
+        so order has to be committed within `settle_delay` after it has been created to be counted by them
+
+        :param now: current moment in UTC
+        :param settle_delay: upper bound of time between creation of order and commit of its transaction
+        :return: new watermark or None if another worker is rolling up
+        """
+        async with self._transaction:
+            if not await self._try_lock():
+                return None
+            watermark = (await self._session.execute(
+                select(RollupWatermark.rolled_up_to)
+                    .where(RollupWatermark.rollup_name == SALES_ROLLUP)
+                    .with_for_update()
+            )).scalar()
+            # the first rollup covers all orders
+            from_day = (watermark or _EPOCH).date()
+            await self._rebuild(from_day, now.date() + datetime.timedelta(days=1))
+
+            rolled_up_to = max(_day_start((now - settle_delay).date()), watermark or _EPOCH)
+            stmt = insert(RollupWatermark).values(rollup_name=SALES_ROLLUP, rolled_up_to=rolled_up_to)
+            await self._session.execute(stmt.on_conflict_do_update(
+                index_elements=[RollupWatermark.rollup_name], set_={"rolled_up_to": stmt.excluded.rolled_up_to}
+            ))
+        return rolled_up_to
+
+    async def reconcile(self, date_from: datetime.date, date_to: datetime.date, *,
+                        repair: bool = False) -> typing.List[SalesMismatch]:
+        """
+        Compare rollups with sales aggregated from orders. Rollups of days, whose orders have been removed
+        with expired partitions, mismatch by design, so only retained days are meant to be reconciled
+
+        :param date_from: inclusive first day
+        :param date_to: exclusive last day
+        :param repair: recompute rollups of the period, if they mismatch
+        :return: products and days, whose rollups mismatch
+        """
+        actual = self._aggregate_orders(date_from, date_to).subquery()
+        rolled_up = select(SalesRollup).where(SalesRollup.day >= date_from, SalesRollup.day < date_to).subquery()
+        stmt = (
+            select(
+                func.coalesce(actual.c.day, rolled_up.c.day),
+                func.coalesce(actual.c.product_id, rolled_up.c.product_id),
+                rolled_up.c.units,
+                rolled_up.c.revenue,
+                actual.c.units,
+                actual.c.revenue
+            )
+                .select_from(actual.join(
+                    rolled_up,
+                    and_(actual.c.day == rolled_up.c.day, actual.c.product_id == rolled_up.c.product_id),
+                    full=True
+                ))
+                .where(or_(
+                    rolled_up.c.units.is_distinct_from(actual.c.units),
+                    rolled_up.c.revenue.is_distinct_from(actual.c.revenue)
+                ))
+                .order_by(literal_column("1"), literal_column("2"))
+        )
+        async with self._transaction:
+            mismatches = [SalesMismatch(*row) for row in await self._session.execute(stmt)]
+            if mismatches and repair and await self._try_lock():
+                await self._rebuild(date_from, date_to)
+        return mismatches
+
+    async def get_daily_sales(self, date_from: datetime.date, date_to: datetime.date,
+                              product_id: typing.Optional[int] = None) -> typing.List[typing.Any]:
+        """
+        Units sold and revenue per day
+
+        :param date_from: inclusive first day
+        :param date_to: exclusive last day
+        :param product_id: sales of this product only, otherwise of all products
+        """
+        clauses = [self.model.day >= date_from, self.model.day < date_to]
+        if product_id is not None:
+            clauses.append(self.model.product_id == product_id)
+        stmt = (
+            select(self.model.day, func.sum(self.model.units).label("units"),
+                   func.sum(self.model.revenue).label("revenue"))
+                .where(*clauses)
+                .group_by(self.model.day)
+                .order_by(self.model.day)
+        )
+        return typing.cast(typing.List[typing.Any], (await self._execute_read(stmt)).all())
+
+    async def get_top_products(self, date_from: datetime.date, date_to: datetime.date,
+                               limit: int) -> typing.List[typing.Any]:
+        """
+        Products with the highest revenue within period
+
+        :param date_from: inclusive first day
+        :param date_to: exclusive last day
+        :param limit: count of products
+        """
+        revenue = func.sum(self.model.revenue).label("revenue")
+        stmt = (
+            select(self.model.product_id, func.sum(self.model.units).label("units"), revenue)
+                .where(self.model.day >= date_from, self.model.day < date_to)
+                .group_by(self.model.product_id)
+                .order_by(desc(revenue), self.model.product_id)
+                .limit(limit)
+        )
+        return typing.cast(typing.List[typing.Any], (await self._execute_read(stmt)).all())
+
+    async def get_units_by_product(self, date_from: datetime.date,
+                                   date_to: datetime.date) -> typing.Dict[int, int]:
+        """
+        Units sold within period by id of product, unsold products are missing
+
+        :param date_from: inclusive first day
+        :param date_to: exclusive last day
+        """
+        stmt = (
+            select(self.model.product_id, func.sum(self.model.units))
+                .where(self.model.day >= date_from, self.model.day < date_to)
+                .group_by(self.model.product_id)
+        )
+        return {product_id: int(units) for product_id, units in await self._execute_read(stmt)}
+
+    async def _try_lock(self) -> bool:
+        return bool((await self._session.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _ROLLUP_LOCK_KEY}
+        )).scalar())
+
+    async def _rebuild(self, date_from: datetime.date, date_to: datetime.date) -> None:
+        """Replace rollups of period with sales aggregated from orders, readers see old ones until commit"""
+        await self._session.execute(delete(self.model).where(self.model.day >= date_from, self.model.day < date_to))
+        await self._session.execute(
+            insert(self.model).from_select(
+                ["day", "product_id", "units", "revenue", "order_lines"],
+                self._aggregate_orders(date_from, date_to)
+            )
+        )
+
+    @staticmethod
+    def _aggregate_orders(date_from: datetime.date, date_to: datetime.date) -> typing.Any:
+        # unit is rendered inline, bound parameters would make GROUP BY expression differ from selected one
+        day = cast(func.date_trunc(literal_column("'day'"), Order.created_at), Date)
+        # orders placed before prices were captured at checkout are valued at the current price
+        unit_price = func.coalesce(Order.unit_price, Product.unit_price)
+        return (
+            select(
+                day.label("day"),
+                Order.product_id,
+                func.sum(Order.quantity).label("units"),
+                func.sum(Order.quantity * unit_price).label("revenue"),
+                func.count().label("order_lines")
+            )
+                .join(Product, Product.id == Order.product_id)
+                # bounds of created_at let planner scan only partitions of the period
+                .where(Order.created_at >= _day_start(date_from), Order.created_at < _day_start(date_to))
+                .group_by(day, Order.product_id)
+        )
@@ -0,0 +1,62 @@
+import asyncio
+import typing
+
+from src.utils.metrics import DB_COALESCED_READS
+
+Result = typing.TypeVar("Result")
+FlightKey = typing.Hashable
+
+
+class _LeaderCancelled(Exception):
+    """Caller, that was executing shared read, has been cancelled, so followers have to retry on their own"""
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one in-flight execution and its result,
+    e.g. hundreds of requests of a hot product issue a single query instead of draining connection pool.
+    Nothing is cached, a call, that starts after the flight has landed, executes again.
+    """
+
+    def __init__(self) -> None:
+        self._flights: typing.Dict[FlightKey, "asyncio.Future[typing.Any]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: FlightKey, execute: typing.Callable[[], typing.Awaitable[Result]],
+                 share: typing.Callable[[Result], Result] = lambda result: result) -> Result:
+        """
+
+        :param key: key of flight, calls with equal keys are coalesced
+        :param execute: coroutine function, that is awaited inline by the first caller(leader), i.e. in its task
+                        and with its resources, e.g. session, followers only wait for the result
+        :param share: makes a copy of result for every follower, e.g. detached from session of leader
+        :return:
+        """
+        while True:
+            if (flight := self._flights.get(key)) is None:
+                return await self._lead(key, execute)
+            try:
+                # flight is shared, so cancellation of one follower mustn't cancel it
+                result = await asyncio.shield(flight)
+            except _LeaderCancelled:
+                continue
+            DB_COALESCED_READS.inc()
+            return share(result)
+
+    async def _lead(self, key: FlightKey, execute: typing.Callable[[], typing.Awaitable[Result]]) -> Result:
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await execute()
+        except BaseException as ex:
+            # followers of cancelled leader retry, other errors are shared with them
+            flight.set_exception(ex if isinstance(ex, Exception) else _LeaderCancelled())
+            # mark exception as retrieved, flight may have no followers
+            flight.exception()
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
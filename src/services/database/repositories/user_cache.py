@@ -0,0 +1,77 @@
+import typing
+
+from src.utils.caching import TTLLRUCache, NOT_CACHED, CacheStats
+
+UserValues = typing.Dict[str, typing.Any]
+CacheKey = typing.Tuple[str, typing.Any]
+
+_BY_ID = "id"
+_BY_USERNAME = "username"
+
+
+class UserCache:
+    """
+    Read-through cache of users by id and username, shared by all requests of a worker.
+    It stores column values instead of ORM objects, so a cached user is never bound to a session.
+    Unknown users are cached as well(negative caching), but for a shorter period.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 30.0, negative_ttl: float = 5.0) -> None:
+        self._cache: TTLLRUCache[CacheKey, typing.Optional[UserValues]] = TTLLRUCache(max_size, ttl)
+        self._negative_ttl = negative_ttl
+        self._generation = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+    @property
+    def generation(self) -> int:
+        """Incremented on each invalidation, so the result of a read, that raced with write, isn't cached"""
+        return self._generation
+
+    def get_by_id(self, user_id: int) -> typing.Optional[UserValues]:
+        return self._cache.get((_BY_ID, user_id))
+
+    def get_by_username(self, username: str) -> typing.Optional[UserValues]:
+        return self._cache.get((_BY_USERNAME, username))
+
+    def put(self, values: typing.Optional[UserValues], *, generation: int,
+            user_id: typing.Optional[int] = None, username: typing.Optional[str] = None) -> None:
+        """
+
+        :param values: column values of user or None if user doesn't exist
+        :param generation: value of `generation` before user was read from database
+        :param user_id: id, that was used to look up user
+        :param username: username, that was used to look up user
+        """
+        if generation != self._generation:
+            return
+        if values is None:
+            for key in self._make_keys(user_id, username):
+                self._cache.set(key, None, ttl=self._negative_ttl)
+            return
+        for key in self._make_keys(values["id"], values["username"]):
+            self._cache.set(key, values)
+
+    def invalidate(self, *, user_id: typing.Optional[int] = None, username: typing.Optional[str] = None) -> None:
+        self._generation += 1
+        for key in self._make_keys(user_id, username):
+            values = self._cache.pop(key)
+            if values is not NOT_CACHED and values is not None:
+                # drop entry stored under another key of the same user
+                self._cache.pop((_BY_ID, values["id"]))
+                self._cache.pop((_BY_USERNAME, values["username"]))
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._cache.clear()
+
+    @staticmethod
+    def _make_keys(user_id: typing.Optional[int], username: typing.Optional[str]) -> typing.List[CacheKey]:
+        keys: typing.List[CacheKey] = []
+        if user_id is not None:
+            keys.append((_BY_ID, user_id))
+        if username is not None:
+            keys.append((_BY_USERNAME, username))
+        return keys
@@ -1,50 +1,236 @@
 import typing
 from decimal import Decimal
 
+from sqlalchemy import event
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
 
 from src.services.database import DatabaseError
 from src.services.database.models import User
 from src.services.database.repositories.base import BaseRepository, Model
+from src.services.database.repositories.loader import BatchLoader
+from src.services.database.repositories.projection import Record
+from src.services.database.repositories.user_cache import UserCache, UserValues
+from src.services.database.row_count import CachedRowCount, CountStrategy
+from src.utils.caching import NOT_CACHED
 from src.utils.database_utils import manual_cast, filter_payload
-from src.utils.password_hashing.protocol import PasswordHasherProto
+from src.utils.password_hashing.protocol import AsyncPasswordHasherProto
+
+# invalidations of shared cache, that are repeated once transaction of session is committed
+PENDING_INVALIDATIONS = "pending_user_cache_invalidations"
+PendingInvalidation = typing.Tuple[UserCache, typing.Optional[int], typing.Optional[str]]
+
+
+def _run_pending_invalidations(session: Session) -> None:
+    pending: typing.List[PendingInvalidation] = session.info[PENDING_INVALIDATIONS]
+    for user_cache, user_id, username in pending:
+        user_cache.invalidate(user_id=user_id, username=username)
+    pending.clear()
+
+
+def _drop_pending_invalidations(session: Session) -> None:
+    session.info[PENDING_INVALIDATIONS].clear()
 
 
 class UserRepository(BaseRepository[User]):
     model = User
 
     def __init__(self, session_or_pool: typing.Union[sessionmaker, AsyncSession],
-                 password_hasher: PasswordHasherProto):
+                 password_hasher: AsyncPasswordHasherProto, user_cache: typing.Optional[UserCache] = None,
+                 count_cache: typing.Optional[CachedRowCount] = None):
         super().__init__(session_or_pool)
         self._password_hasher = password_hasher
+        self._user_cache = user_cache
+        self._count_cache = count_cache
+        # concurrent lookups by id are batched and cached for the lifetime of repository, i.e. a request
+        self._loader: BatchLoader[int, User] = BatchLoader(self._load_users, batch_window=self.loader_batch_window)
 
     async def add_user(self, *, first_name: str, last_name: str,
                        phone_number: str, email: str, password: str, balance: typing.Union[Decimal, float, None] = None,
-                       username: typing.Optional[str] = None) -> Model:
+                       username: typing.Optional[str] = None, is_admin: bool = False) -> Model:
         prepared_payload = filter_payload(locals(), exclude=('password', ))
-        prepared_payload["password_hash"] = self._password_hasher.hash(password)
-        return manual_cast(await self._insert(**prepared_payload))
+        prepared_payload["password_hash"] = await self._password_hasher.hash(password)
+        user = await self._insert(**prepared_payload)
+        # username could be cached as unknown
+        self._invalidate_cache(username=username)
+        return manual_cast(user)
+
+    async def add_users(self, users: typing.Sequence[typing.Mapping[str, typing.Any]], *,
+                        update_existing: bool = False,
+                        return_ids: bool = False) -> typing.Optional[typing.List[int]]:
+        """
+        Bulk version of `add_user`
+
+        :param users: sequence of user payloads with raw `password`
+        :param update_existing: update users with the same username instead of failing with IntegrityError
+        :param return_ids: return ids of users in the same order
+        """
+        password_hashes = await self._password_hasher.hash_many([user["password"] for user in users])
+        rows = []
+        for user, password_hash in zip(users, password_hashes):
+            row = filter_payload(user, exclude=("password",))
+            row["password_hash"] = password_hash
+            rows.append(row)
+
+        if update_existing:
+            ids = await self._upsert_many(rows, conflict_columns=("username",), return_ids=return_ids)
+        else:
+            ids = await self._insert_many(rows, return_ids=return_ids)
+        for row in rows:
+            self._invalidate_cache(username=row.get("username"))
+        return ids
 
     async def delete_user(self, user_id: int) -> None:
         try:
-            await self._delete(self.model.id == user_id)
+            deleted_users = await self._delete(self.model.id == user_id)
         except IntegrityError as ex:
             raise DatabaseError(orig=ex)
+        self._invalidate_cache(user_id=user_id)
+        for user in deleted_users:
+            self._invalidate_cache(username=user.username)
+
+    async def get_user_by_username(self, username: str, use_cache: bool = True) -> Model:
+        """
+
+        :param username:
+        :param use_cache: set to False if stale data is unacceptable, e.g. to check password,
+                          then user is read from primary as well
+        """
+        if not use_cache:
+            return manual_cast(await self._select_one(self.model.username == username, use_primary=True))
+        if self._user_cache is not None:
+            if (cached := self._user_cache.get_by_username(username)) is not NOT_CACHED:
+                return manual_cast(self._from_cached_values(cached))
+        return manual_cast(await self._select_and_cache(self.model.username == username, username=username))
+
+    async def get_user_by_id(self, user_id: int, use_cache: bool = True) -> Model:
+        """
+        Lookups, that are issued concurrently, are resolved by a single query
+
+        :param user_id:
+        :param use_cache: set to False to bypass both shared and per-request cache
+        """
+        if use_cache and self._user_cache is not None:
+            if (cached := self._user_cache.get_by_id(user_id)) is not NOT_CACHED:
+                return manual_cast(self._from_cached_values(cached))
+        if not use_cache:
+            self._loader.clear(user_id)
+        return manual_cast(await self._loader.load(user_id))
 
-    async def get_user_by_username(self, username: str) -> Model:
-        return manual_cast(await self._select_one(self.model.username == username))
+    async def get_user_record_by_id(self, user_id: int, fields: typing.Sequence[str]) -> typing.Optional[Record]:
+        """
+        Lightweight record of user with only given columns
 
-    async def get_user_by_id(self, user_id: int) -> Model:
-        return manual_cast(await self._select_one(self.model.id == user_id))
+        :param user_id:
+        :param fields: names of columns, e.g. fields of DTO
+        """
+        if self._user_cache is not None:
+            if (cached := self._user_cache.get_by_id(user_id)) is not NOT_CACHED:
+                if cached is None:
+                    return None
+                return self._get_record_class(fields)(*(cached[field] for field in fields))
+        records = await self._project(fields, self.model.id == user_id)
+        return records[0] if records else None
+
+    async def get_user_records_page(self, fields: typing.Sequence[str], after_id: typing.Optional[int] = None,
+                                    limit: int = 100) -> typing.List[Record]:
+        return await self._project(fields, after=after_id, limit=limit)
 
     async def get_all_users(self) -> typing.List[Model]:
         return manual_cast(await self._select_all(), typing.List[Model])
 
-    async def get_users_count(self) -> int:
-        return await self._count()
+    async def get_users_page(self, after_id: typing.Optional[int] = None, limit: int = 100) -> typing.List[Model]:
+        return manual_cast(await self._select_page(after=after_id, limit=limit), typing.List[Model])
+
+    def stream_users(self, after_id: typing.Optional[int] = None, chunk_size: int = 1000,
+                     fields: typing.Optional[typing.Sequence[str]] = None
+                     ) -> typing.AsyncIterator[typing.List[typing.Any]]:
+        """
+        Yield chunks of users ordered by id, which are read from server-side cursor
+
+        :param fields: names of columns to select, then rows are yielded instead of users
+        """
+        return self._stream(after=after_id, chunk_size=chunk_size, fields=fields)
+
+    async def get_users_count(
+            self, strategy: CountStrategy = CountStrategy.SCAN
+    ) -> typing.Tuple[int, CountStrategy]:
+        """
+        Count of users and strategy, that has been used. Strategy, that can't be used, e.g. if cached count is stale,
+        falls back to the more expensive one: cached or estimate -> counter -> scan
+
+        :param strategy:
+        """
+        if strategy is CountStrategy.CACHED:
+            if self._count_cache is not None and (count := self._count_cache.get()) is not None:
+                return count, strategy
+            strategy = CountStrategy.COUNTER
+        elif strategy is CountStrategy.ESTIMATE:
+            if (count := await self._estimate_count()) is not None:
+                return count, strategy
+            strategy = CountStrategy.COUNTER
+
+        if strategy is CountStrategy.COUNTER:
+            if (count := await self._count_from_counter()) is not None:
+                return count, strategy
+        return await self._count(), CountStrategy.SCAN
 
     async def update_password_hash(self, new_pwd_hash: str, user_id: int) -> None:
         await self._update(self.model.id == user_id, password_hash=new_pwd_hash)
+        self._invalidate_cache(user_id=user_id)
+
+    async def _select_and_cache(self, *clauses: typing.Any, user_id: typing.Optional[int] = None,
+                                username: typing.Optional[str] = None) -> typing.Optional[User]:
+        if self._user_cache is None:
+            return await self._select_one(*clauses)
+
+        generation = self._user_cache.generation
+        # replica may lag behind invalidation, then its stale row would be cached for the whole ttl,
+        # read, that has started before invalidation, is shared only with callers of the same generation
+        user = await self._select_one(*clauses, use_primary=True, flight_scope=generation)
+        values = None
+        if user is not None:
+            values = self._get_column_values(user)
+        self._user_cache.put(values, generation=generation, user_id=user_id, username=username)
+        return user
+
+    async def _load_users(self, user_ids: typing.List[int]) -> typing.Dict[int, User]:
+        generation = self._user_cache.generation if self._user_cache is not None else 0
+        users = await self._select_by_ids(user_ids, use_primary=self._user_cache is not None)
+        if self._user_cache is not None:
+            for user_id in user_ids:
+                values = None
+                if (user := users.get(user_id)) is not None:
+                    values = self._get_column_values(user)
+                self._user_cache.put(values, generation=generation, user_id=user_id)
+        return users
+
+    def _from_cached_values(self, values: typing.Optional[UserValues]) -> typing.Optional[User]:
+        # every caller gets its own transient object, so cached entry can't be modified through it
+        return self.model(**values) if values is not None else None
+
+    def _invalidate_cache(self, *, user_id: typing.Optional[int] = None,
+                          username: typing.Optional[str] = None) -> None:
+        if self._user_cache is not None:
+            # reads of this session mustn't be served by cache, that doesn't contain its own writes
+            self._user_cache.invalidate(user_id=user_id, username=username)
+            if self._session.in_transaction():
+                self._invalidate_cache_after_commit(user_id=user_id, username=username)
+        # id of user is unknown, if only username is given, so all loaded users are forgotten
+        self._loader.clear(user_id)
+
+    def _invalidate_cache_after_commit(self, *, user_id: typing.Optional[int] = None,
+                                       username: typing.Optional[str] = None) -> None:
+        """
+        Other sessions read the old row until transaction is committed, so a read, that has started after
+        the first invalidation, would put it into cache under the new generation. Invalidation is repeated
+        after commit to drop such entries and to discard reads, that are still in flight
+        """
+        info = self._session.sync_session.info
+        if PENDING_INVALIDATIONS not in info:
+            info[PENDING_INVALIDATIONS] = []
+            event.listen(self._session.sync_session, "after_commit", _run_pending_invalidations)
+            event.listen(self._session.sync_session, "after_rollback", _drop_pending_invalidations)
+        info[PENDING_INVALIDATIONS].append((self._user_cache, user_id, username))
 
@@ -0,0 +1,74 @@
+import asyncio
+import contextlib
+import datetime
+import logging
+from typing import Callable, Optional, cast
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.services.database.repositories.sales_repository import SalesRepository
+from src.utils.metrics import SALES_ROLLUP_MISMATCHES
+
+logger = logging.getLogger("sqlalchemy.rollups")
+
+
+class SalesRollupJob:
+    """
+    Periodically rolls up new orders into daily sales of products.
+    Once watermark has advanced, i.e. another day has become final, recent final days are reconciled
+    with orders and repaired, if they mismatch, e.g. because an order has been committed too late
+    """
+
+    def __init__(self, session_pool: sessionmaker, interval: float = 60.0, settle_delay: float = 600.0,
+                 reconcile_days: int = 7,
+                 clock: Callable[[], datetime.datetime] = datetime.datetime.utcnow) -> None:
+        """
+
+        :param session_pool: sessionmaker, that produces `AsyncSession`
+        :param interval: interval between rollups, it's the staleness of rollups of the current day
+        :param settle_delay: upper bound of time between creation of order and commit of its transaction
+        :param reconcile_days: count of final days, that are reconciled, 0 disables reconciliation
+        """
+        self._session_pool = session_pool
+        self._interval = interval
+        self._settle_delay = datetime.timedelta(seconds=settle_delay)
+        self._reconcile_days = reconcile_days
+        self._clock = clock
+        self._watermark: Optional[datetime.datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> None:
+        async with cast(AsyncSession, self._session_pool()) as session:
+            repository = SalesRepository(session)
+            watermark = await repository.roll_up(self._clock(), self._settle_delay)
+            if watermark is None or watermark == self._watermark:
+                return
+            self._watermark = watermark
+            if self._reconcile_days <= 0:
+                return
+            date_to = watermark.date()
+            mismatches = await repository.reconcile(
+                date_to - datetime.timedelta(days=self._reconcile_days), date_to, repair=True
+            )
+        if mismatches:
+            SALES_ROLLUP_MISMATCHES.inc(len(mismatches))
+            logger.warning("Sales rollups have mismatched orders and have been repaired: %s", mismatches)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._keep_running())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _keep_running(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:  # noqa
+                logger.exception("Failed to roll up sales")
+            await asyncio.sleep(self._interval)
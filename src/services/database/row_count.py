@@ -0,0 +1,72 @@
+import asyncio
+import contextlib
+import enum
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("sqlalchemy.row_count")
+
+
+class CountStrategy(str, enum.Enum):
+    # exact, read from counter, that is maintained by triggers
+    COUNTER = "counter"
+    # approximate, `pg_class.reltuples` is updated by VACUUM and ANALYZE
+    ESTIMATE = "estimate"
+    # exact `count(*)`, that is refreshed in background, so it's stale at most by `max_staleness`
+    CACHED = "cached"
+    # exact `count(*)`, full scan gets slower as table grows
+    SCAN = "scan"
+
+
+class CachedRowCount:
+    """
+    Count of rows, that is refreshed in background since `start`, stale count isn't returned.
+    Refreshing task is started by application, not by a request, so its queries aren't attributed to any request
+    """
+
+    def __init__(self, count_rows: Callable[[], Awaitable[int]], refresh_interval: float = 30.0,
+                 max_staleness: float = 120.0, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+
+        :param count_rows: coroutine function, that counts rows exactly
+        :param refresh_interval: interval between refreshes
+        :param max_staleness: count, that has been refreshed earlier, isn't returned, e.g. if refreshes fail
+        """
+        self._count_rows = count_rows
+        self._refresh_interval = refresh_interval
+        self._max_staleness = max_staleness
+        self._clock = clock
+        self._count: Optional[int] = None
+        self._refreshed_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self) -> Optional[int]:
+        """Cached count or None, if it's missing or stale"""
+        if self._count is None or self._clock() - self._refreshed_at > self._max_staleness:
+            return None
+        return self._count
+
+    async def refresh(self) -> None:
+        started_at = self._clock()
+        count = await self._count_rows()
+        # count is as old as the start of query
+        self._count, self._refreshed_at = count, started_at
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._keep_refreshing())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _keep_refreshing(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:  # noqa
+                logger.exception("Failed to refresh count of rows")
+            await asyncio.sleep(self._refresh_interval)
@@ -0,0 +1,102 @@
+import contextlib
+import contextvars
+import logging
+import typing
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger("sqlalchemy.unit_of_work")
+
+
+class CheckoutCounter:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+
+_checkout_counter: contextvars.ContextVar[typing.Optional[CheckoutCounter]] = contextvars.ContextVar(
+    "checkout_counter", default=None
+)
+
+
+# noinspection PyUnusedLocal
+def on_pool_checkout(dbapi_connection: typing.Any, connection_record: typing.Any,
+                     connection_proxy: typing.Any) -> None:
+    if (counter := _checkout_counter.get()) is not None:
+        counter.value += 1
+
+
+class UnitOfWork:
+    """
+    Request-scoped unit of work. One session is shared by every repository within a request
+    and is closed deterministically on exit, so connections don't linger until garbage collection.
+    """
+
+    def __init__(self, session_pool: sessionmaker, commit_on_success: bool = False) -> None:
+        """
+
+        :param session_pool: sessionmaker, that produces `AsyncSession`
+        :param commit_on_success: commit pending transaction if a request finished without exception,
+                                  otherwise it will be rolled back
+        """
+        self._session_pool = session_pool
+        self._commit_on_success = commit_on_success
+        self._session: typing.Optional[AsyncSession] = None
+        self._counter = CheckoutCounter()
+        self._transaction_depth = 0
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            raise RuntimeError("Unit of work isn't started, use it as an async context manager")
+        return self._session
+
+    @property
+    def checkouts(self) -> int:
+        """Count of connections checked out from the pool during this unit of work"""
+        return self._counter.value
+
+    @contextlib.asynccontextmanager
+    async def transaction(self) -> typing.AsyncIterator[None]:
+        """
+        Make writes of several repositories atomic, e.g. an entity and its outbox message, and commit them.
+        Nested call is executed in a SAVEPOINT, so it's atomic on its own and committed by the outer one
+
+        :raise RuntimeError: if session is already in a transaction, that hasn't been begun by this method,
+                             since writes would be committed or rolled back along with it
+        """
+        session = self.session
+        if self._transaction_depth:
+            transaction = session.begin_nested()
+        elif session.in_transaction():
+            raise RuntimeError("Session is already in a transaction, that isn't owned by unit of work")
+        else:
+            transaction = session.begin()
+        self._transaction_depth += 1
+        try:
+            async with transaction:
+                yield
+        finally:
+            self._transaction_depth -= 1
+
+    async def __aenter__(self) -> "UnitOfWork":
+        # dependency teardown may run in another context (e.g. behind `BaseHTTPMiddleware`),
+        # so the counter isn't reset, each request runs within its own copy of context anyway
+        _checkout_counter.set(self._counter)
+        self._session = typing.cast(AsyncSession, self._session_pool())
+        return self
+
+    async def __aexit__(self, exc_type: typing.Any, exc_val: typing.Any, exc_tb: typing.Any) -> None:
+        session = self.session
+        try:
+            if session.in_transaction():
+                if exc_type is None and self._commit_on_success:
+                    await session.commit()
+                else:
+                    await session.rollback()
+        finally:
+            await session.close()
+            self._session = None
+            logger.debug("Unit of work finished, connection checkouts: %s", self.checkouts)
@@ -1,35 +1,64 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
-from typing import NewType, Any, Dict
+from typing import NewType, Any, Dict, List, Optional, Tuple
 
 import jwt
 from argon2.exceptions import VerificationError
-from fastapi import HTTPException
+from fastapi import HTTPException, Depends
 from fastapi.security import SecurityScopes, OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import ValidationError
 from starlette import status
 from starlette.requests import Request
 
+from src.api.v1.dependencies.database import UserRepositoryDependencyMarker
 from src.api.v1.dto import TokenPayload
 from src.resources import api_string_templates
 from src.services.database.models.user import User
 from src.services.database.repositories.user_repository import UserRepository
+from src.utils.caching import TTLLRUCache, NOT_CACHED
 from src.utils.exceptions import UserIsUnauthorized
-from src.utils.password_hashing.protocol import PasswordHasherProto
+from src.utils.password_hashing.protocol import AsyncPasswordHasherProto
+from src.utils.server_timing import measure, AUTH_PHASE
 
 JWTToken = NewType("JWTToken", str)
 
+# scopes, that are granted only to users with corresponding flag
+ADMIN_SCOPE = "admin"
+
+
+def get_granted_scopes(user: User, requested_scopes: List[str]) -> List[str]:
+    """Scopes, that client has requested and user is allowed to have"""
+    return [scope for scope in requested_scopes if scope != ADMIN_SCOPE or user.is_admin]
+
 
 class JWTSecurityGuardService:
 
-    def __init__(self, oauth2_scheme: OAuth2PasswordBearer, user_repository: UserRepository,
-                 password_hasher: PasswordHasherProto, secret_key: str, algorithm: str):
+    def __init__(self, oauth2_scheme: OAuth2PasswordBearer, password_hasher: AsyncPasswordHasherProto,
+                 secret_key: str, algorithm: str,
+                 token_cache: Optional[TTLLRUCache[bytes, TokenPayload]] = None):
+        """
+
+        :param token_cache: cache of decoded tokens by their digest, an entry is never kept
+                            longer than token is valid or `ttl` of the cache
+        """
         self._oauth2_scheme = oauth2_scheme
         self._secret_key = secret_key
         self._algorithm = algorithm
-        self._user_repository = user_repository
         self._password_hasher = password_hasher
-
-    async def __call__(self, request: Request, security_scopes: SecurityScopes) -> User:
+        self._token_cache = token_cache
+
+    async def __call__(self, request: Request, security_scopes: SecurityScopes,
+                       user_repository: UserRepository = Depends(UserRepositoryDependencyMarker)) -> User:
+        """
+        Guard is instantiated once per application, user repository is resolved per request,
+        so it shares the request-scoped session with other repositories
+        """
+        with measure(AUTH_PHASE):
+            return await self._authorize(request, security_scopes, user_repository)
+
+    async def _authorize(self, request: Request, security_scopes: SecurityScopes,
+                         user_repository: UserRepository) -> User:
         jwt_token = await self._oauth2_scheme(request)
         if jwt_token is None:
             raise HTTPException(
@@ -48,21 +77,49 @@ class JWTSecurityGuardService:
                     headers={"WWW-Authenticate": "Bearer"},
                 )
 
-        return await self._retrieve_user_or_raise_exception(token_payload.username)
+        user = await self._retrieve_user_or_raise_exception(user_repository, token_payload.username)
+        # user may have lost admin rights after token has been issued
+        if get_granted_scopes(user, security_scopes.scopes) != security_scopes.scopes:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=api_string_templates.SCOPES_MISSING,
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return user
 
     def _decode_token(self, token: str) -> TokenPayload:
+        if self._token_cache is None:
+            return self._verify_token(token)[0]
+
+        # digest is used as a key to not keep raw tokens in memory
+        digest = hashlib.sha256(token.encode()).digest()
+        if (cached_payload := self._token_cache.get(digest)) is not NOT_CACHED:
+            return cached_payload
+
+        token_payload, expires_at = self._verify_token(token)
+        ttl = self._token_cache.ttl
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        if ttl > 0:
+            self._token_cache.set(digest, token_payload, ttl=ttl)
+        return token_payload
+
+    def _verify_token(self, token: str) -> Tuple[TokenPayload, Optional[float]]:
+        """Return decoded payload and expiration timestamp of token"""
         try:
-            payload = jwt.decode(token, self._secret_key, algorithm=self._algorithm)
-            return TokenPayload(username=payload["username"], scopes=payload.get("scopes", []))
-        except (jwt.DecodeError, ValidationError):
+            payload = jwt.decode(token, self._secret_key, algorithms=[self._algorithm])
+            token_payload = TokenPayload(username=payload.get("sub"), scopes=payload.get("scopes", []))
+            return token_payload, payload.get("exp")
+        except (jwt.InvalidTokenError, ValidationError):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=api_string_templates.TOKEN_IS_INCORRECT,
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-    async def _retrieve_user_or_raise_exception(self, username: str) -> User:
-        if user := await self._user_repository.get_user_by_username(username=username):  # type: User
+    @staticmethod
+    async def _retrieve_user_or_raise_exception(user_repository: UserRepository, username: str) -> User:
+        if user := await user_repository.get_user_by_username(username=username):  # type: User
             return user
 
         raise HTTPException(
@@ -73,7 +130,7 @@ class JWTSecurityGuardService:
 
 
 class JWTAuthenticationService:
-    def __init__(self, user_repository: UserRepository, password_hasher: PasswordHasherProto,
+    def __init__(self, user_repository: UserRepository, password_hasher: AsyncPasswordHasherProto,
                  secret_key: str, algorithm: str, token_expires_in_minutes: float = 30) -> None:
         self._token_expires_in_minutes = token_expires_in_minutes
         self._secret_key = secret_key
@@ -82,23 +139,24 @@ class JWTAuthenticationService:
         self._password_hasher = password_hasher
 
     async def authenticate_user(self, form_data: OAuth2PasswordRequestForm) -> JWTToken:
-        if not (user := await self._user_repository.get_user_by_username(form_data.username)):
+        if not (user := await self._user_repository.get_user_by_username(form_data.username, use_cache=False)):
             raise UserIsUnauthorized(hint=api_string_templates.INCORRECT_LOGIN_INPUT)
 
-        if self._password_hasher.check_needs_rehash(user.password_hash):
-            await self._user_repository.update_password_hash(
-                new_pwd_hash=self._password_hasher.hash(form_data.password),
-                user_id=user.id
-            )
-
         try:
-            self._password_hasher.verify(user.password_hash, form_data.password)
+            await self._password_hasher.verify(user.password_hash, form_data.password)
         except VerificationError:
             raise UserIsUnauthorized(hint=api_string_templates.INCORRECT_LOGIN_INPUT)
 
+        # rehash only after verification, otherwise anyone could replace the hash with his own password
+        if await self._password_hasher.check_needs_rehash(user.password_hash):
+            await self._user_repository.update_password_hash(
+                new_pwd_hash=await self._password_hasher.hash(form_data.password),
+                user_id=user.id
+            )
+
         return JWTToken(self._generate_jwt_token({
             "sub": form_data.username,
-            "scopes": form_data.scopes,
+            "scopes": get_granted_scopes(user, form_data.scopes),
         }))
 
     def _generate_jwt_token(self, token_payload: Dict[str, Any]) -> str:
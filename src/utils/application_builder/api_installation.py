@@ -2,32 +2,51 @@ import contextlib
 from typing import Any, Optional, Dict, no_type_check
 
 from argon2 import PasswordHasher
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.exceptions import RequestValidationError, HTTPException
 from fastapi.openapi.utils import get_openapi
 from fastapi.security import OAuth2PasswordBearer
 from starlette.config import Config as StarletteConfig
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from src.api import setup_routers
-from src.api.v1.dependencies.database import UserRepositoryDependencyMarker, ProductRepositoryDependencyMarker
+from src.api.v1.dependencies.database import UserRepositoryDependencyMarker, ProductRepositoryDependencyMarker, \
+    UnitOfWorkDependencyMarker, OutboxRepositoryDependencyMarker, QueryStatisticsDependencyMarker, \
+    UsersCountStrategyDependencyMarker, OrderRepositoryDependencyMarker, SalesRepositoryDependencyMarker
 from src.api.v1.dependencies.services import SecurityGuardServiceDependencyMarker, \
-    ServiceAuthorizationDependencyMarker, OAuthServiceDependencyMarker, RPCDependencyMarker
+    ServiceAuthorizationDependencyMarker, OAuthServiceDependencyMarker, ProductAutocompleteDependencyMarker
 from src.api.v1.errors.http_error import http_error_handler
+from src.api.v1.errors.overload_error import password_hashing_overload_handler
 from src.api.v1.errors.validation_error import http422_error_handler
 from src.config.config import Config, BASE_DIR
 from src.core.events import create_on_startup_handler, create_on_shutdown_handler
-from src.middlewares.process_time_middleware import add_process_time_header
-from src.services.amqp.mailing import send_email
-from src.services.amqp.rpc import RabbitMQService, Consumer
+from src.middlewares.metrics_middleware import PrometheusMiddleware
+from src.middlewares.query_budget_middleware import QueryBudgetMiddleware
+from src.middlewares.request_context_middleware import RequestContextMiddleware
+from src.middlewares.server_timing_middleware import ServerTimingMiddleware
+from src.services.amqp.outbox import OutboxRelay
+from src.services.database.autocomplete import ProductAutocomplete
+from src.services.database.models import Order
 from src.services.database.models.base import DatabaseComponents
+from src.services.database.partitions import MonthlyPartitionManager
+from src.services.database.query_stats import QueryStatistics
+from src.services.database.replicas import ReplicaSelectionStrategy
+from src.services.database.repositories.order_repository import OrderRepository
+from src.services.database.repositories.outbox_repository import OutboxRepository
 from src.services.database.repositories.product_repository import ProductRepository
+from src.services.database.repositories.sales_repository import SalesRepository
+from src.services.database.repositories.user_cache import UserCache
 from src.services.database.repositories.user_repository import UserRepository
+from src.services.database.rollups import SalesRollupJob
+from src.services.database.row_count import CachedRowCount, CountStrategy
+from src.services.database.unit_of_work import UnitOfWork
 from src.services.security.jwt_service import JWTSecurityGuardService, JWTAuthenticationService
 from src.services.security.oauth import OAuthSecurityService, OAuthIntegration
 from src.utils.application_builder.builder_base import AbstractFastAPIApplicationBuilder
+from src.utils.caching import TTLLRUCache
+from src.utils.exceptions import PasswordHashingOverloaded
+from src.utils.password_hashing.pooled import PooledPasswordHasher
 from src.views import setup_routes
 
 ALLOWED_METHODS = ["POST", "PUT", "DELETE", "GET"]
@@ -56,7 +75,17 @@ class DevelopmentApplicationBuilder(AbstractFastAPIApplicationBuilder):
 
     @no_type_check
     def setup_middlewares(self):
-        self.app.add_middleware(BaseHTTPMiddleware, dispatch=add_process_time_header)
+        if self._config.server.server_timing_enabled:
+            self.app.add_middleware(ServerTimingMiddleware)
+        if self._config.server.metrics_enabled:
+            self.app.add_middleware(PrometheusMiddleware)
+        if (database_settings := self._config.database).query_budget_enabled:
+            self.app.add_middleware(
+                QueryBudgetMiddleware,
+                default_budget=database_settings.default_query_budget,
+                repeated_statement_threshold=database_settings.repeated_statement_threshold,
+                strict=database_settings.query_budget_strict
+            )
         self.app.add_middleware(
             middleware_class=CORSMiddleware,
             allow_origins=self._config.server.backend_cors_origins,
@@ -69,6 +98,8 @@ class DevelopmentApplicationBuilder(AbstractFastAPIApplicationBuilder):
             middleware_class=SessionMiddleware,
             secret_key="!secret"
         )  # TODO replace with real token
+        # the last added middleware is the outermost one, so request is bound to context before others run
+        self.app.add_middleware(RequestContextMiddleware)
 
     @no_type_check
     def configure_routes(self):
@@ -82,29 +113,115 @@ class DevelopmentApplicationBuilder(AbstractFastAPIApplicationBuilder):
     def configure_exception_handlers(self) -> None:
         self.app.add_exception_handler(RequestValidationError, http422_error_handler)
         self.app.add_exception_handler(HTTPException, http_error_handler)
+        self.app.add_exception_handler(PasswordHashingOverloaded, password_hashing_overload_handler)
 
     def configure_application_state(self) -> None:
-        db_components = DatabaseComponents(self._config.database.connection_uri)
+        database_settings = self._config.database
+        db_components = DatabaseComponents(
+            database_settings.connection_uri,
+            query_statistics=QueryStatistics(
+                window_size=database_settings.query_stats_window_size,
+                max_statements=database_settings.query_stats_max_statements,
+                slow_query_threshold=database_settings.slow_query_threshold_seconds,
+                explain_sample_rate=database_settings.slow_query_explain_sample_rate
+            ),
+            replica_uris=database_settings.replica_uris,
+            replica_selection_strategy=ReplicaSelectionStrategy(database_settings.replica_selection_strategy),
+            replica_max_lag=database_settings.replica_max_lag_seconds,
+            replica_lag_check_interval=database_settings.replica_lag_check_interval_seconds,
+            autocommit_reads=database_settings.autocommit_reads
+        )
         # do gracefully dispose engine on shutdown application
         self.app.state.db_components = db_components
         self.app.state.config = self._config
+        # do start and stop maintenance of partitions in startup and shutdown handlers
+        self.app.state.orders_partitions = MonthlyPartitionManager(
+            db_components.engine,
+            Order.__tablename__,
+            premake_months=database_settings.orders_partitions_premake_months,
+            retention_months=database_settings.orders_retention_months,
+            drop_expired=database_settings.orders_drop_expired_partitions,
+            maintenance_interval=database_settings.orders_partitions_maintenance_interval_seconds
+        )
+        # do start and stop rolling up sales in startup and shutdown handlers
+        self.app.state.sales_rollup_job = SalesRollupJob(
+            db_components.sessionmaker,
+            interval=database_settings.sales_rollup_interval_seconds,
+            settle_delay=database_settings.sales_rollup_settle_delay_seconds,
+            reconcile_days=database_settings.sales_reconcile_days
+        )
+        # do build autocomplete index and stop refreshing it in startup and shutdown handlers
+        product_autocomplete = ProductAutocomplete(
+            db_components.sessionmaker,
+            refresh_interval=database_settings.autocomplete_refresh_interval_seconds,
+            watermark_overlap=database_settings.autocomplete_watermark_overlap_seconds,
+            rebuild_interval=database_settings.autocomplete_rebuild_interval_seconds,
+            popularity_days=database_settings.autocomplete_popularity_days
+        )
+        self.app.state.product_autocomplete = product_autocomplete
+
+        security_settings = self._config.server.security
+        pwd_hasher = PooledPasswordHasher(
+            PasswordHasher(),
+            max_workers=security_settings.password_hashing_workers,
+            max_queue_size=security_settings.password_hashing_max_queue_size,
+            use_processes=security_settings.password_hashing_use_processes
+        )
+        # do gracefully shutdown pool of workers on shutdown application
+        self.app.state.password_hasher = pwd_hasher
+        user_cache = UserCache(
+            max_size=self._config.database.user_cache_size,
+            ttl=self._config.database.user_cache_ttl_seconds,
+            negative_ttl=self._config.database.user_cache_negative_ttl_seconds
+        )
+        self.app.state.user_cache = user_cache
+
+        async def count_users() -> int:
+            async with db_components.sessionmaker() as session:
+                count, _ = await UserRepository(session, pwd_hasher).get_users_count(CountStrategy.SCAN)
+            return count
 
-        pwd_hasher = PasswordHasher()
-        rmq_service = RabbitMQService(
+        users_count_cache = CachedRowCount(
+            count_users,
+            refresh_interval=database_settings.users_count_refresh_interval_seconds,
+            max_staleness=database_settings.users_count_max_staleness_seconds
+        )
+        # do stop refreshing on shutdown application
+        self.app.state.users_count_cache = users_count_cache
+        users_count_strategy = CountStrategy(database_settings.users_count_strategy)
+        self.app.state.outbox_relay = OutboxRelay(
+            db_components.sessionmaker,
             self._config.rabbitmq.uri,
-            Consumer(name="send_email", callback=send_email)
+            batch_size=self._config.rabbitmq.outbox_batch_size,
+            poll_interval=self._config.rabbitmq.outbox_poll_interval_seconds
         )
 
-        async def rmq_service_spin_up():
-            async with rmq_service as rpc:
-                yield rpc
+        async def unit_of_work_spin_up():
+            async with UnitOfWork(db_components.sessionmaker,
+                                  commit_on_success=self._config.database.commit_on_success) as uow:
+                yield uow
 
+        # FastAPI caches dependencies within a request, so all repositories share one session
         self.app.dependency_overrides.update(
             {
-                UserRepositoryDependencyMarker: lambda: UserRepository(
-                    db_components.sessionmaker, pwd_hasher
+                UnitOfWorkDependencyMarker: unit_of_work_spin_up,
+                UserRepositoryDependencyMarker: lambda uow=Depends(UnitOfWorkDependencyMarker): UserRepository(
+                    uow.session, pwd_hasher, user_cache, users_count_cache
+                ),
+                UsersCountStrategyDependencyMarker: lambda: users_count_strategy,
+                ProductRepositoryDependencyMarker: lambda uow=Depends(UnitOfWorkDependencyMarker): ProductRepository(
+                    uow.session, product_autocomplete
+                ),
+                ProductAutocompleteDependencyMarker: lambda: product_autocomplete,
+                OrderRepositoryDependencyMarker: lambda uow=Depends(UnitOfWorkDependencyMarker): OrderRepository(
+                    uow.session
+                ),
+                SalesRepositoryDependencyMarker: lambda uow=Depends(UnitOfWorkDependencyMarker): SalesRepository(
+                    uow.session
+                ),
+                OutboxRepositoryDependencyMarker: lambda uow=Depends(UnitOfWorkDependencyMarker): OutboxRepository(
+                    uow.session
                 ),
-                ProductRepositoryDependencyMarker: lambda: ProductRepository(db_components.sessionmaker),
                 OAuthServiceDependencyMarker: lambda: OAuthSecurityService(
                     StarletteConfig(BASE_DIR / ".env"),
                     OAuthIntegration(
@@ -118,27 +235,33 @@ class DevelopmentApplicationBuilder(AbstractFastAPIApplicationBuilder):
                         )
                     )
                 ),
-                SecurityGuardServiceDependencyMarker: lambda: JWTSecurityGuardService(
+                SecurityGuardServiceDependencyMarker: JWTSecurityGuardService(
                     oauth2_scheme=OAuth2PasswordBearer(
                         tokenUrl="/api/v1/oauth",
                         scopes={
                             "me": "Read information about the current user.",
-                            "items": "Read items."
+                            "items": "Read items.",
+                            "admin": "Read diagnostics of the service."
                         },
                     ),
-                    user_repository=UserRepository(db_components.sessionmaker, pwd_hasher),
                     password_hasher=pwd_hasher,
                     secret_key=self._config.server.security.jwt_secret_key,
-                    algorithm="HS256"
+                    algorithm="HS256",
+                    token_cache=TTLLRUCache(
+                        max_size=security_settings.jwt_cache_size,
+                        ttl=security_settings.jwt_cache_ttl_seconds
+                    )
                 ),
-                ServiceAuthorizationDependencyMarker: lambda: JWTAuthenticationService(
-                    user_repository=UserRepository(db_components.sessionmaker, pwd_hasher),
+                ServiceAuthorizationDependencyMarker: lambda user_repository=Depends(
+                    UserRepositoryDependencyMarker
+                ): JWTAuthenticationService(
+                    user_repository=user_repository,
                     password_hasher=pwd_hasher,
                     secret_key=self._config.server.security.jwt_secret_key,
                     algorithm="HS256",
                     token_expires_in_minutes=self._config.server.security.jwt_access_token_expire_in_minutes
                 ),
-                RPCDependencyMarker: rmq_service_spin_up
+                QueryStatisticsDependencyMarker: lambda: db_components.query_statistics
             }
         )
 
@@ -0,0 +1,84 @@
+import collections
+import dataclasses
+import time
+import typing
+
+K = typing.TypeVar("K")
+V = typing.TypeVar("V")
+
+
+class _NotCached:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "NOT_CACHED"
+
+
+# returned on cache miss, it differs from `None`, that can be cached as a negative entry
+NOT_CACHED: typing.Any = _NotCached()
+
+
+@dataclasses.dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+class TTLLRUCache(typing.Generic[K, V]):
+    """
+    Least recently used cache, whose entries also expire after `ttl` seconds.
+    It isn't thread-safe, but all of its operations are synchronous, so it's safe for coroutines of one event loop
+    """
+
+    def __init__(self, max_size: int, ttl: float,
+                 clock: typing.Callable[[], float] = time.monotonic) -> None:
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: "collections.OrderedDict[K, typing.Tuple[float, V]]" = collections.OrderedDict()
+        self.stats = CacheStats()
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V:
+        """Return cached value or `NOT_CACHED`"""
+        try:
+            expires_at, value = self._entries[key]
+        except KeyError:
+            self.stats.misses += 1
+            return NOT_CACHED
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return NOT_CACHED
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: K, value: V, ttl: typing.Optional[float] = None) -> None:
+        self._entries[key] = (self._clock() + (ttl if ttl is not None else self._ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def pop(self, key: K) -> V:
+        """Remove entry and return its value or `NOT_CACHED`, expiration isn't checked"""
+        try:
+            _, value = self._entries.pop(key)
+        except KeyError:
+            return NOT_CACHED
+        self.stats.invalidations += 1
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -13,6 +13,7 @@ class ProductBodySpec:
             "unit_price": 7000,
             "description": "Light and fast laptop",
             "size": "S",
+            "stock": 10,
         },
     )
 
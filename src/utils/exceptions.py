@@ -1,3 +1,20 @@
+from typing import List
+
+
 class UserIsUnauthorized(Exception):
     def __init__(self, hint: str):
         self.hint = hint
+
+
+class PasswordHashingOverloaded(Exception):
+    def __init__(self, queue_depth: int):
+        self.queue_depth = queue_depth
+
+
+class QueryBudgetExceeded(Exception):
+    def __init__(self, route: str, violations: List[str]):
+        self.route = route
+        self.violations = violations
+        super(QueryBudgetExceeded, self).__init__(
+            f"Route {route} has exceeded query budget: {'; '.join(violations)}"
+        )
@@ -0,0 +1,30 @@
+from typing import Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+FIELDS_SEPARATOR = ","
+
+
+class InvalidFieldset(ValueError):
+    pass
+
+
+def parse_fieldset(fields: Optional[str], dto: Type[BaseModel], required: Tuple[str, ...] = ()) -> Tuple[str, ...]:
+    """
+    Parse comma separated `?fields=` query parameter, unknown fields are rejected,
+    so that only fields of DTO are ever selected from database and serialized
+
+    :param fields: value of query parameter, all fields of DTO are returned if it's None
+    :param dto: model, that declares allowed fields
+    :param required: fields, that are always included, e.g. id, that the next page cursor is made of
+    :return: fields in order of their declaration in DTO
+    """
+    if fields is None:
+        return tuple(dto.__fields__)
+
+    requested = {field.strip() for field in fields.split(FIELDS_SEPARATOR)}
+    requested.discard("")
+    if not requested or not requested.issubset(dto.__fields__):
+        raise InvalidFieldset(fields)
+    requested.update(required)
+    return tuple(field for field in dto.__fields__ if field in requested)
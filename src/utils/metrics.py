@@ -0,0 +1,100 @@
+import os
+from typing import Any, Callable
+
+from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, REGISTRY, generate_latest, multiprocess
+
+from src.utils.multiprocess_metrics import MULTIPROCESS_DIR_ENV, is_multiprocess_mode
+
+# directory is normally prepared by master process beforehand, unlabelled metrics below open their files at once,
+# so it's created here too, e.g. when module is imported by a script
+if is_multiprocess_mode():
+    os.makedirs(os.environ[MULTIPROCESS_DIR_ENV], exist_ok=True)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests",
+    labelnames=("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Count of HTTP requests being processed",
+    labelnames=("method", "route"),
+    multiprocess_mode="livesum",
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duration of statements executed by database",
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Count of statements issued by a request",
+    labelnames=("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Total duration of statements issued by a request",
+    labelnames=("route",),
+)
+DB_COALESCED_READS = Counter(
+    "db_coalesced_reads",
+    "Count of reads, that have shared result of identical in-flight read instead of querying database",
+)
+SALES_ROLLUP_MISMATCHES = Counter(
+    "sales_rollup_mismatches",
+    "Count of daily sales of products, whose rollups have mismatched orders on reconciliation",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Count of connections checked out from pool",
+    labelnames=("pool",),
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Count of connections opened above the size of pool",
+    labelnames=("pool",),
+    multiprocess_mode="livesum",
+)
+AMQP_PUBLISH_DURATION = Histogram(
+    "amqp_publish_duration_seconds",
+    "Latency of publishing a message till it's confirmed by broker",
+    labelnames=("routing_key",),
+)
+PASSWORD_HASHING_QUEUE_DEPTH = Gauge(
+    "password_hashing_queue_depth",
+    "Count of password hashing operations waiting for a free worker",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASHING_QUEUE_WAIT = Histogram(
+    "password_hashing_queue_wait_seconds",
+    "Time, that password hashing operation has waited for a free worker",
+    labelnames=("operation",),
+)
+PASSWORD_HASHING_DURATION = Histogram(
+    "password_hashing_duration_seconds",
+    "Duration of password hashing operation executed by worker",
+    labelnames=("operation",),
+)
+
+
+def generate_metrics() -> bytes:
+    if not is_multiprocess_mode():
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def create_pool_usage_listener(pool: Any, name: str) -> Callable[..., None]:
+    """Listener of pool `checkout` and `checkin` events, that keeps gauges of pool up to date"""
+    checked_out, overflow = DB_POOL_CHECKED_OUT.labels(name), DB_POOL_OVERFLOW.labels(name)
+
+    # noinspection PyUnusedLocal
+    def observe_pool_usage(*args: Any) -> None:
+        checked_out.set(pool.checkedout())
+        # overflow is negative, while there are free slots in pool
+        overflow.set(max(pool.overflow(), 0))
+
+    return observe_pool_usage
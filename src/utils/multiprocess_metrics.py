@@ -0,0 +1,36 @@
+import os
+from typing import Any
+
+from prometheus_client import multiprocess
+
+# gunicorn workers write samples to mmap-backed files in this directory, a scrape of any worker
+# aggregates files of all workers. Metrics open their files when they're created, i.e. when
+# `src.utils.metrics` is imported, so this module must not import it
+MULTIPROCESS_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+
+def is_multiprocess_mode() -> bool:
+    return MULTIPROCESS_DIR_ENV in os.environ
+
+
+def prepare_multiprocess_dir() -> None:
+    """
+    Create directory of samples and remove samples of previous run, it must be called by master process
+    before application is imported and workers are spawned. Files of the current process are kept,
+    since its metrics have them open
+    """
+    if not is_multiprocess_mode():
+        return
+    multiprocess_dir = os.environ[MULTIPROCESS_DIR_ENV]
+    os.makedirs(multiprocess_dir, exist_ok=True)
+    own_suffix = "_%d.db" % os.getpid()
+    for filename in os.listdir(multiprocess_dir):
+        if filename.endswith(".db") and not filename.endswith(own_suffix):
+            os.remove(os.path.join(multiprocess_dir, filename))
+
+
+# noinspection PyUnusedLocal
+def mark_worker_dead(server: Any, worker: Any) -> None:
+    """gunicorn `child_exit` hook, gauges of dead worker are excluded from `livesum`"""
+    if is_multiprocess_mode():
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,41 @@
+import base64
+import binascii
+from typing import Any, Tuple
+
+import orjson
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(last_id: int) -> str:
+    """Make an opaque token, that points to the last row of a page"""
+    return base64.urlsafe_b64encode(orjson.dumps({"id": last_id})).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    last_id, = _decode(cursor, "id")
+    if not isinstance(last_id, int):
+        raise InvalidCursor(cursor)
+    return last_id
+
+
+def encode_ranked_cursor(rank: float, last_id: int) -> str:
+    """Make an opaque token, that points to the last row of a page ordered by rank and then by id"""
+    return base64.urlsafe_b64encode(orjson.dumps({"rank": rank, "id": last_id})).decode()
+
+
+def decode_ranked_cursor(cursor: str) -> Tuple[float, int]:
+    rank, last_id = _decode(cursor, "rank", "id")
+    if not isinstance(rank, (int, float)) or not isinstance(last_id, int):
+        raise InvalidCursor(cursor)
+    return float(rank), last_id
+
+
+def _decode(cursor: str, *keys: str) -> Tuple[Any, ...]:
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return tuple(payload[key] for key in keys)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, KeyError, UnicodeEncodeError) as ex:
+        raise InvalidCursor(cursor) from ex
@@ -0,0 +1,122 @@
+import asyncio
+import dataclasses
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple, TypeVar, Sequence, List
+
+from src.utils.exceptions import PasswordHashingOverloaded
+from src.utils.metrics import PASSWORD_HASHING_QUEUE_DEPTH, PASSWORD_HASHING_QUEUE_WAIT, PASSWORD_HASHING_DURATION
+from src.utils.server_timing import measure, PASSWORD_HASHING_PHASE
+from src.utils.password_hashing.protocol import PasswordHasherProto
+
+T = TypeVar("T")
+
+TimedResult = Tuple[Any, Optional[BaseException], float, float]
+
+
+def _run_timed(func: Callable[..., Any], *args: Any) -> TimedResult:
+    """Executed by worker, returns result or raised exception with time bounds of execution"""
+    started_at = time.monotonic()
+    try:
+        return func(*args), None, started_at, time.monotonic()
+    except Exception as ex:
+        return None, ex, started_at, time.monotonic()
+
+
+@dataclasses.dataclass
+class PasswordHashingMetrics:
+    completed: int = 0
+    rejected: int = 0
+    queue_wait_seconds_total: float = 0.0
+    queue_wait_seconds_max: float = 0.0
+    hashing_seconds_total: float = 0.0
+    hashing_seconds_max: float = 0.0
+
+    def observe(self, queue_wait: float, hashing_time: float) -> None:
+        self.completed += 1
+        self.queue_wait_seconds_total += queue_wait
+        self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, queue_wait)
+        self.hashing_seconds_total += hashing_time
+        self.hashing_seconds_max = max(self.hashing_seconds_max, hashing_time)
+
+
+class PooledPasswordHasher:
+    """
+    Runs CPU-bound argon2 hashing and verification in a bounded pool, so that event loop isn't blocked.
+    If there are more than `max_queue_size` operations waiting for a free worker,
+    new ones are rejected with :class:`PasswordHashingOverloaded`.
+    """
+
+    def __init__(self, hasher: PasswordHasherProto, max_workers: int = 4, max_queue_size: int = 64,
+                 use_processes: bool = False) -> None:
+        """
+
+        :param hasher: synchronous hasher, e.g. `argon2.PasswordHasher`, must be picklable to use processes
+        :param max_workers: count of operations executed concurrently
+        :param max_queue_size: count of operations waiting for a free worker
+        :param use_processes: use `ProcessPoolExecutor` instead of threads. argon2 releases GIL,
+                              so threads are usually sufficient and don't pay for pickling
+        """
+        self._hasher = hasher
+        self._max_workers = max_workers
+        self._max_queue_size = max_queue_size
+        self._executor: Executor
+        if use_processes:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password_hasher")
+        self._in_flight = 0
+        self.metrics = PasswordHashingMetrics()
+
+    @property
+    def queue_depth(self) -> int:
+        """Count of operations waiting for a free worker"""
+        return max(self._in_flight - self._max_workers, 0)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", self._hasher.hash, password)
+
+    async def hash_many(self, passwords: Sequence[str]) -> List[str]:
+        """Hash passwords in parallel, it's meant for bulk imports, so they are never rejected"""
+        return list(await asyncio.gather(*(self._submit("hash", self._hasher.hash, password, shed=False)
+                                           for password in passwords)))
+
+    async def verify(self, hash: str, password: str) -> bool:
+        return await self._submit("verify", self._hasher.verify, hash, password)
+
+    async def check_needs_rehash(self, hash: str) -> bool:
+        # it only parses parameters of hash, round trip to the pool would cost more than the check itself
+        return self._hasher.check_needs_rehash(hash)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    async def _submit(self, operation: str, func: Callable[..., T], *args: Any, shed: bool = True) -> T:
+        """
+
+        :param operation: name of operation, that metrics are labelled with
+        """
+        if shed and self.queue_depth >= self._max_queue_size:
+            self.metrics.rejected += 1
+            raise PasswordHashingOverloaded(queue_depth=self.queue_depth)
+
+        self._in_flight += 1
+        PASSWORD_HASHING_QUEUE_DEPTH.set(self.queue_depth)
+        submitted_at = time.monotonic()
+        try:
+            # time spent in queue is included, because request waits for it as well
+            with measure(PASSWORD_HASHING_PHASE):
+                result, error, started_at, finished_at = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, _run_timed, func, *args
+                )
+        finally:
+            self._in_flight -= 1
+            PASSWORD_HASHING_QUEUE_DEPTH.set(self.queue_depth)
+
+        queue_wait, hashing_time = started_at - submitted_at, finished_at - started_at
+        self.metrics.observe(queue_wait=queue_wait, hashing_time=hashing_time)
+        PASSWORD_HASHING_QUEUE_WAIT.labels(operation).observe(queue_wait)
+        PASSWORD_HASHING_DURATION.labels(operation).observe(hashing_time)
+        if error is not None:
+            raise error
+        return result  # type: ignore
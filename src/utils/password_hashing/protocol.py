@@ -1,4 +1,4 @@
-from typing import Protocol
+from typing import Protocol, Sequence, List
 
 
 class PasswordHasherProto(Protocol):
@@ -7,4 +7,15 @@ class PasswordHasherProto(Protocol):
 
     def check_needs_rehash(self, hash: str) -> bool: ...
 
-    def verify(self, hash: str, password: str) -> bool: ...
\ No newline at end of file
+    def verify(self, hash: str, password: str) -> bool: ...
+
+
+class AsyncPasswordHasherProto(Protocol):
+
+    async def hash(self, password: str) -> str: ...
+
+    async def hash_many(self, passwords: Sequence[str]) -> List[str]: ...
+
+    async def check_needs_rehash(self, hash: str) -> bool: ...
+
+    async def verify(self, hash: str, password: str) -> bool: ...
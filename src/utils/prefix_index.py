@@ -0,0 +1,148 @@
+import array
+import bisect
+import heapq
+import math
+import typing
+
+from src.utils.caching import NOT_CACHED, TTLLRUCache
+
+# id and name of entry
+Completion = typing.Tuple[int, str]
+
+_MAX_CHARACTER = chr(0x10FFFF)
+
+
+def normalize(text: str) -> str:
+    """Case insensitive form of text with collapsed whitespace, trailing space is kept, since it ends a word"""
+    normalized = " ".join(text.casefold().split())
+    return normalized + " " if normalized and text[-1].isspace() else normalized
+
+
+class PrefixIndex:
+    """
+    Names sorted by their normalized form in compact parallel arrays, so names with a prefix are a contiguous
+    range, that is found by binary search. The most popular names of a range are selected by partial sort
+    and cached until index changes, so short prefixes, whose ranges are large, are ranked once.
+    It isn't thread-safe, but all of its operations are synchronous, so it's safe for coroutines of one event loop
+    """
+
+    def __init__(self, entries: typing.Iterable[Completion] = (),
+                 weights: typing.Optional[typing.Mapping[int, float]] = None, cache_size: int = 1024) -> None:
+        """
+
+        :param entries: ids and names
+        :param weights: popularity by id, entries without weight have zero one
+        :param cache_size: count of cached completions
+        """
+        self._weights_by_id: typing.Dict[int, float] = dict(weights or {})
+        self._cache: TTLLRUCache[typing.Tuple[str, int], typing.List[Completion]] = TTLLRUCache(
+            cache_size, ttl=math.inf
+        )
+        self._build(entries)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, entry_id: int) -> bool:
+        return entry_id in self._key_by_id
+
+    def __iter__(self) -> typing.Iterator[Completion]:
+        return zip(self._ids, self._names)
+
+    def complete(self, prefix: str, limit: int) -> typing.List[Completion]:
+        """
+        The most popular entries, whose names start with prefix case insensitively,
+        entries of equal popularity are ordered by name. Returned list is shared, so it mustn't be modified
+        """
+        key = normalize(prefix)
+        completions = self._cache.get((key, limit))
+        if completions is not NOT_CACHED:
+            return completions
+        start = bisect.bisect_left(self._keys, key)
+        end = bisect.bisect_left(self._keys, key + _MAX_CHARACTER, lo=start)
+        # nlargest is stable, so ties keep order of names
+        positions = heapq.nlargest(limit, range(start, end), key=self._weights.__getitem__)
+        completions = [(self._ids[position], self._names[position]) for position in positions]
+        self._cache.set((key, limit), completions)
+        return completions
+
+    def upsert(self, entry_id: int, name: str) -> bool:
+        """Add entry or rename it, return whether index has changed"""
+        position = self._find(entry_id)
+        if position is not None:
+            if self._names[position] == name:
+                return False
+            self._delete_at(position)
+        key = normalize(name)
+        position = bisect.bisect_right(self._keys, key)
+        self._keys.insert(position, key)
+        self._names.insert(position, name)
+        self._ids.insert(position, entry_id)
+        self._weights.insert(position, self._weights_by_id.get(entry_id, 0.0))
+        self._key_by_id[entry_id] = key
+        self._cache.clear()
+        return True
+
+    def upsert_many(self, entries: typing.Iterable[Completion]) -> int:
+        """
+        Bulk version of `upsert`, index is rebuilt at once instead, if a lot of entries have been changed
+
+        :return: count of changed entries
+        """
+        changed = [(entry_id, name) for entry_id, name in entries if self._get_name(entry_id) != name]
+        # every insertion shifts the tail of arrays, so it's cheaper to sort all entries again
+        if len(changed) > max(len(self._keys) // 64, 16):
+            names = dict(self)
+            names.update(changed)
+            self._build(names.items())
+        else:
+            for entry_id, name in changed:
+                self.upsert(entry_id, name)
+        return len(changed)
+
+    def remove(self, entry_id: int) -> bool:
+        """Remove entry, return whether it has been present"""
+        position = self._find(entry_id)
+        if position is None:
+            return False
+        self._delete_at(position)
+        self._cache.clear()
+        return True
+
+    def set_weights(self, weights: typing.Mapping[int, float]) -> None:
+        """Replace popularity of all entries, entries without weight have zero one"""
+        self._weights_by_id = dict(weights)
+        self._weights = array.array("d", (self._weights_by_id.get(entry_id, 0.0) for entry_id in self._ids))
+        self._cache.clear()
+
+    def _build(self, entries: typing.Iterable[Completion]) -> None:
+        rows = sorted((normalize(name), entry_id, name) for entry_id, name in entries)
+        self._keys: typing.List[str] = [key for key, _, _ in rows]
+        self._names: typing.List[str] = [name for _, _, name in rows]
+        self._ids = array.array("q", (entry_id for _, entry_id, _ in rows))
+        self._weights = array.array("d", (self._weights_by_id.get(entry_id, 0.0) for _, entry_id, _ in rows))
+        self._key_by_id: typing.Dict[int, str] = {entry_id: key for key, entry_id, _ in rows}
+        self._cache.clear()
+
+    def _find(self, entry_id: int) -> typing.Optional[int]:
+        key = self._key_by_id.get(entry_id)
+        if key is None:
+            return None
+        # names may be equal case insensitively, so entries with the same key are scanned
+        position = bisect.bisect_left(self._keys, key)
+        while position < len(self._keys) and self._keys[position] == key:
+            if self._ids[position] == entry_id:
+                return position
+            position += 1
+        return None
+
+    def _get_name(self, entry_id: int) -> typing.Optional[str]:
+        position = self._find(entry_id)
+        return self._names[position] if position is not None else None
+
+    def _delete_at(self, position: int) -> None:
+        del self._key_by_id[self._ids[position]]
+        del self._keys[position]
+        del self._names[position]
+        del self._ids[position]
+        del self._weights[position]
@@ -0,0 +1,40 @@
+import contextvars
+from typing import Optional
+
+from starlette.routing import Match
+from starlette.types import Scope
+
+UNMATCHED_ROUTE = "<unmatched>"
+_ROUTE_TEMPLATE_KEY = "route_template"
+
+# scope of the request being processed, it lets code outside of endpoints (e.g. engine events)
+# know the originating route
+_current_scope: contextvars.ContextVar[Optional[Scope]] = contextvars.ContextVar("current_scope", default=None)
+
+
+def bind_request_scope(scope: Scope) -> None:
+    _current_scope.set(scope)
+
+
+def get_route_template(scope: Scope) -> str:
+    """
+    Path template of route, that matches the request, e.g. `/users/{user_id}/info`.
+    Routing happens after middlewares, so route is matched here once and remembered in scope
+    """
+    if (route_template := scope.get(_ROUTE_TEMPLATE_KEY)) is not None:
+        return route_template
+
+    route_template = UNMATCHED_ROUTE
+    for route in scope["app"].routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            route_template = route.path
+            break
+    scope[_ROUTE_TEMPLATE_KEY] = route_template
+    return route_template
+
+
+def get_current_route() -> Optional[str]:
+    if (scope := _current_scope.get()) is None:
+        return None
+    return get_route_template(scope)
@@ -1,12 +1,16 @@
-from typing import Optional, Type, Any, TypeVar, Union
+import enum
+from decimal import Decimal
+from typing import Optional, Type, Any, TypeVar, Union, AsyncIterator, Sequence, Iterator
 
+import orjson
 from fastapi.responses import ORJSONResponse
 from pydantic import ValidationError
 from starlette import status
 from starlette.background import BackgroundTask
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, StreamingResponse
 
 from src.resources import api_string_templates
+from src.utils.server_timing import measure_rendering
 
 Model = TypeVar("Model")
 
@@ -43,6 +47,33 @@ class NotFoundJsonResponse(ORJSONResponse):
         )
 
 
+class TrustedJsonResponse(ORJSONResponse):
+    """
+    Response, that renders trusted content, e.g. records projected from database, as is.
+    It's returned by endpoint, so content isn't validated by response model again
+    """
+
+    def render(self, content: Any) -> bytes:
+        with measure_rendering():
+            return orjson.dumps(content, default=_serialize_default)
+
+
+class ConflictJsonResponse(ORJSONResponse):
+
+    def __init__(self,
+                 content: Any = None,
+                 headers: dict = None,
+                 media_type: str = None,
+                 background: BackgroundTask = None, ):
+        super(ConflictJsonResponse, self).__init__(
+            content=content,
+            status_code=status.HTTP_409_CONFLICT,
+            headers=headers,
+            media_type=media_type,
+            background=background
+        )
+
+
 def get_pydantic_model_or_return_raw_response(
         model: Type[Model], db_obj: Optional[Any] = None
 ) -> Union[ORJSONResponse, Model]:
@@ -52,3 +83,60 @@ def get_pydantic_model_or_return_raw_response(
         return model.from_orm(db_obj)  # type: ignore
     except ValidationError:
         return BadRequestJsonResponse()
+
+
+class StreamFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    JSON_ARRAY = "json"
+
+    @property
+    def media_type(self) -> str:
+        if self is StreamFormat.NDJSON:
+            return "application/x-ndjson"
+        return "application/json"
+
+
+def _serialize_default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    raise TypeError
+
+
+def _dump_rows(rows: Sequence[Any], fields: Sequence[str]) -> Iterator[bytes]:
+    return (
+        orjson.dumps({field: getattr(row, field) for field in fields}, default=_serialize_default)
+        for row in rows
+    )
+
+
+async def _iter_ndjson(chunks: AsyncIterator[Sequence[Any]], fields: Sequence[str]) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        if chunk:
+            yield b"\n".join(_dump_rows(chunk, fields)) + b"\n"
+
+
+async def _iter_json_array(chunks: AsyncIterator[Sequence[Any]], fields: Sequence[str]) -> AsyncIterator[bytes]:
+    separator = b"["
+    async for chunk in chunks:
+        if chunk:
+            yield separator + b",".join(_dump_rows(chunk, fields))
+            separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+def make_streaming_response(chunks: AsyncIterator[Sequence[Any]], fields: Sequence[str],
+                            stream_format: StreamFormat) -> StreamingResponse:
+    """
+    Serialize chunks of rows as soon as they are fetched, whole result set is never held in memory
+
+    :param chunks: async iterator of row chunks
+    :param fields: attributes of row, that will be serialized
+    :param stream_format: ndjson or json array
+    """
+    if stream_format is StreamFormat.NDJSON:
+        content = _iter_ndjson(chunks, fields)
+    else:
+        content = _iter_json_array(chunks, fields)
+    return StreamingResponse(content, media_type=stream_format.media_type)
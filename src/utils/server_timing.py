@@ -0,0 +1,125 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import time
+from typing import Optional, Dict, Iterator, Callable, Any
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+
+AUTH_PHASE = "auth"
+DB_PHASE = "db"
+PASSWORD_HASHING_PHASE = "hash"
+SERIALIZATION_PHASE = "serialize"
+TOTAL_PHASE = "total"
+
+
+class ServerTimings:
+    """
+    Durations of request phases, phases may overlap, e.g. authentication includes a query of user.
+    Duration of a phase, that is entered several times, is accumulated.
+    """
+
+    __slots__ = ("_durations", "endpoint_completed_at")
+
+    def __init__(self) -> None:
+        self._durations: Dict[str, float] = {}
+        self.endpoint_completed_at: Optional[float] = None
+
+    def add(self, phase: str, duration: float) -> None:
+        self._durations[phase] = self._durations.get(phase, 0.0) + duration
+
+    def __getitem__(self, phase: str) -> float:
+        return self._durations[phase]
+
+    def __contains__(self, phase: str) -> bool:
+        return phase in self._durations
+
+    def to_header(self) -> str:
+        return ", ".join(f"{phase};dur={duration * 1000:.2f}" for phase, duration in self._durations.items())
+
+
+# it's set only by `ServerTimingMiddleware`, so if middleware isn't installed, every measurement is a no-op
+_server_timings: contextvars.ContextVar[Optional[ServerTimings]] = contextvars.ContextVar(
+    "server_timings", default=None
+)
+
+
+def get_server_timings() -> Optional[ServerTimings]:
+    return _server_timings.get()
+
+
+def start_server_timings() -> ServerTimings:
+    timings = ServerTimings()
+    _server_timings.set(timings)
+    return timings
+
+
+def record_timing(phase: str, duration: float) -> None:
+    if (timings := _server_timings.get()) is not None:
+        timings.add(phase, duration)
+
+
+@contextlib.contextmanager
+def measure(phase: str) -> Iterator[None]:
+    if (timings := _server_timings.get()) is None:
+        yield
+        return
+
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started_at)
+
+
+@contextlib.contextmanager
+def measure_rendering() -> Iterator[None]:
+    """
+    Measure rendering of response, that is created by endpoint itself, e.g. `TrustedJsonResponse`,
+    since it's done before endpoint has returned. Rendering after that is a part of serialization already
+    """
+    if (timings := _server_timings.get()) is None or timings.endpoint_completed_at is not None:
+        yield
+        return
+
+    with measure(SERIALIZATION_PHASE):
+        yield
+
+
+def _mark_endpoint_completion(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Remember, when endpoint has returned, everything after it till the start of response
+    is response model validation and rendering, i.e. serialization
+    """
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                if (timings := _server_timings.get()) is not None:
+                    timings.endpoint_completed_at = time.perf_counter()
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        # sync endpoint runs in threadpool within a copy of context, but copy refers to the same timings
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            if (timings := _server_timings.get()) is not None:
+                timings.endpoint_completed_at = time.perf_counter()
+
+    return wrapper
+
+
+class ServerTimingRoute(APIRoute):
+    """Route, that lets `ServerTimingMiddleware` tell serialization of response from execution of endpoint"""
+
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        self.dependant.call = _mark_endpoint_completion(self.dependant.call)  # type: ignore
+        return super(ServerTimingRoute, self).get_route_handler()
+
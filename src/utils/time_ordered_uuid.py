@@ -0,0 +1,35 @@
+import datetime
+import secrets
+import uuid
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MILLISECOND = datetime.timedelta(milliseconds=1)
+
+
+def make_time_ordered_uuid(moment: datetime.datetime) -> uuid.UUID:
+    """
+    UUID of version 7: 48 high bits hold milliseconds since epoch, the rest are random,
+    so moment, when an entity has been created, can be recovered from its id
+
+    :param moment: naive datetime in UTC
+    """
+    milliseconds = (moment - _EPOCH) // _MILLISECOND
+    value = (milliseconds & 0xFFFF_FFFF_FFFF) << 80 | secrets.randbits(80)
+    # version 7 and RFC 4122 variant
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return uuid.UUID(int=value)
+
+
+def get_uuid_timestamp(value: uuid.UUID) -> datetime.datetime:
+    """
+    Moment truncated to milliseconds, that is encoded in UUID of version 7, as naive datetime in UTC
+
+    :raise ValueError: if UUID isn't time ordered or its moment is out of range of datetime
+    """
+    if value.version != 7:
+        raise ValueError(f"UUID {value} isn't time ordered")
+    try:
+        return _EPOCH + (value.int >> 80) * _MILLISECOND
+    except OverflowError as exc:
+        raise ValueError(f"Moment of UUID {value} is out of range") from exc
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from prometheus_client import CONTENT_TYPE_LATEST
+from starlette.responses import Response
+
+from src.utils.metrics import generate_metrics
+
+api_router = APIRouter()
+
+
+@api_router.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    # samples of all gunicorn workers are read from disk, so it's run in threadpool
+    # media type of exposition format already contains charset
+    return Response(generate_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
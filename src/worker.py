@@ -0,0 +1,33 @@
+import asyncio
+import signal
+
+from src.config.config import Config, parse_config
+from src.services.amqp.mailing import MAILING_QUEUE, send_email
+from src.services.amqp.mailing_worker import MailingWorker
+from src.utils.logging import LoggingConfig, configure_logging
+
+
+async def _run_mailing_worker(config: Config) -> None:
+    worker = MailingWorker(
+        config.rabbitmq.uri,
+        queue_name=MAILING_QUEUE,
+        handler=send_email,
+        prefetch_count=config.mailing_worker.prefetch_count,
+        concurrency=config.mailing_worker.concurrency,
+        coalesce_window=config.mailing_worker.coalesce_window_seconds,
+        report_interval=config.mailing_worker.report_interval_seconds,
+    )
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, worker.stop)
+    await worker.run()
+
+
+def run_worker() -> None:
+    config = parse_config()
+    configure_logging(LoggingConfig())
+    asyncio.run(_run_mailing_worker(config))
+
+
+if __name__ == "__main__":
+    run_worker()
@@ -3,7 +3,7 @@ In conftest.py I mark most scope of fixtures as "module",
 because performance if migrations will be executed for each function(by default) will be poor.
 """
 import asyncio
-from typing import cast, Any, AsyncGenerator
+from typing import cast, Any, AsyncGenerator, Iterator, List
 
 import pytest
 from alembic import config as alembic_config, command
@@ -15,6 +15,7 @@ from sqlalchemy.orm import sessionmaker
 from src.core import ApplicationSettings
 from src.services.database import User, Product
 from src.services.database.models import SizeEnum
+from src.services.database.query_budget import RequestQueryLog, capture_request_queries
 from src.services.database.repositories.product_repository import ProductRepository
 from src.services.database.repositories.user_repository import UserRepository
 from src.utils import jwt
@@ -109,3 +110,10 @@ def application_settings_fixture(app: FastAPI) -> ApplicationSettings:
 def authorized_client(client: AsyncClient, token: str) -> AsyncClient:
     client.headers = Headers({"Authorization": f"Bearer {token}"})
     return client
+
+
+@pytest.fixture()
+def query_logs() -> Iterator[List[RequestQueryLog]]:
+    """Statements issued by requests of a test, e.g. `assert query_logs[-1].count == 1`"""
+    with capture_request_queries() as captured:
+        yield captured
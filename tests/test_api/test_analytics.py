@@ -0,0 +1,100 @@
+import datetime
+from typing import Dict
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy.orm import sessionmaker
+
+from src.services.database import Product, User
+from src.services.database.models import SizeEnum
+from src.services.database.repositories.order_repository import OrderRepository
+from src.services.database.repositories.product_repository import ProductRepository
+from src.services.database.repositories.sales_repository import SalesRepository
+from src.services.database.repositories.user_repository import UserRepository
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(name="sold_product", scope="module")
+async def sold_product_for_test(session_maker: sessionmaker) -> Product:  # type: ignore
+    return await ProductRepository(session_maker).add_product(
+        name="Stapler", unit_price=10, size=SizeEnum.SMALL, stock=100
+    )
+
+
+@pytest.fixture(name="admin_user", scope="module")
+async def admin_user_for_test(initialized_app: FastAPI, session_maker: sessionmaker) -> User:  # type: ignore
+    return await UserRepository(session_maker, initialized_app.state.password_hasher).add_user(
+        email="admin@test.com", password="password", username="admin", first_name="Admin", last_name="Admin",
+        phone_number="+7657676557", is_admin=True
+    )
+
+
+@pytest.fixture(name="sales_repository", scope="module")
+async def sales_repository_for_test(initialized_app: FastAPI,
+                                    session_maker: sessionmaker) -> SalesRepository:  # type: ignore
+    # rollup job of application would roll up and repair concurrently with tests under the same lock
+    await initialized_app.state.sales_rollup_job.close()
+    return SalesRepository(session_maker)
+
+
+async def get_token(client: AsyncClient, app: FastAPI, user: User, scope: str = "") -> Dict[str, str]:
+    response = await client.post(
+        app.url_path_for("oauth:login"), data={"username": user.username, "password": "password", "scope": scope}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def test_sales_are_rolled_up_and_reconciled(session_maker: sessionmaker,  # type: ignore
+                                                  sales_repository: SalesRepository, sold_product: Product) -> None:
+    await OrderRepository(session_maker).place_order([(sold_product.id, 2)])
+    now = datetime.datetime.utcnow()
+    today, tomorrow = now.date(), now.date() + datetime.timedelta(days=1)
+    assert await sales_repository.roll_up(now, settle_delay=datetime.timedelta(minutes=10)) is not None
+
+    [sales] = await sales_repository.get_daily_sales(today, tomorrow, product_id=sold_product.id)
+    assert (sales.day, sales.units, sales.revenue) == (today, 2, 20)
+    assert await sales_repository.reconcile(today, tomorrow) == []
+
+    # order placed after rollup is counted by the next one
+    await OrderRepository(session_maker).place_order([(sold_product.id, 1)])
+    [mismatch] = await sales_repository.reconcile(today, tomorrow, repair=True)
+    assert (mismatch.product_id, mismatch.rolled_up_units, mismatch.units) == (sold_product.id, 2, 3)
+    top_products = await sales_repository.get_top_products(today, tomorrow, limit=1000)
+    assert [(product.units, product.revenue) for product in top_products if product.product_id == sold_product.id] \
+           == [(3, 30)]
+
+
+async def test_sales_are_served_to_admins(authorized_client: AsyncClient, app: FastAPI, test_user: User,
+                                          admin_user: User, sales_repository: SalesRepository,
+                                          sold_product: Product) -> None:
+    today = datetime.datetime.utcnow().date()
+    period = {"date_from": today.isoformat(), "date_to": (today + datetime.timedelta(days=1)).isoformat()}
+
+    # scope, that has been requested by user, who isn't admin, isn't granted
+    response = await authorized_client.get(
+        app.url_path_for("analytics:daily_sales"), params={**period, "product_id": sold_product.id},
+        headers=await get_token(authorized_client, app, test_user, scope="admin")
+    )
+    assert response.status_code == 401
+
+    admin_headers = await get_token(authorized_client, app, admin_user, scope="admin")
+    response = await authorized_client.get(
+        app.url_path_for("analytics:daily_sales"), params={**period, "product_id": sold_product.id},
+        headers=admin_headers
+    )
+    assert response.status_code == 200
+    assert response.json() == [{"day": today.isoformat(), "units": 3, "revenue": 30}]
+
+    response = await authorized_client.get(
+        app.url_path_for("analytics:top_products"), params={**period, "limit": 1000}, headers=admin_headers
+    )
+    assert response.status_code == 200
+    assert {"product_id": sold_product.id, "units": 3, "revenue": 30} in response.json()
+
+    response = await authorized_client.get(
+        app.url_path_for("analytics:top_products"), params={**period, "date_to": period["date_from"]},
+        headers=admin_headers
+    )
+    assert response.status_code == 400
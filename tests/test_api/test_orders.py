@@ -0,0 +1,105 @@
+import datetime
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy.orm import sessionmaker
+
+from src.services.database import Order, Product, User
+from src.services.database.models import SizeEnum
+from src.services.database.repositories.product_repository import ProductRepository
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(name="product_in_stock", scope="module")
+async def product_in_stock_for_test(session_maker: sessionmaker) -> Product:  # type: ignore
+    return await ProductRepository(session_maker).add_product(
+        name="Notebook", unit_price=10, size=SizeEnum.MEDIUM, stock=5
+    )
+
+
+async def test_place_order(authorized_client: AsyncClient, app: FastAPI, product_in_stock: Product) -> None:
+    response = await authorized_client.post(
+        app.url_path_for("orders:place_order"),
+        json={"lines": [{"product_id": product_in_stock.id, "quantity": 2}]}
+    )
+    assert response.status_code == 201
+    order = response.json()
+    assert [line["quantity"] for line in order["lines"]] == [2]
+
+    response = await authorized_client.get(app.url_path_for("orders:get_order", checkout_id=order["checkout_id"]))
+    assert response.status_code == 200
+    assert response.json()["lines"] == order["lines"]
+
+
+async def test_order_with_random_checkout_id_is_found(authorized_client: AsyncClient, app: FastAPI,
+                                                      session_maker: sessionmaker,  # type: ignore
+                                                      test_user: User, product_in_stock: Product) -> None:
+    # orders placed before checkout ids became time ordered keep their random ids
+    checkout_id = uuid.uuid4()
+    async with session_maker() as session:
+        async with session.begin():
+            session.add(Order(checkout_id=checkout_id, user_id=test_user.id, product_id=product_in_stock.id,
+                              quantity=1, unit_price=10))
+
+    response = await authorized_client.get(app.url_path_for("orders:get_order", checkout_id=str(checkout_id)))
+    assert response.status_code == 200
+    assert [line["quantity"] for line in response.json()["lines"]] == [1]
+
+    # moment of this id is beyond the range of datetime
+    response = await authorized_client.get(
+        app.url_path_for("orders:get_order", checkout_id="ffffffff-ffff-7fff-bfff-ffffffffffff")
+    )
+    assert response.status_code == 404
+
+
+async def test_order_is_rejected_if_any_product_lacks_stock(authorized_client: AsyncClient, app: FastAPI,
+                                                            product_in_stock: Product) -> None:
+    response = await authorized_client.post(
+        app.url_path_for("orders:place_order"),
+        json={"lines": [{"product_id": product_in_stock.id, "quantity": 1},
+                        {"product_id": product_in_stock.id, "quantity": 100}]}
+    )
+    assert response.status_code == 409
+    assert response.json()["product_ids"] == [product_in_stock.id]
+
+    # route is named after endpoint
+    response = await authorized_client.get(
+        app.url_path_for("get_product_by_id", product_id=str(product_in_stock.id)), params={"fields": "stock"}
+    )
+    assert response.json() == {"stock": 3}
+
+
+async def test_quantity_of_product_is_limited_across_lines(authorized_client: AsyncClient, app: FastAPI,
+                                                           product_in_stock: Product) -> None:
+    response = await authorized_client.post(
+        app.url_path_for("orders:place_order"),
+        json={"lines": [{"product_id": product_in_stock.id, "quantity": 600},
+                        {"product_id": product_in_stock.id, "quantity": 600}]}
+    )
+    assert response.status_code == 422
+
+
+async def test_orders_are_listed_within_period(authorized_client: AsyncClient, app: FastAPI,
+                                               product_in_stock: Product) -> None:
+    response = await authorized_client.post(
+        app.url_path_for("orders:place_order"),
+        json={"lines": [{"product_id": product_in_stock.id, "quantity": 1}]}
+    )
+    order_id = response.json()["lines"][0]["order_id"]
+    now = datetime.datetime.utcnow()
+
+    response = await authorized_client.get(
+        app.url_path_for("orders:get_orders"),
+        params={"created_from": (now - datetime.timedelta(hours=1)).isoformat(), "created_to": now.isoformat()}
+    )
+    assert response.status_code == 200
+    assert order_id in [line["order_id"] for line in response.json()]
+
+    response = await authorized_client.get(
+        app.url_path_for("orders:get_orders"),
+        params={"created_from": (now - datetime.timedelta(days=400)).isoformat(), "created_to": now.isoformat()}
+    )
+    assert response.status_code == 400
@@ -1,9 +1,11 @@
 import pytest
 from fastapi import FastAPI
 from httpx import AsyncClient
+from sqlalchemy.orm import sessionmaker
 
 from src.api.v1.dto import ProductDTO
 from src.services.database.models import SizeEnum
+from src.services.database.repositories.product_repository import ProductRepository
 
 pytestmark = pytest.mark.asyncio
 
@@ -13,3 +15,43 @@ async def test_create_product(authorized_client: AsyncClient, app: FastAPI) -> N
     product.patch_enum_values()
     response = await authorized_client.put(app.url_path_for("products:create_product"), json=product.dict())
     assert response.status_code == 201
+
+
+async def test_search_products(authorized_client: AsyncClient, app: FastAPI,
+                               session_maker: sessionmaker) -> None:  # type: ignore
+    await ProductRepository(session_maker).add_products([
+        {"name": "Mechanical keyboard", "unit_price": 90, "size": SizeEnum.MEDIUM, "description": "Quiet switches"},
+        {"name": "Keyboard cover", "unit_price": 5, "size": SizeEnum.SMALL, "description": "Fits mechanical keyboards"},
+        {"name": "Desk lamp", "unit_price": 20, "size": SizeEnum.MEDIUM, "description": "Warm light"},
+    ])
+    url = app.url_path_for("products:search_products")
+
+    response = await authorized_client.get(url, params={"q": "mechanical keyboard", "limit": 1, "fields": "name"})
+    assert response.status_code == 200
+    first_page = response.json()
+    # match in name ranks above match in description
+    assert [product["name"] for product in first_page["items"]] == ["Mechanical keyboard"]
+
+    response = await authorized_client.get(
+        url, params={"q": "mechanical keyboard", "limit": 1, "fields": "name", "cursor": first_page["next_cursor"]}
+    )
+    assert [product["name"] for product in response.json()["items"]] == ["Keyboard cover"]
+
+    # misspelled word matches by trigrams
+    response = await authorized_client.get(url, params={"q": "keybord"})
+    assert {"Mechanical keyboard", "Keyboard cover"} <= {product["name"] for product in response.json()["items"]}
+
+    response = await authorized_client.get(url, params={"q": "lamp", "cursor": "malformed"})
+    assert response.status_code == 400
+
+
+async def test_autocomplete_products(authorized_client: AsyncClient, app: FastAPI,
+                                     session_maker: sessionmaker) -> None:  # type: ignore
+    await ProductRepository(session_maker).add_product(name="Trackball mouse", unit_price=40, size=SizeEnum.SMALL)
+    # other workers poll changes in background
+    await app.state.product_autocomplete.refresh()
+
+    response = await authorized_client.get(app.url_path_for("products:autocomplete_products"),
+                                           params={"prefix": "TRACK"})
+    assert response.status_code == 200
+    assert [product["name"] for product in response.json()] == ["Trackball mouse"]
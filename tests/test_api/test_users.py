@@ -1,8 +1,11 @@
+from typing import List
+
 import pytest
 from fastapi import FastAPI
 from httpx import AsyncClient
 
 from src.services.database import User
+from src.services.database.query_budget import RequestQueryLog
 
 pytestmark = pytest.mark.asyncio
 
@@ -28,6 +31,15 @@ async def test_users_count(authorized_client: AsyncClient, app: FastAPI) -> None
     response = await authorized_client.post(app.url_path_for("users:get_users_count"))
     assert response.status_code == 200
     assert isinstance(response.json().get("count"), int)
+    assert response.json()["strategy"] == "counter"
+
+
+async def test_users_count_strategies_agree(authorized_client: AsyncClient, app: FastAPI) -> None:
+    url = app.url_path_for("users:get_users_count")
+    counter = (await authorized_client.post(url, params={"strategy": "counter"})).json()
+    scan = (await authorized_client.post(url, params={"strategy": "scan"})).json()
+    assert counter["count"] == scan["count"]
+    assert scan["strategy"] == "scan"
 
 
 async def test_get_user_info(authorized_client: AsyncClient, app: FastAPI, test_user: User) -> None:
@@ -35,9 +47,59 @@ async def test_get_user_info(authorized_client: AsyncClient, app: FastAPI, test_
     assert response.status_code == 200
 
 
+async def test_get_user_info_query_count(authorized_client: AsyncClient, app: FastAPI, test_user: User,
+                                        query_logs: List[RequestQueryLog]) -> None:
+    url = app.url_path_for("users:get_user_info", user_id=str(test_user.id))
+    await authorized_client.get(url)
+    # test user is the authorized one, so both security guard and endpoint read it from cache
+    response = await authorized_client.get(url)
+    assert response.status_code == 200
+    assert query_logs[-1].count == 0
+    assert query_logs[-1].route == "/api/v1/users/{user_id}/info"
+
+
 async def test_get_all_users(authorized_client: AsyncClient, app: FastAPI) -> None:
     response = await authorized_client.get(app.url_path_for("users:get_all_users"))
     assert response.status_code == 200
+    assert isinstance(response.json().get("items"), list)
+
+
+async def test_get_all_users_paginated(authorized_client: AsyncClient, app: FastAPI) -> None:
+    first_page = await authorized_client.get(app.url_path_for("users:get_all_users"), params={"limit": 1})
+    assert first_page.status_code == 200
+    next_cursor = first_page.json()["next_cursor"]
+    assert next_cursor is not None
+
+    second_page = await authorized_client.get(
+        app.url_path_for("users:get_all_users"), params={"limit": 1, "cursor": next_cursor}
+    )
+    assert second_page.status_code == 200
+    assert all(user["id"] > first_page.json()["items"][0]["id"] for user in second_page.json()["items"])
+
+
+async def test_get_all_users_with_sparse_fieldset(authorized_client: AsyncClient, app: FastAPI) -> None:
+    response = await authorized_client.get(app.url_path_for("users:get_all_users"), params={"fields": "username"})
+    assert response.status_code == 200
+    assert all(set(user) == {"id", "username"} for user in response.json()["items"])
+
+
+async def test_get_all_users_with_unknown_field(authorized_client: AsyncClient, app: FastAPI) -> None:
+    response = await authorized_client.get(
+        app.url_path_for("users:get_all_users"), params={"fields": "password_hash"}
+    )
+    assert response.status_code == 400
+
+
+async def test_get_all_users_with_malformed_cursor(authorized_client: AsyncClient, app: FastAPI) -> None:
+    response = await authorized_client.get(app.url_path_for("users:get_all_users"), params={"cursor": "!"})
+    assert response.status_code == 400
+
+
+async def test_stream_all_users_as_ndjson(authorized_client: AsyncClient, app: FastAPI) -> None:
+    response = await authorized_client.get(app.url_path_for("users:get_all_users"), params={"stream": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert all("password_hash" not in line for line in response.text.splitlines())
 
 
 async def test_delete_user(authorized_client: AsyncClient, app: FastAPI, test_user: User) -> None:
@@ -0,0 +1,76 @@
+import uuid
+from typing import List, Sequence, cast
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm, SecurityScopes
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+# endpoints import security services, so API package is imported first, as application does
+import src.api  # noqa: F401
+from src.services.database import User
+from src.services.database.repositories.user_repository import UserRepository
+from src.services.security.jwt_service import ADMIN_SCOPE, JWTAuthenticationService, JWTSecurityGuardService
+
+pytestmark = pytest.mark.asyncio
+
+SECRET_KEY = "secret-key-of-admin-scope-tests-32b"
+ALGORITHM = "HS256"
+
+
+class FakePasswordHasher:
+    async def hash(self, password: str) -> str:
+        return f"hash of {password}"
+
+    async def hash_many(self, passwords: Sequence[str]) -> List[str]:
+        return [await self.hash(password) for password in passwords]
+
+    async def check_needs_rehash(self, hash: str) -> bool:
+        return False
+
+    async def verify(self, hash: str, password: str) -> bool:
+        return True
+
+
+async def add_user(session_pool: sessionmaker, is_admin: bool) -> User:  # type: ignore
+    name = f"scope-{uuid.uuid4().hex[:16]}"
+    return await UserRepository(session_pool, FakePasswordHasher()).add_user(  # type: ignore
+        first_name=name, last_name=name, phone_number="+70000000000", email=f"{name}@test.com",
+        password="password", username=name, is_admin=is_admin
+    )
+
+
+async def log_in(session_pool: sessionmaker, user: User, scopes: str) -> List[str]:  # type: ignore
+    async with cast(AsyncSession, session_pool()) as session:
+        service = JWTAuthenticationService(UserRepository(session, FakePasswordHasher()),  # type: ignore
+                                           FakePasswordHasher(), SECRET_KEY, ALGORITHM)  # type: ignore
+        token = await service.authenticate_user(
+            OAuth2PasswordRequestForm(username=user.username, password="password", scope=scopes)
+        )
+    return cast(List[str], jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])["scopes"])
+
+
+@pytest.mark.parametrize("is_admin, expected_scopes", [(False, ["me"]), (True, ["me", ADMIN_SCOPE])])
+async def test_admin_scope_is_granted_only_to_admins(session_maker: sessionmaker,  # type: ignore
+                                                     is_admin: bool, expected_scopes: List[str]) -> None:
+    user = await add_user(session_maker, is_admin)
+    assert await log_in(session_maker, user, scopes=f"me {ADMIN_SCOPE}") == expected_scopes
+
+
+async def test_admin_scope_of_token_is_rejected_if_user_is_not_admin(session_maker: sessionmaker) -> None:  # type: ignore
+    # e.g. token has been issued before user lost admin rights
+    user = await add_user(session_maker, is_admin=False)
+    token = jwt.encode({"sub": user.username, "scopes": [ADMIN_SCOPE]}, SECRET_KEY, algorithm=ALGORITHM)
+    request = Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+    guard = JWTSecurityGuardService(OAuth2PasswordBearer(tokenUrl="oauth"), FakePasswordHasher(),  # type: ignore
+                                    SECRET_KEY, ALGORITHM)
+
+    async with cast(AsyncSession, session_maker()) as session:
+        repository = UserRepository(session, FakePasswordHasher())  # type: ignore
+        assert (await guard._authorize(request, SecurityScopes(), repository)).id == user.id
+        with pytest.raises(HTTPException) as exc_info:
+            await guard._authorize(request, SecurityScopes([ADMIN_SCOPE]), repository)
+    assert exc_info.value.status_code == 401
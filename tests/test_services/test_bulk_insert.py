@@ -0,0 +1,108 @@
+import uuid
+from decimal import Decimal
+from typing import Any, Dict, List, cast
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.services.database import Product
+from src.services.database.models import SizeEnum
+from src.services.database.repositories.base import BulkInsertStrategy
+from src.services.database.repositories.product_repository import ProductRepository
+
+
+class SmallBatchProductRepository(ProductRepository):
+    # every strategy is exercised by a few rows
+    bulk_multi_values_threshold = 2
+    bulk_copy_threshold = 4
+
+
+def make_products(prefix: str, count: int) -> List[Dict[str, Any]]:
+    return [
+        {"name": f"{prefix}-{index}", "unit_price": Decimal(10 + index), "size": list(SizeEnum)[index % 4]}
+        for index in range(count)
+    ]
+
+
+async def get_products(session_pool: sessionmaker, prefix: str) -> List[Any]:  # type: ignore
+    async with cast(AsyncSession, session_pool()) as session:
+        return (await session.execute(
+            select(Product.id, Product.name, Product.unit_price, Product.size)
+                .where(Product.name.startswith(prefix))
+                .order_by(Product.name)
+        )).all()
+
+
+@pytest.mark.parametrize(
+    "row_count, return_ids, upsert, expected",
+    [
+        (500, False, False, BulkInsertStrategy.MULTI_VALUES),
+        (501, False, False, BulkInsertStrategy.EXECUTEMANY),
+        (9_999, False, False, BulkInsertStrategy.EXECUTEMANY),
+        (10_000, False, False, BulkInsertStrategy.COPY),
+        (10_000, False, True, BulkInsertStrategy.EXECUTEMANY),
+        (10_000, True, False, BulkInsertStrategy.MULTI_VALUES),
+    ],
+)
+def test_strategy_is_chosen_by_size_of_batch(row_count: int, return_ids: bool, upsert: bool,
+                                             expected: BulkInsertStrategy) -> None:
+    repository = ProductRepository(session_or_pool=object())  # type: ignore
+    assert repository._choose_bulk_strategy(row_count, return_ids, upsert) is expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "row_count, strategy",
+    [(2, BulkInsertStrategy.MULTI_VALUES), (3, BulkInsertStrategy.EXECUTEMANY), (5, BulkInsertStrategy.COPY)],
+)
+async def test_enum_and_numeric_columns_are_inserted_by_every_strategy(
+        session_maker: sessionmaker, row_count: int, strategy: BulkInsertStrategy  # type: ignore
+) -> None:
+    prefix = f"bulk-{uuid.uuid4()}"
+    products = make_products(prefix, row_count)
+    async with cast(AsyncSession, session_maker()) as session:
+        repository = SmallBatchProductRepository(session)
+        assert repository._choose_bulk_strategy(row_count, return_ids=False, upsert=False) is strategy
+        await repository.add_products(products)
+
+    assert [tuple(row[1:]) for row in await get_products(session_maker, prefix)] == [
+        (product["name"], product["unit_price"], product["size"]) for product in products
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ids_are_returned_in_order_of_rows(session_maker: sessionmaker) -> None:  # type: ignore
+    prefix = f"bulk-{uuid.uuid4()}"
+    products = make_products(prefix, 5)
+    # rows with different columns are inserted by separate statements
+    products[1]["description"] = "described"
+    products[3]["description"] = "described"
+    async with cast(AsyncSession, session_maker()) as session:
+        ids = await SmallBatchProductRepository(session).add_products(products, return_ids=True)
+
+    ids_by_name = {row.name: row.id for row in await get_products(session_maker, prefix)}
+    assert ids == [ids_by_name[product["name"]] for product in products]
+
+
+@pytest.mark.asyncio
+async def test_conflicting_rows_are_updated(session_maker: sessionmaker) -> None:  # type: ignore
+    prefix = f"bulk-{uuid.uuid4()}"
+    async with cast(AsyncSession, session_maker()) as session:
+        repository = SmallBatchProductRepository(session)
+        [existing_id] = cast(List[int], await repository.add_products(make_products(prefix, 1), return_ids=True))
+
+        products = make_products(prefix, 5)
+        products[0]["unit_price"] = Decimal(99)
+        ids = await repository.add_products(products, update_existing=True, return_ids=True)
+        # more rows than COPY threshold, but COPY can't resolve conflicts
+        await repository.add_products(products, update_existing=True)
+        # nothing to update, so skipped rows would have no id
+        with pytest.raises(ValueError):
+            await repository.add_products([{"name": f"{prefix}-0"}], update_existing=True, return_ids=True)
+
+    rows = await get_products(session_maker, prefix)
+    assert cast(List[int], ids)[0] == existing_id
+    assert [row.id for row in rows] == ids
+    assert [row.unit_price for row in rows] == [Decimal(99), *(Decimal(10 + index) for index in range(1, 5))]
@@ -0,0 +1,19 @@
+import pytest
+
+from src.api.v1.dto import UserInfoDTO
+from src.utils.fieldsets import parse_fieldset, InvalidFieldset
+
+
+def test_all_fields_are_returned_by_default() -> None:
+    assert parse_fieldset(None, UserInfoDTO) == tuple(UserInfoDTO.__fields__)
+
+
+def test_fields_are_ordered_as_in_dto_and_required_ones_are_added() -> None:
+    assert parse_fieldset("username, email,username", UserInfoDTO) == ("email", "username")
+    assert parse_fieldset("username", UserInfoDTO, required=("id",)) == ("id", "username")
+
+
+@pytest.mark.parametrize("fields", ["", " , ", "username,password_hash"])
+def test_unknown_or_empty_fields_are_rejected(fields: str) -> None:
+    with pytest.raises(InvalidFieldset):
+        parse_fieldset(fields, UserInfoDTO)
@@ -0,0 +1,63 @@
+import asyncio
+from typing import Dict, List
+
+import pytest
+
+from src.services.database.repositories.loader import BatchLoader
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeSource:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.batches: List[List[int]] = []
+        self.delay = delay
+        self.fail = False
+
+    async def load(self, keys: List[int]) -> Dict[int, str]:
+        self.batches.append(keys)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("database is unavailable")
+        return {key: f"value-{key}" for key in keys if key != 404}
+
+
+async def test_concurrent_lookups_are_batched_and_cached() -> None:
+    source = FakeSource()
+    loader: BatchLoader[int, str] = BatchLoader(source.load)
+    assert await asyncio.gather(loader.load(1), loader.load(2), loader.load(1), loader.load(404)) == [
+        "value-1", "value-2", "value-1", None
+    ]
+    assert await loader.load_many([2, 404, 3]) == ["value-2", None, "value-3"]
+    assert source.batches == [[1, 2, 404], [3]]
+
+
+async def test_batches_are_limited_by_size() -> None:
+    source = FakeSource()
+    loader: BatchLoader[int, str] = BatchLoader(source.load, max_batch_size=2)
+    await loader.load_many(range(5))
+    assert source.batches == [[0, 1], [2, 3], [4]]
+
+
+async def test_cancellation_of_one_caller_does_not_affect_others() -> None:
+    source = FakeSource(delay=0.01)
+    loader: BatchLoader[int, str] = BatchLoader(source.load)
+    cancelled, waiting = asyncio.create_task(loader.load(1)), asyncio.create_task(loader.load(1))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    assert await waiting == "value-1"
+    assert cancelled.cancelled()
+
+
+async def test_failed_keys_are_loaded_again() -> None:
+    source = FakeSource()
+    loader: BatchLoader[int, str] = BatchLoader(source.load)
+    source.fail = True
+    with pytest.raises(RuntimeError):
+        await loader.load(1)
+    source.fail = False
+    assert await loader.load(1) == "value-1"
+
+    loader.clear(1)
+    await loader.load(1)
+    assert source.batches == [[1], [1], [1]]
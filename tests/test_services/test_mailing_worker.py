@@ -0,0 +1,184 @@
+import asyncio
+from typing import Any, Callable, List, Optional
+
+import orjson
+import pytest
+
+from src.services.amqp import mailing_worker as mailing_worker_module
+from src.services.amqp.mailing_worker import MailingWorker
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeIncomingMessage:
+    def __init__(self, body: bytes, redelivered: bool = False) -> None:
+        self.body = body
+        self.redelivered = redelivered
+        self.timestamp = None
+        self.outcome: Optional[str] = None
+
+    async def ack(self) -> None:
+        self.outcome = "ack"
+
+    async def nack(self, requeue: bool = True) -> None:
+        self.outcome = "requeue" if requeue else "drop"
+
+    def reject(self, requeue: bool = False) -> None:
+        self.outcome = "reject"
+
+
+class FakeQueue:
+    def __init__(self) -> None:
+        self.callback: Optional[Callable[[Any], Any]] = None
+
+    async def consume(self, callback: Callable[[Any], Any]) -> str:
+        self.callback = callback
+        return "consumer-tag"
+
+    async def cancel(self, consumer_tag: str) -> None:
+        self.callback = None
+
+
+class FakeChannel:
+    def __init__(self) -> None:
+        self.prefetch_count: Optional[int] = None
+        self.queue = FakeQueue()
+
+    async def set_qos(self, prefetch_count: int) -> None:
+        self.prefetch_count = prefetch_count
+
+    # noinspection PyUnusedLocal
+    async def declare_queue(self, name: str, durable: bool = False) -> FakeQueue:
+        return self.queue
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.fake_channel = FakeChannel()
+        self.is_closed = False
+
+    async def channel(self) -> FakeChannel:
+        return self.fake_channel
+
+    async def close(self) -> None:
+        self.is_closed = True
+
+
+class RecordingHandler:
+    def __init__(self, delay: float = 0.0, failing_emails: Optional[List[str]] = None) -> None:
+        self.delay = delay
+        self.failing_emails = failing_emails or []
+        self.emails: List[str] = []
+        self.running = self.max_running = 0
+
+    async def __call__(self, email: str) -> None:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if email in self.failing_emails:
+                raise ConnectionError("SMTP server is unavailable")
+            self.emails.append(email)
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture()
+def connection(monkeypatch: pytest.MonkeyPatch) -> FakeConnection:
+    connection = FakeConnection()
+
+    # noinspection PyUnusedLocal
+    async def connect_robust(uri: str, **kwargs: Any) -> FakeConnection:
+        return connection
+
+    monkeypatch.setattr(mailing_worker_module, "connect_robust", connect_robust)
+    return connection
+
+
+def make_message(email: str, redelivered: bool = False) -> FakeIncomingMessage:
+    return FakeIncomingMessage(orjson.dumps({"email": email}), redelivered=redelivered)
+
+
+async def deliver(connection: FakeConnection, *messages: FakeIncomingMessage) -> None:
+    callback = connection.fake_channel.queue.callback
+    assert callback is not None
+    for message in messages:
+        await callback(message)
+
+
+async def start(worker: MailingWorker) -> "asyncio.Task[None]":
+    task = asyncio.create_task(worker.run())
+    await asyncio.sleep(0.01)
+    return task
+
+
+async def stop(worker: MailingWorker, task: "asyncio.Task[None]") -> None:
+    worker.stop()
+    await asyncio.wait_for(task, timeout=1)
+
+
+async def test_messages_of_the_same_recipient_are_coalesced(connection: FakeConnection) -> None:
+    handler = RecordingHandler()
+    worker = MailingWorker("amqp://test", "mailing", handler, prefetch_count=10, coalesce_window=0.05)
+    task = await start(worker)
+
+    messages = [make_message("first@test.com"), make_message("second@test.com"), make_message("first@test.com")]
+    await deliver(connection, *messages)
+    await asyncio.sleep(0.1)
+    # message delivered after the window has passed is handled separately
+    late_message = make_message("first@test.com")
+    await deliver(connection, late_message)
+    await asyncio.sleep(0.1)
+    await stop(worker, task)
+
+    assert sorted(handler.emails) == ["first@test.com", "first@test.com", "second@test.com"]
+    assert [message.outcome for message in (*messages, late_message)] == ["ack"] * 4
+    assert (worker.metrics.processed_jobs, worker.metrics.coalesced_messages) == (4, 1)
+    assert connection.is_closed
+
+
+async def test_batch_is_limited_by_prefetch_count(connection: FakeConnection) -> None:
+    handler = RecordingHandler()
+    # the window is long enough to coalesce all messages, if batch wasn't limited
+    worker = MailingWorker("amqp://test", "mailing", handler, prefetch_count=2, coalesce_window=1.0)
+    task = await start(worker)
+    assert connection.fake_channel.prefetch_count == 2
+
+    await deliver(connection, *(make_message("same@test.com") for _ in range(4)))
+    await asyncio.sleep(0.05)
+    await stop(worker, task)
+
+    # full batch is dispatched without waiting for the end of the window
+    assert handler.emails == ["same@test.com", "same@test.com"]
+    assert worker.metrics.coalesced_messages == 2
+
+
+async def test_count_of_running_handlers_is_limited(connection: FakeConnection) -> None:
+    handler = RecordingHandler(delay=0.05)
+    worker = MailingWorker("amqp://test", "mailing", handler, concurrency=2, coalesce_window=0.01)
+    task = await start(worker)
+
+    await deliver(connection, *(make_message(f"{index}@test.com") for index in range(5)))
+    await asyncio.sleep(0.3)
+    await stop(worker, task)
+
+    assert len(handler.emails) == 5
+    assert handler.max_running == 2
+
+
+async def test_failed_and_malformed_jobs_are_not_acknowledged(connection: FakeConnection) -> None:
+    handler = RecordingHandler(failing_emails=["failing@test.com"])
+    worker = MailingWorker("amqp://test", "mailing", handler, coalesce_window=0.01)
+    task = await start(worker)
+
+    first_attempt, redelivered = make_message("failing@test.com"), make_message("failing@test.com", redelivered=True)
+    malformed = FakeIncomingMessage(b"not json")
+    await deliver(connection, first_attempt, malformed)
+    await asyncio.sleep(0.05)
+    await deliver(connection, redelivered)
+    await asyncio.sleep(0.05)
+    await stop(worker, task)
+
+    # job is retried once, then dropped to avoid endless redelivery
+    assert (first_attempt.outcome, redelivered.outcome, malformed.outcome) == ("requeue", "drop", "reject")
+    assert (worker.metrics.processed_jobs, worker.metrics.failed_jobs) == (0, 2)
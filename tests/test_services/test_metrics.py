@@ -0,0 +1,60 @@
+import os
+import pathlib
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+
+from src.middlewares.metrics_middleware import PrometheusMiddleware
+from src.utils.multiprocess_metrics import MULTIPROCESS_DIR_ENV, prepare_multiprocess_dir
+from src.utils.request_context import UNMATCHED_ROUTE
+
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    app.add_middleware(PrometheusMiddleware)
+    return app
+
+
+def get_request_count(route: str, status: str) -> float:
+    return REGISTRY.get_sample_value(
+        "http_request_duration_seconds_count", {"method": "GET", "route": route, "status": status}
+    ) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_requests_are_labeled_with_route_template() -> None:
+    before = get_request_count("/items/{item_id}", "200")
+    unmatched_before = get_request_count(UNMATCHED_ROUTE, "404")
+    async with AsyncClient(app=make_app(), base_url="http://test") as client:
+        await client.get("/items/1")
+        await client.get("/items/2")
+        await client.get("/unknown")
+
+    assert get_request_count("/items/{item_id}", "200") - before == 2
+    assert get_request_count(UNMATCHED_ROUTE, "404") - unmatched_before == 1
+    assert REGISTRY.get_sample_value(
+        "http_requests_in_progress", {"method": "GET", "route": "/items/{item_id}"}
+    ) == 0
+
+
+def test_prepare_multiprocess_dir_keeps_files_of_current_process(tmp_path: pathlib.Path,
+                                                                 monkeypatch: pytest.MonkeyPatch) -> None:
+    multiprocess_dir = tmp_path / "metrics"
+    monkeypatch.setenv(MULTIPROCESS_DIR_ENV, str(multiprocess_dir))
+    prepare_multiprocess_dir()
+    assert multiprocess_dir.is_dir()
+
+    own_file, stale_file = f"counter_{os.getpid()}.db", f"counter_{os.getpid() + 1}.db"
+    for filename in (own_file, stale_file, "unrelated.txt"):
+        (multiprocess_dir / filename).touch()
+    prepare_multiprocess_dir()
+
+    assert sorted(path.name for path in multiprocess_dir.iterdir()) == sorted([own_file, "unrelated.txt"])
@@ -0,0 +1,88 @@
+from typing import Any, List, Set, Tuple, cast
+
+import orjson
+import pytest
+from aio_pika import Message
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.services.amqp.outbox import OutboxRelay
+from src.services.database import OutboxMessage
+from src.services.database.repositories.outbox_repository import OutboxRepository
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeExchange:
+    def __init__(self) -> None:
+        self.failing_routing_keys: Set[str] = set()
+        self.published: List[Tuple[str, Any]] = []
+
+    # noinspection PyUnusedLocal
+    async def publish(self, message: Message, routing_key: str, mandatory: bool = False) -> None:
+        if routing_key in self.failing_routing_keys:
+            raise ConnectionError(f"{routing_key} isn't confirmed")
+        self.published.append((routing_key, orjson.loads(message.body)))
+
+
+class FakeChannel:
+    def __init__(self) -> None:
+        self.default_exchange = FakeExchange()
+
+
+@pytest.fixture(name="outbox")
+async def empty_outbox(session_maker: sessionmaker) -> sessionmaker:  # type: ignore
+    async with cast(AsyncSession, session_maker()) as session:
+        async with session.begin():
+            await session.execute(delete(OutboxMessage))
+    return session_maker
+
+
+async def add_messages(session_pool: sessionmaker, *routing_keys: str) -> None:  # type: ignore
+    async with cast(AsyncSession, session_pool()) as session:
+        async with session.begin():
+            repository = OutboxRepository(session)
+            for index, routing_key in enumerate(routing_keys):
+                await repository.add_message(routing_key, {"index": index})
+
+
+async def get_routing_keys(session_pool: sessionmaker) -> List[str]:  # type: ignore
+    async with cast(AsyncSession, session_pool()) as session:
+        return list((await session.execute(
+            select(OutboxMessage.routing_key).order_by(OutboxMessage.id)
+        )).scalars())
+
+
+async def test_unconfirmed_messages_are_kept_in_outbox_and_retried(outbox: sessionmaker) -> None:  # type: ignore
+    channel = FakeChannel()
+    relay = OutboxRelay(outbox, uri="amqp://unused", batch_size=10)
+
+    async def get_channel() -> FakeChannel:
+        return channel
+
+    relay._get_channel = get_channel  # type: ignore
+    channel.default_exchange.failing_routing_keys.add("failing")
+    await add_messages(outbox, "mailing", "failing", "mailing")
+
+    assert await relay.relay_batch() == 2
+    assert channel.default_exchange.published == [("mailing", {"index": 0}), ("mailing", {"index": 2})]
+    # confirmed messages are deleted, i.e. marked as sent
+    assert await get_routing_keys(outbox) == ["failing"]
+
+    channel.default_exchange.failing_routing_keys.clear()
+    assert await relay.relay_batch() == 1
+    assert channel.default_exchange.published[-1] == ("failing", {"index": 1})
+    assert await get_routing_keys(outbox) == []
+    assert await relay.relay_batch() == 0
+
+
+async def test_messages_locked_by_another_relay_are_skipped(outbox: sessionmaker) -> None:  # type: ignore
+    await add_messages(outbox, "first", "second", "third")
+    async with cast(AsyncSession, outbox()) as session, cast(AsyncSession, outbox()) as other_session:
+        async with session.begin():
+            locked = await OutboxRepository(session).lock_batch(2)
+            assert [message.routing_key for message in locked] == ["first", "second"]
+            async with other_session.begin():
+                skipping = await OutboxRepository(other_session).lock_batch(2)
+            assert [message.routing_key for message in skipping] == ["third"]
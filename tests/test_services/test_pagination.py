@@ -0,0 +1,16 @@
+import pytest
+
+from src.utils.pagination import InvalidCursor, decode_cursor, decode_ranked_cursor, encode_cursor, \
+    encode_ranked_cursor
+
+
+def test_cursor_is_decoded() -> None:
+    assert decode_cursor(encode_cursor(42)) == 42
+    # rank is a float of database, so it has to survive round trip exactly to continue page
+    assert decode_ranked_cursor(encode_ranked_cursor(0.30000001192092896, 42)) == (0.30000001192092896, 42)
+
+
+@pytest.mark.parametrize("cursor", ["malformed", encode_cursor(42), encode_ranked_cursor("0.5", 42)])  # type: ignore
+def test_malformed_ranked_cursor_is_rejected(cursor: str) -> None:
+    with pytest.raises(InvalidCursor):
+        decode_ranked_cursor(cursor)
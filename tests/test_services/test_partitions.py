@@ -0,0 +1,62 @@
+import datetime
+import uuid
+
+import pytest
+
+from src.services.database.partitions import MonthlyPartition, MonthlyPartitionManager, add_months
+from src.utils.time_ordered_uuid import get_uuid_timestamp, make_time_ordered_uuid
+
+
+def make_manager(retention_months=None) -> MonthlyPartitionManager:  # type: ignore
+    return MonthlyPartitionManager(
+        engine=object(), table_name="orders", premake_months=2,  # type: ignore
+        retention_months=retention_months, clock=lambda: datetime.datetime(2026, 11, 18, 12, 30)
+    )
+
+
+def test_months_are_added_across_years() -> None:
+    assert add_months(datetime.datetime(2026, 11, 1), 2) == datetime.datetime(2027, 1, 1)
+    assert add_months(datetime.datetime(2026, 1, 1), -13) == datetime.datetime(2024, 12, 1)
+
+
+def test_partition_is_named_after_month() -> None:
+    partition = MonthlyPartition("orders", datetime.datetime(2026, 12, 18, 9))
+    assert partition.name == "orders_y2026m12"
+    assert (partition.start, partition.end) == (datetime.datetime(2026, 12, 1), datetime.datetime(2027, 1, 1))
+    assert MonthlyPartition.from_name("orders", partition.name) == partition
+    assert partition.create_sql() == (
+        'CREATE TABLE IF NOT EXISTS "orders_y2026m12" PARTITION OF "orders" '
+        "FOR VALUES FROM ('2026-12-01 00:00:00') TO ('2027-01-01 00:00:00')"
+    )
+
+
+@pytest.mark.parametrize("name", ["orders_default", "orders_y2026m13", "checkouts_y2026m12"])
+def test_other_tables_are_not_monthly_partitions(name: str) -> None:
+    assert MonthlyPartition.from_name("orders", name) is None
+
+
+def test_partitions_of_current_and_upcoming_months_are_created() -> None:
+    existing = [MonthlyPartition("orders", datetime.datetime(2026, month, 1)) for month in (10, 11)]
+    missing, expired = make_manager().plan(existing)
+    assert [partition.name for partition in missing] == ["orders_y2026m12", "orders_y2027m01"]
+    assert expired == []
+
+
+def test_partitions_older_than_retention_expire() -> None:
+    existing = [MonthlyPartition("orders", add_months(datetime.datetime(2026, 11, 1), -offset)) for offset in range(6)]
+    _, expired = make_manager(retention_months=3).plan(existing)
+    # August is retained, since it's the third month before November
+    assert [partition.name for partition in expired] == ["orders_y2026m06", "orders_y2026m07"]
+
+
+def test_moment_is_recovered_from_time_ordered_uuid() -> None:
+    moment = datetime.datetime(2026, 10, 18, 21, 14, 9, 318562)
+    value = make_time_ordered_uuid(moment)
+    assert value.version == 7
+    assert get_uuid_timestamp(value) == moment.replace(microsecond=318000)
+    assert make_time_ordered_uuid(moment + datetime.timedelta(milliseconds=1)) > value
+    with pytest.raises(ValueError):
+        get_uuid_timestamp(uuid.uuid4())
+    # the latest moment, that 48 bits can hold, is beyond the range of datetime
+    with pytest.raises(ValueError):
+        get_uuid_timestamp(uuid.UUID("ffffffff-ffff-7fff-bfff-ffffffffffff"))
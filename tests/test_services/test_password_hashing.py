@@ -0,0 +1,51 @@
+import asyncio
+from typing import Tuple
+
+import pytest
+from argon2 import PasswordHasher
+from prometheus_client import REGISTRY
+
+from src.utils.exceptions import PasswordHashingOverloaded
+from src.utils.password_hashing.pooled import PooledPasswordHasher
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_hash_and_verify_in_pool() -> None:
+    hasher = PooledPasswordHasher(PasswordHasher(), max_workers=2)
+    password_hash = await hasher.hash("password")
+    assert await hasher.verify(password_hash, "password") is True
+    assert hasher.metrics.completed == 2
+    hasher.shutdown()
+
+
+async def test_queue_wait_and_duration_are_exported_per_operation() -> None:
+    def get_counts(operation: str) -> Tuple[float, ...]:
+        return tuple(
+            REGISTRY.get_sample_value(f"{metric}_count", {"operation": operation}) or 0
+            for metric in ("password_hashing_queue_wait_seconds", "password_hashing_duration_seconds")
+        )
+
+    hashes_before, verifications_before = get_counts("hash"), get_counts("verify")
+    hasher = PooledPasswordHasher(PasswordHasher(), max_workers=1)
+    password_hash = await hasher.hash("password")
+    await hasher.verify(password_hash, "password")
+    await hasher.hash_many(["first", "second"])
+    hasher.shutdown()
+
+    assert get_counts("hash") == tuple(count + 3 for count in hashes_before)
+    assert get_counts("verify") == tuple(count + 1 for count in verifications_before)
+
+
+async def test_excess_operations_are_rejected() -> None:
+    hasher = PooledPasswordHasher(PasswordHasher(), max_workers=1, max_queue_size=1)
+    results = await asyncio.gather(*(hasher.hash("password") for _ in range(4)), return_exceptions=True)
+    assert sum(isinstance(result, PasswordHashingOverloaded) for result in results) == 2
+    assert hasher.metrics.rejected == 2
+    hasher.shutdown()
+
+
+async def test_bulk_hashing_is_never_rejected() -> None:
+    hasher = PooledPasswordHasher(PasswordHasher(), max_workers=1, max_queue_size=0)
+    assert len(await hasher.hash_many(["password"] * 4)) == 4
+    hasher.shutdown()
@@ -0,0 +1,46 @@
+from src.utils.prefix_index import PrefixIndex, normalize
+
+
+def make_index() -> PrefixIndex:
+    return PrefixIndex(
+        [(1, "Mechanical keyboard"), (2, "Mechanical pencil"), (3, "Mouse"), (4, "mechanical  Watch")],
+        weights={2: 10, 4: 5}
+    )
+
+
+def test_name_is_normalized() -> None:
+    assert normalize("  Mechanical   KEYBOARD") == "mechanical keyboard"
+    assert normalize("Mechanical ") == "mechanical "
+
+
+def test_popular_names_are_completed_first() -> None:
+    index = make_index()
+    assert index.complete("mech", limit=10) == [
+        (2, "Mechanical pencil"), (4, "mechanical  Watch"), (1, "Mechanical keyboard")
+    ]
+    assert index.complete("MECHANICAL W", limit=10) == [(4, "mechanical  Watch")]
+    assert index.complete("m", limit=2) == [(2, "Mechanical pencil"), (4, "mechanical  Watch")]
+    assert index.complete("keyboard", limit=10) == []
+
+
+def test_changes_invalidate_cached_completions() -> None:
+    index = make_index()
+    assert index.complete("mo", limit=10) == [(3, "Mouse")]
+    assert index.upsert(5, "Monitor")
+    assert index.upsert(3, "Mousepad")
+    assert not index.upsert(3, "Mousepad")
+    assert index.complete("mo", limit=10) == [(5, "Monitor"), (3, "Mousepad")]
+
+    index.set_weights({3: 1})
+    assert index.complete("mo", limit=10) == [(3, "Mousepad"), (5, "Monitor")]
+    assert index.remove(3)
+    assert not index.remove(3)
+    assert index.complete("mo", limit=10) == [(5, "Monitor")]
+
+
+def test_a_lot_of_changes_rebuild_index() -> None:
+    index = make_index()
+    assert index.upsert_many([(3, "Mouse")] + [(entry_id, f"Cable {entry_id}") for entry_id in range(10, 100)]) == 90
+    assert len(index) == 94
+    assert index.complete("cable 1", limit=3) == [(10, "Cable 10"), (11, "Cable 11"), (12, "Cable 12")]
+    assert index.complete("mech", limit=1) == [(2, "Mechanical pencil")]
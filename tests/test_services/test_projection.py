@@ -0,0 +1,33 @@
+import datetime
+from decimal import Decimal
+
+import orjson
+
+from src.api.v1.dto import ProductDTO
+from src.services.database.models import SizeEnum
+from src.services.database.repositories.projection import make_record_class
+from src.utils.responses import TrustedJsonResponse
+
+
+def test_record_class_is_created_once_per_set_of_fields() -> None:
+    record_class = make_record_class("UserRecord", ("id", "username"))
+    assert make_record_class("UserRecord", ("id", "username")) is record_class
+    record = record_class(1, "username")
+    assert (record.id, record.username) == (1, "username")
+    assert not hasattr(record, "__dict__")
+
+
+def test_records_are_rendered_like_dto() -> None:
+    product_fields = tuple(ProductDTO.__fields__)
+    values = {
+        "id": 1,
+        "name": "blouse",
+        "unit_price": Decimal("50.5"),
+        "size": SizeEnum.SMALL,
+        "description": "Pretty blouse",
+        "created_at": datetime.datetime(2022, 1, 1, 12, 30),
+        "stock": 10,
+    }
+    record = make_record_class("ProductRecord", product_fields)(*(values[field] for field in product_fields))
+    response = TrustedJsonResponse({"items": [record]})
+    assert orjson.loads(response.body) == {"items": [orjson.loads(ProductDTO(**values).json())]}
@@ -0,0 +1,61 @@
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from src.middlewares.query_budget_middleware import QueryBudgetMiddleware
+from src.services.database.query_budget import query_budget, record_query, capture_request_queries
+from src.utils.exceptions import QueryBudgetExceeded
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_app(strict: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/users/{user_id}")
+    @query_budget(2)
+    async def get_user(user_id: int, queries: int = 1, fail: bool = False):
+        for _ in range(queries):
+            record_query("SELECT * FROM users WHERE id = %s", 0.001)
+        if fail:
+            raise RuntimeError("database is unavailable")
+        return {"id": user_id}
+
+    app.add_middleware(QueryBudgetMiddleware, repeated_statement_threshold=3, strict=strict)
+    return app
+
+
+async def test_query_logs_are_captured_per_route() -> None:
+    with capture_request_queries() as query_logs:
+        async with AsyncClient(app=make_app(strict=True), base_url="http://test") as client:
+            await client.get("/users/1", params={"queries": 2})
+
+    assert [(query_log.route, query_log.count) for query_log in query_logs] == [("/users/{user_id}", 2)]
+    assert query_logs[0].total_time == pytest.approx(0.002)
+
+
+async def test_exceeded_budget_fails_in_strict_mode() -> None:
+    async with AsyncClient(app=make_app(strict=True), base_url="http://test") as client:
+        with pytest.raises(QueryBudgetExceeded) as exc_info:
+            await client.get("/users/1", params={"queries": 3})
+
+    assert len(exc_info.value.violations) == 2  # budget and repeated statement
+
+
+async def test_exceeded_budget_is_logged(caplog: pytest.LogCaptureFixture) -> None:
+    async with AsyncClient(app=make_app(strict=False), base_url="http://test") as client:
+        response = await client.get("/users/1", params={"queries": 3})
+
+    assert response.status_code == 200
+    assert any("probable N+1" in record.getMessage() for record in caplog.records)
+
+
+async def test_queries_of_failed_request_are_checked(caplog: pytest.LogCaptureFixture) -> None:
+    with capture_request_queries() as query_logs:
+        async with AsyncClient(app=make_app(strict=True), base_url="http://test") as client:
+            # error of endpoint isn't replaced by exceeded budget even in strict mode
+            with pytest.raises(RuntimeError):
+                await client.get("/users/1", params={"queries": 3, "fail": True})
+
+    assert [(query_log.route, query_log.count) for query_log in query_logs] == [("/users/{user_id}", 3)]
+    assert any("probable N+1" in record.getMessage() for record in caplog.records)
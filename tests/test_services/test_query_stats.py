@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from src.services.database.models.base import DatabaseComponents
+from src.services.database.query_stats import QueryStatistics, fingerprint_statement
+
+CONTEXT = SimpleNamespace(execution_options={})
+
+
+def observe(statistics: QueryStatistics, statement: str, duration: float) -> None:
+    statistics.observe(None, None, statement, (), CONTEXT, False, duration)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("SELECT * FROM users WHERE id = %s", "SELECT  *  FROM users WHERE id = 5"),
+    ("SELECT * FROM users WHERE id IN (%s, %s)", "SELECT * FROM users WHERE id IN (%s)"),
+    ("INSERT INTO users (a, b) VALUES (%s, %s)", "INSERT INTO users (a, b) VALUES (%s, %s), (%s, %s)"),
+    ("SELECT * FROM users WHERE name = 'a'", "SELECT * FROM users WHERE name = 'it''s'"),
+])
+def test_statements_differing_by_parameters_share_fingerprint(first: str, second: str) -> None:
+    assert fingerprint_statement(first) == fingerprint_statement(second)
+
+
+def test_top_statements_are_ordered_by_total_time() -> None:
+    statistics = QueryStatistics(slow_query_threshold=10)
+    for duration in range(1, 101):
+        observe(statistics, "SELECT * FROM users WHERE id = %s", duration / 1000)
+    observe(statistics, "SELECT count(*) FROM products", 1.0)
+
+    cheap, expensive = statistics.top(2)[::-1]
+    assert expensive.calls == 100 and cheap.calls == 1
+    assert expensive.p50 == pytest.approx(0.05, abs=0.001)
+    assert expensive.p99 == pytest.approx(0.099, abs=0.001)
+    assert expensive.max_time == pytest.approx(0.1)
+
+
+def test_slow_queries_are_logged(caplog: pytest.LogCaptureFixture) -> None:
+    statistics = QueryStatistics(slow_query_threshold=0.1)
+    with caplog.at_level(logging.WARNING, logger="sqlalchemy.slow_query"):
+        observe(statistics, "SELECT 1", 0.05)
+        observe(statistics, "SELECT 2", 0.2)
+    assert [record.args[-1] for record in caplog.records] == ["SELECT 2"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("isolation_level", ["AUTOCOMMIT", "READ COMMITTED"])
+async def test_slow_reads_are_explained_with_and_without_transaction(
+        caplog: pytest.LogCaptureFixture, session_maker: sessionmaker, isolation_level: str  # type: ignore
+) -> None:
+    statistics = QueryStatistics(slow_query_threshold=0, explain_sample_rate=1)
+    components = DatabaseComponents(str(session_maker.kw["bind"].url), query_statistics=statistics)
+    await statistics.start()
+    try:
+        with caplog.at_level(logging.WARNING, logger="sqlalchemy.slow_query"):
+            async with components.engine.execution_options(isolation_level=isolation_level).connect() as conn:
+                assert (await conn.execute(text("SELECT 1"))).scalar() == 1
+                assert (await conn.execute(text("SELECT 2"))).scalar() == 2
+            for _ in range(100):
+                if any(record.getMessage().startswith("Plan of slow query: SELECT 2") for record in caplog.records):
+                    break
+                await asyncio.sleep(0.01)
+    finally:
+        await components.dispose()
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith("Plan of slow query: SELECT 2") for message in messages)
+    assert not any(message.startswith("Failed to explain") for message in messages)
+    # plan is read with raw cursor of another connection, so it isn't observed as a statement of request
+    assert not any("EXPLAIN" in summary.fingerprint for summary in statistics.top(100))
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Optional
+
+import pytest
+
+from src.services.database.repositories.user_repository import UserRepository
+from src.services.database.row_count import CachedRowCount, CountStrategy
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_cached_count_is_not_returned_when_stale() -> None:
+    now = [0.0]
+
+    async def count_rows() -> int:
+        return 42
+
+    cached_count = CachedRowCount(count_rows, refresh_interval=60, max_staleness=10, clock=lambda: now[0])
+    await cached_count.start()
+    assert cached_count.get() is None
+    await asyncio.sleep(0)
+    assert cached_count.get() == 42
+    now[0] = 11
+    assert cached_count.get() is None
+    await cached_count.close()
+
+
+def make_repository(counter: Optional[int], estimate: Optional[int]) -> UserRepository:
+    repository = UserRepository(session_or_pool=object(), password_hasher=object())  # type: ignore
+
+    async def count_from_counter() -> Optional[int]:
+        return counter
+
+    async def estimate_count() -> Optional[int]:
+        return estimate
+
+    async def count() -> int:
+        return 3
+
+    repository._count_from_counter = count_from_counter  # type: ignore
+    repository._estimate_count = estimate_count  # type: ignore
+    repository._count = count  # type: ignore
+    return repository
+
+
+@pytest.mark.parametrize(
+    "strategy, counter, estimate, expected",
+    [
+        (CountStrategy.COUNTER, 3, None, (3, CountStrategy.COUNTER)),
+        (CountStrategy.ESTIMATE, 3, 5, (5, CountStrategy.ESTIMATE)),
+        (CountStrategy.ESTIMATE, 3, None, (3, CountStrategy.COUNTER)),
+        (CountStrategy.CACHED, None, None, (3, CountStrategy.SCAN)),
+        (CountStrategy.SCAN, 3, 5, (3, CountStrategy.SCAN)),
+    ],
+)
+async def test_strategy_falls_back_to_more_expensive_one(strategy: CountStrategy, counter: Optional[int],
+                                                         estimate: Optional[int], expected: tuple) -> None:
+    assert await make_repository(counter, estimate).get_users_count(strategy) == expected
@@ -0,0 +1,137 @@
+import asyncio
+from typing import Any, List
+
+import pytest
+
+from src.services.amqp import rpc as rpc_module
+from src.services.amqp.rpc import Consumer, JsonRPC, RabbitMQService, RPCUnavailable
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeChannel:
+    def __init__(self) -> None:
+        self.is_closed = False
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.is_closed = False
+        self.channels: List[FakeChannel] = []
+
+    async def channel(self) -> FakeChannel:
+        channel = FakeChannel()
+        self.channels.append(channel)
+        return channel
+
+    async def close(self) -> None:
+        self.is_closed = True
+
+
+class FakeRPC:
+    def __init__(self, fail_registration: bool) -> None:
+        self.fail_registration = fail_registration
+        self.registered: List[str] = []
+        self.is_closed = False
+
+    async def register(self, name: str, callback: Any, **kwargs: Any) -> None:
+        if self.fail_registration:
+            raise ConnectionError("queue can't be declared")
+        self.registered.append(name)
+
+    async def close(self) -> None:
+        self.is_closed = True
+
+
+class FakeBroker:
+    def __init__(self) -> None:
+        self.is_available = True
+        self.fail_registration = False
+        self.connections: List[FakeConnection] = []
+        self.rpcs: List[FakeRPC] = []
+
+    # noinspection PyUnusedLocal
+    async def connect_robust(self, uri: str, **kwargs: Any) -> FakeConnection:
+        if not self.is_available:
+            raise ConnectionError("broker is unavailable")
+        connection = FakeConnection()
+        self.connections.append(connection)
+        return connection
+
+    # noinspection PyUnusedLocal
+    async def create_rpc(self, channel: FakeChannel, **kwargs: Any) -> FakeRPC:
+        rpc = FakeRPC(self.fail_registration)
+        self.rpcs.append(rpc)
+        return rpc
+
+
+@pytest.fixture()
+def broker(monkeypatch: pytest.MonkeyPatch) -> FakeBroker:
+    broker = FakeBroker()
+    monkeypatch.setattr(rpc_module, "connect_robust", broker.connect_robust)
+    monkeypatch.setattr(JsonRPC, "create", broker.create_rpc)
+    return broker
+
+
+def make_service() -> RabbitMQService:
+    return RabbitMQService("amqp://test", Consumer(callback=print, name="echo"), health_check_interval=0.01)
+
+
+async def test_consumers_are_registered_once_and_client_is_closed(broker: FakeBroker) -> None:
+    service = make_service()
+    await service.start()
+    assert service.rpc is broker.rpcs[0]
+    assert broker.rpcs[0].registered == ["echo"]
+
+    await asyncio.sleep(0.05)
+    assert len(broker.connections) == 1
+
+    await service.close()
+    assert broker.connections[0].is_closed and broker.rpcs[0].is_closed
+    with pytest.raises(RPCUnavailable):
+        service.rpc  # noqa
+
+
+async def test_lost_connection_is_reestablished(broker: FakeBroker) -> None:
+    service = make_service()
+    await service.start()
+    broker.is_available = False
+    broker.connections[0].is_closed = True
+    await asyncio.sleep(0.05)
+    with pytest.raises(RPCUnavailable):
+        service.rpc  # noqa
+
+    broker.is_available = True
+    await asyncio.sleep(0.05)
+    assert service.rpc is broker.rpcs[-1]
+    assert len(broker.connections) == 2
+    await service.close()
+
+
+async def test_connection_is_closed_if_consumers_fail_to_register(broker: FakeBroker) -> None:
+    broker.fail_registration = True
+    service = make_service()
+    # application starts anyway, connection is retried in background
+    await service.start()
+    await asyncio.sleep(0.05)
+    assert len(broker.connections) > 1
+    assert all(connection.is_closed for connection in broker.connections)
+
+    broker.fail_registration = False
+    await asyncio.sleep(0.05)
+    assert service.is_healthy
+    assert [connection.is_closed for connection in broker.connections].count(False) == 1
+    await service.close()
+
+
+async def test_failed_context_manager_stops_reconnecting(broker: FakeBroker) -> None:
+    broker.is_available = False
+    service = make_service()
+    with pytest.raises(RPCUnavailable):
+        async with service:
+            pass  # pragma: no cover
+
+    assert service._health_check_task is None
+    broker.is_available = True
+    await asyncio.sleep(0.05)
+    assert broker.connections == []
@@ -0,0 +1,72 @@
+import asyncio
+import time
+from typing import Any
+
+import pytest
+from fastapi import FastAPI, APIRouter
+from httpx import AsyncClient
+
+from src.middlewares.server_timing_middleware import ServerTimingMiddleware
+from src.utils import responses
+from src.utils.responses import TrustedJsonResponse
+from src.utils.server_timing import measure, get_server_timings, record_timing, ServerTimingRoute, DB_PHASE
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_app() -> FastAPI:
+    router = APIRouter(route_class=ServerTimingRoute)
+
+    @router.get("/timed")
+    async def timed():
+        with measure("auth"):
+            await asyncio.sleep(0)
+        record_timing(DB_PHASE, 0.005)
+        return {"ok": True}
+
+    @router.get("/trusted")
+    async def trusted():
+        # response is rendered right here, before endpoint has returned
+        response = TrustedJsonResponse({"ok": True})
+        await asyncio.sleep(0.05)
+        return response
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ServerTimingMiddleware)
+    return app
+
+
+async def test_measurements_are_noop_without_middleware() -> None:
+    with measure("auth"):
+        record_timing(DB_PHASE, 1.0)
+    assert get_server_timings() is None
+
+
+async def test_server_timing_header_contains_phases() -> None:
+    async with AsyncClient(app=make_app(), base_url="http://test") as client:
+        response = await client.get("/timed")
+
+    phases = dict(
+        phase.split(";dur=") for phase in response.headers["Server-Timing"].split(", ")
+    )
+    assert set(phases) == {"auth", "db", "serialize", "total"}
+    assert float(phases["db"]) == 5.0
+
+
+async def test_rendering_of_response_created_by_endpoint_is_serialization(monkeypatch: pytest.MonkeyPatch) -> None:
+    dumps = responses.orjson.dumps
+
+    def slow_dumps(*args: Any, **kwargs: Any) -> bytes:
+        time.sleep(0.02)
+        return dumps(*args, **kwargs)
+
+    monkeypatch.setattr(responses.orjson, "dumps", slow_dumps)
+    async with AsyncClient(app=make_app(), base_url="http://test") as client:
+        response = await client.get("/trusted")
+
+    phases = dict(
+        phase.split(";dur=") for phase in response.headers["Server-Timing"].split(", ")
+    )
+    # rendering is counted, but work of endpoint after it isn't
+    assert 20 <= float(phases["serialize"]) < 50
@@ -0,0 +1,174 @@
+import asyncio
+import uuid
+from typing import Any, List, Optional, cast
+
+import pytest
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.services.database import Product, User
+from src.services.database.repositories.product_repository import ProductRepository
+from src.services.database.repositories.singleflight import SingleFlight
+from src.services.database.repositories.user_cache import UserCache
+from src.services.database.repositories.user_repository import UserRepository
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeRead:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.released = asyncio.Event()
+
+    async def __call__(self) -> List[int]:
+        self.calls += 1
+        await self.released.wait()
+        return [self.calls]
+
+
+class FakePasswordHasher:
+    async def hash(self, password: str) -> str:
+        return f"hash of {password}"
+
+
+class GatedUserRepository(UserRepository):
+    """Reads wait until gate is opened, so that concurrent reads are in flight at the same time"""
+    single_flight = SingleFlight()
+    gate: Optional[asyncio.Event] = None
+    executed_reads = 0
+
+    async def _execute_read(self, stmt: Any, *, use_primary: bool = False) -> Any:
+        GatedUserRepository.executed_reads += 1
+        await cast(asyncio.Event, self.gate).wait()
+        return await super()._execute_read(stmt, use_primary=use_primary)
+
+
+@pytest.fixture(name="gated_user")
+async def gated_user_for_test(session_maker: sessionmaker) -> User:  # type: ignore
+    GatedUserRepository.gate, GatedUserRepository.executed_reads = asyncio.Event(), 0
+    name = f"flight-{uuid.uuid4().hex[:16]}"
+    return await UserRepository(session_maker, FakePasswordHasher()).add_user(  # type: ignore
+        first_name=name, last_name=name, phone_number="+70000000000", email=f"{name}@test.com",
+        password="old", username=name
+    )
+
+
+async def read_password_hash(session_pool: sessionmaker, username: str,  # type: ignore
+                             user_cache: Optional[UserCache] = None) -> str:
+    async with cast(AsyncSession, session_pool()) as session:
+        repository = GatedUserRepository(session, FakePasswordHasher(), user_cache=user_cache)  # type: ignore
+        return cast(User, await repository.get_user_by_username(username)).password_hash
+
+
+async def test_concurrent_identical_reads_share_one_execution() -> None:
+    flights, read = SingleFlight(), FakeRead()
+    readers = [asyncio.create_task(flights.do("key", read, share=list)) for _ in range(3)]
+    await asyncio.sleep(0)
+    read.released.set()
+    results = await asyncio.gather(*readers)
+    assert results == [[1]] * 3
+    # every follower gets its own copy
+    assert results[1] is not results[0] and results[2] is not results[1]
+    assert read.calls == 1 and len(flights) == 0
+
+    # flight has landed, so the next read is executed again
+    assert await flights.do("key", read) == [2]
+
+
+async def test_followers_retry_if_leader_is_cancelled() -> None:
+    flights, read = SingleFlight(), FakeRead()
+    leader = asyncio.create_task(flights.do("key", read))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do("key", read))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    read.released.set()
+    assert await follower == [2]
+    assert leader.cancelled()
+
+
+async def test_cancelled_follower_does_not_cancel_flight() -> None:
+    flights, read = SingleFlight(), FakeRead()
+    leader = asyncio.create_task(flights.do("key", read))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do("key", read))
+    await asyncio.sleep(0)
+    follower.cancel()
+    read.released.set()
+    assert await leader == [1]
+
+
+async def test_errors_are_shared() -> None:
+    flights = SingleFlight()
+
+    async def fail() -> None:
+        await asyncio.sleep(0)
+        raise RuntimeError("database is unavailable")
+
+    results = await asyncio.gather(flights.do("key", fail), flights.do("key", fail), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_flight_key_includes_bound_values() -> None:
+    repository = ProductRepository(session_or_pool=object())  # type: ignore
+    make_key = repository._make_flight_key  # noqa
+    assert make_key(select(Product).where(Product.id == 1), False) == make_key(
+        select(Product).where(Product.id == 1), False
+    )
+    assert make_key(select(Product).where(Product.id == 1), False) != make_key(
+        select(Product).where(Product.id == 2), False
+    )
+    assert make_key(select(Product).where(Product.id == 1), False) != make_key(
+        select(Product).where(Product.id == 1), True
+    )
+
+
+async def test_flight_key_of_lambda_statement_includes_bound_values() -> None:
+    repository = ProductRepository(session_or_pool=object())  # type: ignore
+    make_key = repository._make_flight_key  # noqa
+
+    def make_stmt(*clauses: object) -> object:
+        # built the same way as by `_select_one`, so SQLAlchemy caches lambdas by their code
+        stmt = lambda_stmt(lambda: select(Product))
+        stmt += lambda s: s.where(*clauses)
+        return stmt
+
+    assert make_key(make_stmt(Product.id == 1), False) == make_key(make_stmt(Product.id == 1), False)
+    assert make_key(make_stmt(Product.id == 1), False) != make_key(make_stmt(Product.id == 2), False)
+    assert make_key(make_stmt(Product.id == 1), False) != make_key(make_stmt(Product.name == "1"), False)
+
+
+async def test_session_that_has_written_does_not_join_flight(session_maker: sessionmaker,  # type: ignore
+                                                             gated_user: User) -> None:
+    # flight has started before the write, so it may return the old row
+    leader = asyncio.create_task(read_password_hash(session_maker, gated_user.username))
+    await asyncio.sleep(0)
+    async with cast(AsyncSession, session_maker()) as session:
+        repository = GatedUserRepository(session, FakePasswordHasher())  # type: ignore
+        await repository.update_password_hash("hash of new", gated_user.id)
+        writer = asyncio.create_task(repository.get_user_by_username(gated_user.username))
+        await asyncio.sleep(0)
+        cast(asyncio.Event, GatedUserRepository.gate).set()
+        assert cast(User, await writer).password_hash == "hash of new"
+    await leader
+    assert GatedUserRepository.executed_reads == 2
+
+
+async def test_read_filling_cache_joins_flight_of_the_same_generation(session_maker: sessionmaker,  # type: ignore
+                                                                      gated_user: User) -> None:
+    cache = UserCache()
+    readers: List["asyncio.Task[str]"] = []
+    for _ in range(2):
+        readers.append(asyncio.create_task(read_password_hash(session_maker, gated_user.username, cache)))
+        await asyncio.sleep(0)
+    assert GatedUserRepository.executed_reads == 1
+
+    cache.invalidate(user_id=gated_user.id)
+    # read has started after invalidation, so it mustn't put result of earlier read under the new generation
+    readers.append(asyncio.create_task(read_password_hash(session_maker, gated_user.username, cache)))
+    await asyncio.sleep(0)
+    cast(asyncio.Event, GatedUserRepository.gate).set()
+    assert await asyncio.gather(*readers) == ["hash of old"] * 3
+    assert GatedUserRepository.executed_reads == 2
@@ -0,0 +1,100 @@
+import hashlib
+import time
+from typing import Any, List
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.security import OAuth2PasswordBearer
+
+from src.api.v1.dto import TokenPayload
+from src.services.security.jwt_service import JWTSecurityGuardService
+from src.utils.caching import TTLLRUCache, NOT_CACHED
+
+SECRET_KEY = "secret-key-of-token-cache-tests-32b"
+ALGORITHM = "HS256"
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingGuard(JWTSecurityGuardService):
+    def __init__(self, token_cache: TTLLRUCache[bytes, TokenPayload]) -> None:
+        super().__init__(OAuth2PasswordBearer(tokenUrl="token"), password_hasher=None,  # type: ignore
+                         secret_key=SECRET_KEY, algorithm=ALGORITHM, token_cache=token_cache)
+        self.verified_tokens: List[str] = []
+
+    def _verify_token(self, token: str) -> Any:
+        self.verified_tokens.append(token)
+        return super()._verify_token(token)
+
+
+def make_token(expires_in: float, secret_key: str = SECRET_KEY, **payload: Any) -> str:
+    return jwt.encode(
+        {"sub": "username", "scopes": ["admin"], "exp": time.time() + expires_in, **payload},
+        secret_key, algorithm=ALGORITHM
+    )
+
+
+def get_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def test_token_is_verified_once_while_it_is_cached() -> None:
+    guard = CountingGuard(TTLLRUCache(max_size=10, ttl=60))
+    token = make_token(expires_in=600)
+
+    assert guard._decode_token(token) == TokenPayload(username="username", scopes=["admin"])
+    assert guard._decode_token(token) == TokenPayload(username="username", scopes=["admin"])
+    assert guard.verified_tokens == [token]
+
+
+def test_entry_is_not_kept_longer_than_token_is_valid() -> None:
+    clock = Clock()
+    cache: TTLLRUCache[bytes, TokenPayload] = TTLLRUCache(max_size=10, ttl=60, clock=clock)
+    guard = CountingGuard(cache)
+    token = make_token(expires_in=30)
+    guard._decode_token(token)
+
+    clock.now = 29
+    assert cache.get(get_digest(token)) is not NOT_CACHED
+    clock.now = 31
+    assert cache.get(get_digest(token)) is NOT_CACHED
+
+
+def test_expired_token_is_not_served_from_cache() -> None:
+    guard = CountingGuard(TTLLRUCache(max_size=10, ttl=60))
+    token = make_token(expires_in=1)
+    guard._decode_token(token)
+
+    time.sleep(1.1)
+    with pytest.raises(HTTPException) as exc_info:
+        guard._decode_token(token)
+    assert exc_info.value.status_code == 401
+    assert guard.verified_tokens == [token, token]
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        make_token(expires_in=600, secret_key=SECRET_KEY[::-1]),
+        make_token(expires_in=-1),
+        make_token(expires_in=600, sub=None),
+        "not a token",
+    ],
+    ids=["foreign signature", "expired", "without subject", "malformed"],
+)
+def test_invalid_token_is_never_cached(token: str) -> None:
+    cache: TTLLRUCache[bytes, TokenPayload] = TTLLRUCache(max_size=10, ttl=60)
+    guard = CountingGuard(cache)
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            guard._decode_token(token)
+
+    assert len(cache) == 0
+    assert guard.verified_tokens == [token, token]
@@ -0,0 +1,82 @@
+import uuid
+from typing import List, cast
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.services.database import OutboxMessage
+from src.services.database.repositories.outbox_repository import OutboxRepository
+from src.services.database.repositories.product_repository import ProductRepository
+from src.services.database.repositories.user_repository import UserRepository
+from src.services.database.unit_of_work import UnitOfWork
+
+pytestmark = pytest.mark.asyncio
+
+
+async def get_payloads(session_pool: sessionmaker, routing_key: str) -> List[dict]:  # type: ignore
+    async with cast(AsyncSession, session_pool()) as session:
+        return list((await session.execute(
+            select(OutboxMessage.payload).where(OutboxMessage.routing_key == routing_key).order_by(OutboxMessage.id)
+        )).scalars())
+
+
+async def test_transaction_is_committed_without_commit_on_success(session_maker: sessionmaker) -> None:  # type: ignore
+    routing_key = f"uow-{uuid.uuid4()}"
+    async with UnitOfWork(session_maker) as uow:
+        async with uow.transaction():
+            await OutboxRepository(uow.session).add_message(routing_key, {"step": "outer"})
+            with pytest.raises(ZeroDivisionError):
+                async with uow.transaction():
+                    await OutboxRepository(uow.session).add_message(routing_key, {"step": "failed"})
+                    raise ZeroDivisionError
+            async with uow.transaction():
+                await OutboxRepository(uow.session).add_message(routing_key, {"step": "nested"})
+
+    # failed nested transaction is rolled back to its SAVEPOINT only
+    assert await get_payloads(session_maker, routing_key) == [{"step": "outer"}, {"step": "nested"}]
+
+
+async def test_transaction_is_not_joined_with_foreign_one(session_maker: sessionmaker) -> None:  # type: ignore
+    async with UnitOfWork(session_maker) as uow:
+        # transaction is begun implicitly, unit of work would roll it back on exit
+        await uow.session.execute(text("SELECT 1"))
+        with pytest.raises(RuntimeError):
+            async with uow.transaction():
+                pass
+
+
+async def test_repositories_of_unit_of_work_share_connection(session_maker: sessionmaker) -> None:  # type: ignore
+    async with UnitOfWork(session_maker) as uow:
+        async with uow.transaction():
+            await OutboxRepository(uow.session).add_message(f"uow-{uuid.uuid4()}", {})
+            await ProductRepository(uow.session).get_product_by_id(-1)
+            await UserRepository(uow.session, password_hasher=object()).get_user_by_id(-1)  # type: ignore
+        assert uow.checkouts == 1
+
+
+@pytest.mark.parametrize("commit_on_success", [False, True])
+async def test_session_is_rolled_back_on_exception(session_maker: sessionmaker,  # type: ignore
+                                                  commit_on_success: bool) -> None:
+    routing_key = f"uow-{uuid.uuid4()}"
+    with pytest.raises(ZeroDivisionError):
+        async with UnitOfWork(session_maker, commit_on_success=commit_on_success) as uow:
+            uow.session.add(OutboxMessage(routing_key=routing_key, payload={}))
+            await uow.session.flush()
+            raise ZeroDivisionError
+
+    assert await get_payloads(session_maker, routing_key) == []
+
+
+@pytest.mark.parametrize("commit_on_success, expected_payloads", [(False, []), (True, [{"step": "pending"}])])
+async def test_pending_transaction_is_committed_only_with_commit_on_success(
+        session_maker: sessionmaker, commit_on_success: bool, expected_payloads: List[dict]  # type: ignore
+) -> None:
+    routing_key = f"uow-{uuid.uuid4()}"
+    async with UnitOfWork(session_maker, commit_on_success=commit_on_success) as uow:
+        # transaction is begun implicitly, not by `transaction`
+        uow.session.add(OutboxMessage(routing_key=routing_key, payload={"step": "pending"}))
+        await uow.session.flush()
+
+    assert await get_payloads(session_maker, routing_key) == expected_payloads
@@ -0,0 +1,117 @@
+import uuid
+from typing import Any, List, Sequence, cast
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.services.database.repositories.user_cache import UserCache
+from src.services.database.unit_of_work import UnitOfWork
+from src.services.database.repositories.user_repository import UserRepository
+from src.utils.caching import TTLLRUCache, NOT_CACHED
+
+USER = {"id": 1, "username": "username", "password_hash": "hash"}
+
+
+class FakePasswordHasher:
+    async def hash(self, password: str) -> str:
+        return f"hash of {password}"
+
+    async def hash_many(self, passwords: Sequence[str]) -> List[str]:
+        return [await self.hash(password) for password in passwords]
+
+
+class ReadRecordingUserRepository(UserRepository):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.reads_from_primary: List[bool] = []
+
+    async def _execute_read(self, stmt: Any, *, use_primary: bool = False) -> Any:
+        self.reads_from_primary.append(use_primary)
+        return await super()._execute_read(stmt, use_primary=use_primary)
+
+
+def test_lru_evicts_least_recently_used() -> None:
+    cache: TTLLRUCache[str, int] = TTLLRUCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is NOT_CACHED
+    assert cache.stats.evictions == 1
+
+
+def test_entries_expire() -> None:
+    now = [0.0]
+    cache: TTLLRUCache[str, int] = TTLLRUCache(max_size=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    now[0] = 11
+    assert cache.get("a") is NOT_CACHED
+    assert cache.stats.expirations == 1
+
+
+def test_user_is_cached_by_id_and_username() -> None:
+    cache = UserCache()
+    cache.put(USER, generation=cache.generation, username="username")
+    assert cache.get_by_id(1) == USER
+    assert cache.get_by_username("username") == USER
+
+
+def test_unknown_user_is_cached_as_none() -> None:
+    cache = UserCache()
+    cache.put(None, generation=cache.generation, username="unknown")
+    assert cache.get_by_username("unknown") is None
+
+
+def test_invalidation_drops_all_keys_of_user() -> None:
+    cache = UserCache()
+    cache.put(USER, generation=cache.generation, user_id=1)
+    cache.invalidate(user_id=1)
+    assert cache.get_by_username("username") is NOT_CACHED
+
+
+def test_read_raced_with_write_is_not_cached() -> None:
+    cache = UserCache()
+    generation = cache.generation
+    cache.invalidate(user_id=1)
+    cache.put(USER, generation=generation, user_id=1)
+    assert cache.get_by_id(1) is NOT_CACHED
+
+
+@pytest.mark.asyncio
+async def test_cache_is_filled_from_primary(session_maker: sessionmaker) -> None:  # type: ignore
+    async with cast(AsyncSession, session_maker()) as session:
+        repository = ReadRecordingUserRepository(session, password_hasher=object(),  # type: ignore
+                                                 user_cache=UserCache())
+        await repository.get_user_by_username("unknown")
+        await repository.get_user_by_id(-1)
+        # record isn't cached, so it may be read from replica
+        await repository.get_user_record_by_id(-2, ["id"])
+
+    assert repository.reads_from_primary == [True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_old_row_read_before_commit_is_dropped_after_it(session_maker: sessionmaker) -> None:  # type: ignore
+    name = f"cache-{uuid.uuid4().hex[:16]}"
+    password_hasher, cache = FakePasswordHasher(), UserCache()
+    user = await UserRepository(session_maker, password_hasher).add_user(  # type: ignore
+        first_name=name, last_name=name, phone_number="+70000000000", email=f"{name}@test.com",
+        password="old", username=name
+    )
+
+    async with UnitOfWork(session_maker) as uow:
+        async with uow.transaction():
+            await UserRepository(uow.session, password_hasher, user_cache=cache).update_password_hash(  # type: ignore
+                "hash of new", user.id
+            )
+            # another request reads the committed row, that is still the old one
+            async with cast(AsyncSession, session_maker()) as session:
+                concurrent_repository = UserRepository(session, password_hasher, user_cache=cache)  # type: ignore
+                assert (await concurrent_repository.get_user_by_id(user.id)).password_hash == "hash of old"
+            assert cache.get_by_id(user.id)["password_hash"] == "hash of old"  # type: ignore
+
+    assert cache.get_by_id(user.id) is NOT_CACHED
+    async with cast(AsyncSession, session_maker()) as session:
+        repository = UserRepository(session, password_hasher, user_cache=cache)  # type: ignore
+        assert (await repository.get_user_by_username(name)).password_hash == "hash of new"